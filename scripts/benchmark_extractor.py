@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Benchmark dell'estrattore di orari - Vallauri da Vincenzo
+Misura extract_to_directory sul PDF incluso (orario_vallauri.pdf) e il tempo
+di import dell'estrattore in un interprete nuovo (avvio dei comandi che non
+leggono PDF), e confronta i risultati con una baseline salvata.
+
+I tempi dipendono dalla macchina: la baseline (benchmark_baseline.json) è
+locale, non versionata, e va generata con --save-baseline sulla stessa
+macchina prima della modifica da misurare.
+
+Ogni modifica di prestazioni a pdf_timetable_extractor.py va giustificata
+con i numeri di questo benchmark.
+
+Uso:
+    python benchmark_extractor.py [--workers N] [--repeat N]
+    python benchmark_extractor.py --save-baseline
+    python benchmark_extractor.py --baseline benchmark_baseline.json --threshold 0.15
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import resource
+import tempfile
+import contextlib
+from typing import List, Dict, Optional
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_PDF = SCRIPT_DIR / "orario_vallauri.pdf"
+DEFAULT_BASELINE = SCRIPT_DIR / "benchmark_baseline.json"
+
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import pdfplumber
+import pdf_timetable_extractor as extractor
+
+# Fasi riportate nel breakdown, nell'ordine della pipeline
+PHASES = ['open', 'cache', 'grid', 'layout', 'tables', 'header', 'text', 'fill', 'lessons', 'arrows', 'intervals', 'json']
+
+# Moduli che l'import dell'estrattore non deve caricare (vedi require_pdf_stack)
+PDF_STACK_MODULES = ['pdfplumber', 'pdfminer']
+
+# Fasi più brevi di così non vengono confrontate con la baseline (troppo rumorose)
+MIN_PHASE_SECONDS = 0.05
+
+# ============================================================================
+# MISURAZIONE
+# ============================================================================
+
+def peak_rss_mb() -> float:
+    """Picco di memoria residente del processo e dei worker terminati, in MB"""
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss è in KB su Linux e in byte su macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return max(self_rss, children_rss) / scale
+
+def count_pages(pdf_path: str) -> int:
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+def measure_import(repeat: int) -> Dict:
+    """
+    Tempo di import di pdf_timetable_extractor in un interprete nuovo (il migliore
+    su repeat tentativi) e moduli pesanti caricati dall'import
+    """
+    probe = (
+        "import sys, time, json\n"
+        "start = time.perf_counter()\n"
+        "import pdf_timetable_extractor\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"loaded = [m for m in {PDF_STACK_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'seconds': elapsed, 'loaded': loaded}))\n"
+    )
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', probe], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output))
+    
+    return {
+        'seconds': round(min(sample['seconds'] for sample in samples), 4),
+        'loaded_modules': samples[0]['loaded']
+    }
+
+def run_once(pdf_path: str, workers: int) -> Dict:
+    """Esegue un'estrazione completa (incluso il salvataggio JSON) e ne misura i tempi"""
+    extractor.PROFILER.reset()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir, open(os.devnull, 'w') as devnull:
+        with contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            written = extractor.extract_to_directory(pdf_path, tmp_dir, workers=workers)
+            wall = time.perf_counter() - start
+    
+    return {
+        'wall': wall,
+        'classes': len(written),
+        'lessons': sum(info['totalLessons'] for info in written.values()),
+        'phases': {name: {'seconds': seconds, 'calls': int(calls)}
+                   for name, (seconds, calls) in extractor.PHASE_STATS.items()}
+    }
+
+def run_benchmark(pdf_path: str, workers: int, repeat: int) -> Dict:
+    """Ripete l'estrazione e riporta la ripetizione più veloce (e il tempo migliore di ogni fase)"""
+    pages = count_pages(pdf_path)
+    runs = []
+    
+    for i in range(repeat):
+        print(f"⏱️  Ripetizione {i + 1}/{repeat}...")
+        run = run_once(pdf_path, workers)
+        print(f"   {run['wall']:.2f} s")
+        runs.append(run)
+    
+    best = min(runs, key=lambda r: r['wall'])
+    startup = measure_import(max(repeat, 5))
+    # Ogni fase con il suo tempo migliore: le fasi brevi (poche pagine) variano
+    # più del totale e la ripetizione più veloce non è la migliore per tutte
+    phases = {name: {'seconds': min(run['phases'][name]['seconds'] for run in runs), 'calls': phase['calls']}
+              for name, phase in best['phases'].items()}
+    
+    return {
+        'pdf': Path(pdf_path).name,
+        'workers': workers,
+        'repeat': repeat,
+        'pages': pages,
+        'classes': best['classes'],
+        'lessons': best['lessons'],
+        'wall_seconds': round(best['wall'], 4),
+        'wall_seconds_all': [round(r['wall'], 4) for r in runs],
+        'pages_per_second': round(pages / best['wall'], 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'import_seconds': startup['seconds'],
+        'import_loaded_modules': startup['loaded_modules'],
+        'phases': {name: {'seconds': round(p['seconds'], 4), 'calls': p['calls']}
+                   for name, p in sorted(phases.items(),
+                                         key=lambda item: PHASES.index(item[0]) if item[0] in PHASES else len(PHASES))},
+        'environment': {
+            'python': platform.python_version(),
+            'pdfplumber': pdfplumber.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+    }
+
+# ============================================================================
+# CONFRONTO CON LA BASELINE
+# ============================================================================
+
+def compare_with_baseline(result: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Confronta il risultato con la baseline
+    
+    Returns:
+        Elenco delle regressioni oltre la soglia (vuoto se tutto ok)
+    """
+    regressions = []
+    
+    def check(label: str, current: float, reference: float):
+        if reference <= 0:
+            return
+        change = (current - reference) / reference
+        marker = "❌" if change > threshold else "✓"
+        print(f"  {marker} {label:<22} {reference:>10.3f} → {current:>10.3f}  ({change:+.1%})")
+        if change > threshold:
+            regressions.append(f"{label}: {reference:.3f} → {current:.3f} ({change:+.1%})")
+    
+    if (result['classes'], result['lessons']) != (baseline['classes'], baseline['lessons']):
+        regressions.append(
+            f"output diverso: {baseline['classes']} classi / {baseline['lessons']} lezioni → "
+            f"{result['classes']} classi / {result['lessons']} lezioni"
+        )
+    
+    check("wall (s)", result['wall_seconds'], baseline['wall_seconds'])
+    check("picco RSS (MB)", result['peak_rss_mb'], baseline['peak_rss_mb'])
+    if 'import_seconds' in baseline:
+        check("import (s)", result['import_seconds'], baseline['import_seconds'])
+    else:
+        # Baseline precedente al tempo di import: il confronto non può essere saltato in silenzio
+        regressions.append("baseline senza import_seconds: va rigenerata con --save-baseline")
+    
+    if result['import_loaded_modules']:
+        regressions.append(f"l'import dell'estrattore carica {', '.join(result['import_loaded_modules'])}")
+    
+    for name, phase in baseline['phases'].items():
+        if phase['seconds'] < MIN_PHASE_SECONDS or name not in result['phases']:
+            continue
+        check(f"fase {name} (s)", result['phases'][name]['seconds'], phase['seconds'])
+    
+    return regressions
+
+def print_report(result: Dict):
+    print("\n" + "="*70)
+    print("📊 RISULTATI")
+    print("="*70)
+    print(f"PDF:           {result['pdf']} ({result['pages']} pagine, workers={result['workers']})")
+    print(f"Output:        {result['classes']} classi, {result['lessons']} lezioni")
+    print(f"Tempo totale:  {result['wall_seconds']:.2f} s")
+    print(f"Pagine/s:      {result['pages_per_second']:.2f}")
+    print(f"Picco RSS:     {result['peak_rss_mb']:.1f} MB")
+    print(f"Import:        {result['import_seconds'] * 1000:.1f} ms"
+          + (f" (carica {', '.join(result['import_loaded_modules'])})" if result['import_loaded_modules'] else ""))
+    print("\nFasi:")
+    for name, phase in result['phases'].items():
+        share = phase['seconds'] / result['wall_seconds'] if result['wall_seconds'] else 0
+        print(f"  {name:<10} {phase['seconds']:>8.3f} s  {share:>6.1%}  ({phase['calls']} chiamate)")
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark dell'estrattore di orari")
+    parser.add_argument('pdf_path', nargs='?', default=str(DEFAULT_PDF),
+                        help="PDF da estrarre (default: orario_vallauri.pdf)")
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help="processi per l'estrazione (default: 1)")
+    parser.add_argument('--repeat', type=int, default=3, metavar='N',
+                        help="ripetizioni, viene tenuta la più veloce (default: 3)")
+    parser.add_argument('--output', metavar='FILE', default='benchmark_results.json',
+                        help="dove salvare i risultati (default: benchmark_results.json)")
+    parser.add_argument('--baseline', metavar='FILE', default=str(DEFAULT_BASELINE),
+                        help="baseline con cui confrontare (default: benchmark_baseline.json)")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="regressione massima tollerata, come frazione (default: 0.15)")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="salva i risultati come nuova baseline invece di confrontarli")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    
+    if not Path(args.pdf_path).exists():
+        print(f"❌ File non trovato: {args.pdf_path}")
+        sys.exit(1)
+    
+    result = run_benchmark(args.pdf_path, args.workers, args.repeat)
+    print_report(result)
+    
+    output = args.baseline if args.save_baseline else args.output
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Risultati salvati: {output}")
+    
+    if args.save_baseline:
+        return
+    
+    if not Path(args.baseline).exists():
+        print(f"⚠️  Nessuna baseline da confrontare: {args.baseline} (creala con --save-baseline)")
+        return
+    
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    
+    print(f"\n🔍 Confronto con la baseline (soglia {args.threshold:.0%}):")
+    regressions = compare_with_baseline(result, baseline, args.threshold)
+    
+    if regressions:
+        print("\n❌ Regressioni:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    
+    print("\n✅ Nessuna regressione")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Formato compatto degli orari - Vallauri da Vincenzo
+Codifica orari_tutte_classi.json in un JSON minificato con dizionari condivisi
+e lo riconverte nello schema originale senza perdita.
+
+Struttura del formato compatto:
+    times        orari "HH:MM" distinti, ordinati (le lezioni usano gli indici)
+    subjects     materie distinte
+    teachers     docenti distinti
+    classrooms   aule distinte
+    colors       colori distinti
+    scheduleTypes  tipi di scansione oraria distinti
+    classes      [nome, tipo, lezioni] con ogni lezione come tupla di interi:
+                 [giorno, inizio, fine, materia, docente, aula, colore, conClasse]
+                 (conClasse = 0 per gli intervalli, che non hanno il campo 'class')
+
+Uso:
+    python compact_schedule.py encode orari_tutte_classi.json orari_tutte_classi.min.json
+    python compact_schedule.py decode orari_tutte_classi.min.json orari_tutte_classi.json
+"""
+
+import sys
+import json
+import argparse
+from typing import List, Dict, Optional
+from pathlib import Path
+
+COMPACT_FORMAT = 'vallauri-compact'
+COMPACT_VERSION = 1
+
+LESSON_KEYS = ['class', 'subject', 'teacher', 'classroom', 'dayOfWeek', 'startTime', 'endTime', 'color']
+INTERVAL_KEYS = LESSON_KEYS[1:]
+
+# ============================================================================
+# CODIFICA
+# ============================================================================
+
+class _Interner:
+    """Assegna un indice stabile a ogni valore distinto"""
+    
+    def __init__(self):
+        self.values: List[str] = []
+        self.index: Dict[str, int] = {}
+    
+    def __call__(self, value: str) -> int:
+        idx = self.index.get(value)
+        if idx is None:
+            idx = self.index[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+def encode_compact(data: Dict) -> Dict:
+    """Codifica il JSON completo (schema di orari_tutte_classi.json) nel formato compatto"""
+    times = sorted({lesson[key]
+                    for class_data in data['classes'].values()
+                    for lesson in class_data['lessons']
+                    for key in ('startTime', 'endTime')})
+    time_index = {t: i for i, t in enumerate(times)}
+    
+    subjects, teachers, classrooms, colors, schedule_types = (_Interner() for _ in range(5))
+    classes = []
+    
+    for class_name, class_data in data['classes'].items():
+        lessons = []
+        for lesson in class_data['lessons']:
+            with_class = 'class' in lesson
+            if list(lesson) != (LESSON_KEYS if with_class else INTERVAL_KEYS):
+                raise ValueError(f"Lezione con campi inattesi in {class_name}: {list(lesson)}")
+            if with_class and lesson['class'] != class_name:
+                raise ValueError(f"Lezione di {lesson['class']} nella classe {class_name}")
+            
+            lessons.append([
+                lesson['dayOfWeek'],
+                time_index[lesson['startTime']],
+                time_index[lesson['endTime']],
+                subjects(lesson['subject']),
+                teachers(lesson['teacher']),
+                classrooms(lesson['classroom']),
+                colors(lesson['color']),
+                int(with_class)
+            ])
+        
+        if class_data['className'] != class_name or class_data['totalLessons'] != len(lessons):
+            raise ValueError(f"Intestazione della classe {class_name} incoerente")
+        
+        classes.append([class_name, schedule_types(class_data['scheduleType']), lessons])
+    
+    return {
+        'format': COMPACT_FORMAT,
+        'version': COMPACT_VERSION,
+        'school': data['school'],
+        'extractionDate': data['extractionDate'],
+        'times': times,
+        'subjects': subjects.values,
+        'teachers': teachers.values,
+        'classrooms': classrooms.values,
+        'colors': colors.values,
+        'scheduleTypes': schedule_types.values,
+        'classes': classes
+    }
+
+# ============================================================================
+# DECODIFICA
+# ============================================================================
+
+def decode_compact(compact: Dict) -> Dict:
+    """Ricostruisce il JSON completo nello schema originale (stesso ordine delle chiavi)"""
+    if compact.get('format') != COMPACT_FORMAT or compact.get('version') != COMPACT_VERSION:
+        raise ValueError(f"Formato non supportato: {compact.get('format')} v{compact.get('version')}")
+    
+    times = compact['times']
+    subjects = compact['subjects']
+    teachers = compact['teachers']
+    classrooms = compact['classrooms']
+    colors = compact['colors']
+    schedule_types = compact['scheduleTypes']
+    
+    classes = {}
+    for class_name, schedule_type, encoded_lessons in compact['classes']:
+        lessons = []
+        for day, start, end, subject, teacher, classroom, color, with_class in encoded_lessons:
+            lesson = {'class': class_name} if with_class else {}
+            lesson['subject'] = subjects[subject]
+            lesson['teacher'] = teachers[teacher]
+            lesson['classroom'] = classrooms[classroom]
+            lesson['dayOfWeek'] = day
+            lesson['startTime'] = times[start]
+            lesson['endTime'] = times[end]
+            lesson['color'] = colors[color]
+            lessons.append(lesson)
+        
+        classes[class_name] = {
+            'className': class_name,
+            'scheduleType': schedule_types[schedule_type],
+            'totalLessons': len(lessons),
+            'lessons': lessons
+        }
+    
+    return {
+        'school': compact['school'],
+        'extractionDate': compact['extractionDate'],
+        'totalClasses': len(classes),
+        'classes': classes
+    }
+
+# ============================================================================
+# FILE
+# ============================================================================
+
+def save_compact_json(data: Dict, output_path: str):
+    """Salva il JSON completo nel formato compatto (minificato)"""
+    compact = encode_compact(data)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(compact, f, ensure_ascii=False, separators=(',', ':'))
+    
+    print(f"\n🗜️  JSON compatto salvato: {output_path}")
+    print(f"   Dimensione: {Path(output_path).stat().st_size / 1024:.2f} KB")
+
+def load_compact_json(input_path: str) -> Dict:
+    """Carica un file compatto e lo riporta allo schema originale"""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        return decode_compact(json.load(f))
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Conversione da/verso il formato compatto degli orari")
+    parser.add_argument('command', choices=['encode', 'decode'],
+                        help="encode: JSON completo → compatto; decode: compatto → JSON completo")
+    parser.add_argument('input', help="file di ingresso")
+    parser.add_argument('output', help="file di uscita")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    
+    if not Path(args.input).exists():
+        print(f"❌ File non trovato: {args.input}")
+        sys.exit(1)
+    
+    if args.command == 'encode':
+        with open(args.input, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        save_compact_json(data, args.output)
+    else:
+        data = load_compact_json(args.input)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 JSON salvato: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,850 @@
+#!/usr/bin/env python3
+"""
+Estrazione rapida della griglia degli orari - Vallauri da Vincenzo
+Ricava le tabelle di una pagina direttamente dal content stream, senza
+l'analisi del layout di pdfminer (l'80% del tempo di page.extract_tables):
+    
+    1. lettura del content stream: caratteri (Tj/TJ) e segmenti (m/l/re),
+       con la stessa aritmetica di pdfminer e le coordinate di pdfplumber
+    2. griglia: bordi agganciati, uniti e incrociati come nella strategia
+       "lines" di pdfplumber, celle e tabelle comprese
+    3. testo: i caratteri vengono ordinati una volta per coordinata verticale
+       e ogni cella prende i propri con una ricerca binaria, poi parole e
+       righe come in pdfplumber.utils.extract_text
+
+Il risultato è identico a page.extract_tables(), comprese le stranezze (le
+icone delle frecce creano piccole celle in più). Il lettore gestisce solo gli
+operatori usati dai PDF del Vallauri: davanti a qualsiasi altro costrutto
+(immagini, curve, testo ruotato, font verticali...) la pagina passa
+all'estrattore generico.
+
+Il modello della griglia (bordi delle colonne e delle righe) viene appreso
+dalla prima pagina, dopo aver verificato che lì le tabelle coincidano con
+quelle di pdfplumber, oppure letto da un file (--layout-template): le pagine
+che non rientrano nel modello passano all'estrattore generico. Anche dopo la
+prima pagina una pagina ogni VALIDATE_EVERY viene confrontata con pdfplumber,
+e alla prima differenza il resto del documento usa l'estrattore generico.
+
+Uso:
+    python grid_extractor.py orario_vallauri.pdf [--template FILE]
+"""
+
+import re
+import sys
+import json
+import hashlib
+import time
+import argparse
+from bisect import bisect_left
+from itertools import groupby
+from typing import List, Dict, Tuple, Optional, NamedTuple
+from pathlib import Path
+
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdftypes import PDFObjRef, resolve1, dict_value
+from pdfminer.utils import mult_matrix, translate_matrix, apply_matrix_pt, apply_matrix_rect
+
+from schedule_json import write_atomic
+
+# Tolleranze predefinite di pdfplumber (TableSettings e extract_text)
+SNAP_TOLERANCE = 3
+JOIN_TOLERANCE = 3
+EDGE_MIN_LENGTH_PREFILTER = 1
+EDGE_MIN_LENGTH = 3
+INTERSECTION_TOLERANCE = 3
+TEXT_TOLERANCE = 3
+
+# Distanza massima (in punti) tra i bordi di una pagina e quelli del modello
+TEMPLATE_TOLERANCE = 2
+TEMPLATE_VERSION = 1
+
+# Pagine lette dalla griglia tra due confronti con l'estrattore generico
+VALIDATE_EVERY = 16
+
+# Legature espanse da pdfplumber nel testo delle parole
+LIGATURES = {"ﬀ": "ff", "ﬃ": "ffi", "ﬄ": "ffl", "ﬁ": "fi", "ﬂ": "fl", "ﬆ": "st", "ﬅ": "st"}
+
+# Token del content stream: stringa letterale (con un livello di parentesi
+# annidate), stringa esadecimale, nome, numero o operatore, delimitatori, commento;
+# l'ultima alternativa raccoglie le parentesi rimaste (stringhe più annidate o non
+# chiuse), che altrimenti finditer salterebbe in silenzio
+_TOKEN = re.compile(
+    rb'\((?:[^\\()]|\\.|\((?:[^\\()]|\\.)*\))*\)'
+    rb'|<[0-9A-Fa-f\s]*>'
+    rb'|/[^\s/\[\]()<>{}%]*'
+    rb'|[^\s/\[\]()<>{}%]+'
+    rb'|<<|>>|[\[\]{}]'
+    rb'|%[^\r\n]*'
+    rb'|[()<>]',
+    re.S
+)
+_NAME_ESCAPE = re.compile(rb'#([0-9A-Fa-f]{0,2})')
+_STRING_ESCAPE = re.compile(rb'\\([0-7]{1,3}|\r\n|.)', re.S)
+_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f',
+            b'(': b'(', b')': b')', b'\\': b'\\'}
+_NUMBER_START = frozenset(b'+-.0123456789')
+
+# Operatori senza effetto su caratteri e segmenti (colori, stile delle linee, marcatori);
+# gs compreso: pdfminer non applica i parametri di ExtGState (do_gs è vuoto),
+# quindi nemmeno un font impostato lì arriva a page.chars
+_IGNORED_OPERATORS = frozenset([
+    b'g', b'G', b'rg', b'RG', b'k', b'K', b'cs', b'CS', b'sc', b'scn', b'SC', b'SCN',
+    b'w', b'J', b'j', b'd', b'M', b'i', b'ri', b'gs', b'Tr', b'W', b'W*',
+    b'BX', b'EX', b'MP', b'DP', b'BMC', b'BDC', b'EMC'
+])
+_FILL_OPERATORS = frozenset([b'S', b'f', b'F', b'f*', b'B', b'B*'])
+_CLOSE_FILL_OPERATORS = frozenset([b's', b'b', b'b*'])
+
+class LayoutDeviation(Exception):
+    """La pagina contiene costrutti non gestiti: va analizzata con l'estrattore generico"""
+
+# ============================================================================
+# LETTURA DEL CONTENT STREAM
+# ============================================================================
+
+def _unescape(raw: bytes) -> bytes:
+    """Byte di una stringa letterale, con le sequenze di escape risolte come in pdfminer"""
+    def replace(match):
+        code = match.group(1)
+        if code[:1].isdigit():
+            return bytes([int(code, 8) & 0xFF])
+        return _ESCAPES.get(code, b'')
+    return _STRING_ESCAPE.sub(replace, raw)
+
+def _name(token: bytes) -> str:
+    """Nome senza la barra, con le sequenze #xx risolte come in pdfminer"""
+    raw = token[1:]
+    if b'#' in raw:
+        raw = _NAME_ESCAPE.sub(lambda match: bytes([int(match.group(1), 16)]) if match.group(1) else b'', raw)
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        raise LayoutDeviation(f"nome non valido: {raw[:20]!r}")
+
+def _page_fonts(page) -> Dict[str, object]:
+    """Font della pagina, dal gestore delle risorse di pdfplumber (gli stessi oggetti di pdfminer)"""
+    fonts = {}
+    resources = dict_value(page.page_obj.resources)
+    for font_id, spec in dict_value(resources.get('Font', {})).items():
+        objid = spec.objid if isinstance(spec, PDFObjRef) else None
+        fonts[font_id] = page.pdf.rsrcmgr.get_font(objid, dict_value(spec))
+    return fonts
+
+class PageObjects(NamedTuple):
+    """Caratteri e bordi di una pagina, nelle coordinate di pdfplumber"""
+    chars: List[tuple]          # (testo, x0, x1, top, bottom) nell'ordine del content stream
+    v_edges: List[list]         # [x, top, bottom, altezza] nell'ordine di page.edges
+    h_edges: List[list]         # [top, x0, x1, larghezza] nell'ordine di page.edges
+
+def read_page_objects(page, glyph_cache: Optional[Dict] = None) -> PageObjects:
+    """
+    Interpreta il content stream della pagina e restituisce caratteri e bordi
+    come li vedrebbe pdfplumber (page.chars e page.edges)
+    
+    Raises:
+        LayoutDeviation se la pagina usa operatori o geometrie non gestiti
+    """
+    if page.rotation:
+        raise LayoutDeviation("pagina ruotata")
+    
+    glyph_cache = {} if glyph_cache is None else glyph_cache
+    fonts = _page_fonts(page)
+    height = page.height
+    mb_x0, mb_top = page.mediabox[:2]
+    x0_page, y0_page = page.page_obj.mediabox[:2]
+    
+    chars = []
+    lines_v, lines_h, rects_v, rects_h = [], [], [], []
+    
+    def add_line(pts):
+        (ax, ay), (bx, by) = pts
+        x0, x1 = min(ax, bx), max(ax, bx)
+        y0, y1 = min(ay, by), max(ay, by)
+        top = (height - y1) + mb_top
+        bottom = (height - y0) + mb_top
+        if mb_x0 != 0:
+            x0, x1 = x0 + mb_x0, x1 + mb_x0
+        if top == bottom:
+            lines_h.append([top, x0, x1, x1 - x0])
+        elif x0 == x1:
+            lines_v.append([x0, top, bottom, y1 - y0])
+        else:
+            raise LayoutDeviation("segmento obliquo")
+    
+    def add_rect(p0, p2):
+        (ax, ay), (bx, by) = p0, p2
+        x0, x1 = min(ax, bx), max(ax, bx)
+        y0, y1 = min(ay, by), max(ay, by)
+        width, rect_height = x1 - x0, y1 - y0
+        top = (height - y1) + mb_top
+        bottom = (height - y0) + mb_top
+        if mb_x0 != 0:
+            x0, x1 = x0 + mb_x0, x1 + mb_x0
+        # Come pdfplumber.utils.rect_to_edges: lato superiore, inferiore, sinistro, destro
+        rects_h.append([top, x0, x1, width])
+        rects_h.append([top + rect_height, x0, x1, width])
+        rects_v.append([x0, top, bottom, rect_height])
+        rects_v.append([x1, top, bottom, rect_height])
+    
+    def paint(path, ctm):
+        # Come PDFLayoutAnalyzer.paint_path: solo segmenti e rettangoli
+        shape = ''.join(segment[0] for segment in path)
+        if shape[:1] != 'm':
+            return
+        if shape.count('m') > 1:
+            for match in re.finditer(r'm[^m]+', shape):
+                paint(path[match.start():match.end()], ctm)
+            return
+        
+        pts = [apply_matrix_pt(ctm, segment[-2:] if segment[0] != 'h' else path[0][-2:]) for segment in path]
+        if len(shape) > 3 and shape[-2:] == 'lh' and pts[-2] == pts[0]:
+            shape = shape[:-2] + 'h'
+            pts.pop()
+        
+        if shape in ('mlh', 'ml'):
+            add_line(pts[:2])
+        elif shape in ('mlllh', 'mllll'):
+            (x0, y0), (x1, y1), (x2, y2), (x3, y3), _ = pts
+            if pts[0] == pts[4] and ((x0 == x1 and y1 == y2 and x2 == x3 and y3 == y0)
+                                     or (y0 == y1 and x1 == x2 and y2 == y3 and x3 == x0)):
+                add_rect(pts[0], pts[2])
+            else:
+                raise LayoutDeviation("poligono")
+        else:
+            raise LayoutDeviation("curva")
+    
+    # Stato grafico e del testo come in PDFPageInterpreter (q/Q salvano anche il testo)
+    ctm = (1, 0, 0, 1, -x0_page, -y0_page)
+    font = None
+    fontsize = 0
+    charspace = 0
+    wordspace = 0
+    scaling = 100
+    leading = 0
+    rise = 0
+    text_matrix = (1, 0, 0, 1, 0, 0)
+    line_matrix = (0, 0)
+    state_stack = []
+    path = []
+    
+    def show(seq):
+        # PDFTextDevice.render_string_horizontal + LTChar, per i soli font orizzontali
+        nonlocal line_matrix
+        if font is None:
+            raise LayoutDeviation("testo senza font")
+        matrix = mult_matrix(text_matrix, ctm)
+        scale = scaling * 0.01
+        space = charspace * scale
+        word_space = 0 if font.is_multibyte() else wordspace * scale
+        dxscale = 0.001 * fontsize * scale
+        a, b, c, d = matrix[:4]
+        if not (a * d * scale > 0 and b * c <= 0):
+            raise LayoutDeviation("testo ruotato")
+        descent = font.get_descent() * fontsize
+        glyphs = glyph_cache.setdefault(font, {})
+        
+        x, y = line_matrix
+        need_space = False
+        for item in seq:
+            if isinstance(item, float):
+                x -= item * dxscale
+                need_space = True
+                continue
+            if not isinstance(item, bytes):
+                raise LayoutDeviation("operando di testo non valido")
+            for cid in font.decode(item):
+                if need_space:
+                    x += space
+                glyph = glyphs.get(cid)
+                if glyph is None:
+                    try:
+                        text = font.to_unichr(cid)
+                    except PDFUnicodeNotDefined:
+                        text = f"(cid:{cid})"
+                    glyph = glyphs[cid] = (text, font.char_width(cid))
+                adv = glyph[1] * fontsize * scale
+                x0, y0, x1, y1 = apply_matrix_rect(translate_matrix(matrix, (x, y)),
+                                                   (0, descent + rise, adv, descent + rise + fontsize))
+                if x1 < x0:
+                    x0, x1 = x1, x0
+                if y1 < y0:
+                    y0, y1 = y1, y0
+                if mb_x0 != 0:
+                    x0, x1 = x0 + mb_x0, x1 + mb_x0
+                chars.append((glyph[0], x0, x1, (height - y1) + mb_top, (height - y0) + mb_top))
+                x += adv
+                if cid == 32 and word_space:
+                    x += word_space
+                need_space = True
+        line_matrix = (x, y)
+    
+    data = b'\n'.join(resolve1(stream).get_data() for stream in page.page_obj.contents)
+    operands = []
+    nested = []
+    for match in _TOKEN.finditer(data):
+        token = match.group()
+        first = token[0]
+        
+        if first in _NUMBER_START:
+            try:
+                operands.append(float(token))
+            except ValueError:
+                raise LayoutDeviation(f"numero non valido: {token[:20]!r}")
+            continue
+        if first == 0x28:   # (
+            if len(token) == 1:
+                raise LayoutDeviation("stringa non chiusa o con più livelli di parentesi")
+            raw = token[1:-1]
+            operands.append(_unescape(raw) if b'\\' in raw else raw)
+            continue
+        if first == 0x2F:   # /
+            operands.append(_name(token))
+            continue
+        if token in (b'[', b'<<'):
+            nested.append(operands)
+            operands = []
+            continue
+        if token in (b']', b'>>'):
+            if not nested:
+                raise LayoutDeviation("delimitatore non bilanciato")
+            value = operands
+            operands = nested.pop()
+            operands.append(value)
+            continue
+        if first == 0x3C:   # <
+            if len(token) == 1:
+                raise LayoutDeviation("stringa esadecimale non chiusa")
+            digits = re.sub(rb'\s', b'', token[1:-1])
+            if len(digits) % 2:
+                raise LayoutDeviation("stringa esadecimale dispari")
+            operands.append(bytes.fromhex(digits.decode('ascii')))
+            continue
+        if first == 0x25:   # %
+            continue
+        
+        op = token
+        if op == b'Td' or op == b'TD':
+            tx, ty = operands[-2:]
+            a, b, c, d, e, f = text_matrix
+            text_matrix = (a, b, c, d, tx * a + ty * c + e, tx * b + ty * d + f)
+            line_matrix = (0, 0)
+            if op == b'TD':
+                # Segni di pdfminer: TD salva ty, TL il valore cambiato di segno,
+                # e T* somma leading alla riga corrente
+                leading = ty
+        elif op == b'Tj':
+            show(operands[-1:])
+        elif op == b'm':
+            path.append(('m', operands[-2], operands[-1]))
+        elif op == b'l':
+            path.append(('l', operands[-2], operands[-1]))
+        elif op in _FILL_OPERATORS:
+            paint(path, ctm)
+            path = []
+        elif op == b'Tf':
+            font_id, size = operands[-2:]
+            # Anche i font Type3: FontMatrix entra in char_width e get_descent di pdfminer
+            font = fonts.get(font_id)
+            if font is None or font.is_vertical():
+                raise LayoutDeviation(f"font non gestito: {font_id}")
+            fontsize = size
+        elif op in _IGNORED_OPERATORS:
+            pass
+        elif op == b'cm':
+            ctm = mult_matrix(tuple(operands[-6:]), ctm)
+        elif op == b'BT':
+            text_matrix = (1, 0, 0, 1, 0, 0)
+            line_matrix = (0, 0)
+        elif op == b'ET':
+            pass
+        elif op == b'Tm':
+            text_matrix = tuple(operands[-6:])
+            line_matrix = (0, 0)
+        elif op == b'Ts':
+            rise = operands[-1]
+        elif op == b'q':
+            state_stack.append((ctm, font, fontsize, charspace, wordspace, scaling, leading, rise,
+                                text_matrix, line_matrix))
+        elif op == b'Q':
+            if state_stack:
+                (ctm, font, fontsize, charspace, wordspace, scaling, leading, rise,
+                 text_matrix, line_matrix) = state_stack.pop()
+        elif op == b're':
+            x, y, w, h = operands[-4:]
+            path.extend((('m', x, y), ('l', x + w, y), ('l', x + w, y + h), ('l', x, y + h), ('h',)))
+        elif op == b'h':
+            path.append(('h',))
+        elif op in _CLOSE_FILL_OPERATORS:
+            path.append(('h',))
+            paint(path, ctm)
+            path = []
+        elif op == b'n':
+            path = []
+        elif op == b'TJ':
+            show(operands[-1])
+        elif op == b'Tc':
+            charspace = operands[-1]
+        elif op == b'Tw':
+            wordspace = operands[-1]
+        elif op == b'Tz':
+            scaling = operands[-1]
+        elif op == b'TL':
+            leading = -operands[-1]
+        elif op in (b'T*', b"'"):
+            a, b, c, d, e, f = text_matrix
+            text_matrix = (a, b, c, d, leading * c + e, leading * d + f)
+            line_matrix = (0, 0)
+            if op == b"'":
+                show(operands[-1:])
+        elif op == b'"':
+            # Come pdfminer (do__w): imposta le spaziature ma non va a capo
+            wordspace, charspace = operands[-3:-1]
+            show(operands[-1:])
+        else:
+            raise LayoutDeviation(f"operatore non gestito: {op[:20].decode('latin-1')}")
+        operands = []
+    
+    return PageObjects(chars, lines_v + rects_v, lines_h + rects_h)
+
+# ============================================================================
+# GRIGLIA (strategia "lines" di pdfplumber)
+# ============================================================================
+
+def _cluster_indexes(values: List[float], tolerance: float) -> Dict[float, int]:
+    """Indice del gruppo di ogni valore, come pdfplumber.utils.make_cluster_dict"""
+    indexes = {}
+    index = -1
+    last = None
+    for value in sorted(set(values)):
+        if last is None or value > last + tolerance:
+            index += 1
+        indexes[value] = index
+        last = value
+    return indexes
+
+def _snap(edges: List[list], tolerance: float) -> List[list]:
+    """Allinea alla media del gruppo le posizioni (primo campo) entro la tolleranza, come snap_objects"""
+    indexes = _cluster_indexes([edge[0] for edge in edges], tolerance)
+    snapped = []
+    for _, group in groupby(sorted(edges, key=lambda edge: indexes[edge[0]]), key=lambda edge: indexes[edge[0]]):
+        group = list(group)
+        average = sum(edge[0] for edge in group) / len(group)
+        snapped.extend([edge[0] + (average - edge[0])] + edge[1:] for edge in group)
+    return snapped
+
+def _join(edges: List[list], tolerance: float, horizontal: bool) -> List[list]:
+    """
+    Unisce i bordi sulla stessa posizione che si toccano entro la tolleranza,
+    come join_edge_group (resize_object ricalcola la larghezza da x0, l'altezza
+    aggiungendo lo spostamento del fondo)
+    """
+    joined = []
+    for _, group in groupby(sorted(edges, key=lambda edge: edge[0]), key=lambda edge: edge[0]):
+        group = sorted(group, key=lambda edge: edge[1])
+        merged = [list(group[0])]
+        for edge in group[1:]:
+            last = merged[-1]
+            if edge[1] <= last[2] + tolerance:
+                if edge[2] > last[2]:
+                    last[3] = edge[2] - last[1] if horizontal else last[3] + (edge[2] - last[2])
+                    last[2] = edge[2]
+            else:
+                merged.append(list(edge))
+        joined.extend(merged)
+    return joined
+
+def merge_page_edges(objects: PageObjects) -> Tuple[List[list], List[list]]:
+    """Bordi verticali e orizzontali della tabella, come TableFinder.get_edges con la strategia "lines" """
+    v_edges = [edge for edge in objects.v_edges if edge[3] >= EDGE_MIN_LENGTH_PREFILTER]
+    h_edges = [edge for edge in objects.h_edges if edge[3] >= EDGE_MIN_LENGTH_PREFILTER]
+    v_edges = _join(_snap(v_edges, SNAP_TOLERANCE), JOIN_TOLERANCE, horizontal=False)
+    h_edges = _join(_snap(h_edges, SNAP_TOLERANCE), JOIN_TOLERANCE, horizontal=True)
+    return ([edge for edge in v_edges if edge[3] >= EDGE_MIN_LENGTH],
+            [edge for edge in h_edges if edge[3] >= EDGE_MIN_LENGTH])
+
+def edges_to_intersections(v_edges: List[list], h_edges: List[list]) -> Dict[Tuple[float, float], Tuple[set, set]]:
+    """Punto (x, top) → (indici dei bordi verticali, indici dei bordi orizzontali) che vi si incrociano"""
+    tolerance = INTERSECTION_TOLERANCE
+    intersections = {}
+    v_order = sorted(range(len(v_edges)), key=lambda i: (v_edges[i][0], v_edges[i][1]))
+    h_order = sorted(range(len(h_edges)), key=lambda i: (h_edges[i][0], h_edges[i][1]))
+    for v in v_order:
+        x, top, bottom = v_edges[v][:3]
+        for h in h_order:
+            y, x0, x1 = h_edges[h][:3]
+            if top <= y + tolerance and bottom >= y - tolerance and x0 - tolerance <= x <= x1 + tolerance:
+                vertical, horizontal = intersections.setdefault((x, y), (set(), set()))
+                vertical.add(v)
+                horizontal.add(h)
+    return intersections
+
+def intersections_to_cells(intersections: Dict[Tuple[float, float], Tuple[set, set]]) -> List[tuple]:
+    """Celle (x0, top, x1, bottom): il rettangolo più piccolo con i quattro angoli collegati da bordi"""
+    points = sorted(intersections)
+    by_x: Dict[float, List[tuple]] = {}
+    by_y: Dict[float, List[tuple]] = {}
+    for point in points:
+        by_x.setdefault(point[0], []).append(point)
+        by_y.setdefault(point[1], []).append(point)
+    
+    def connected(a, b):
+        if a[0] == b[0] and intersections[a][0] & intersections[b][0]:
+            return True
+        if a[1] == b[1] and intersections[a][1] & intersections[b][1]:
+            return True
+        return False
+    
+    cells = []
+    for point in points:
+        below = [other for other in by_x[point[0]] if other[1] > point[1]]
+        right = [other for other in by_y[point[1]] if other[0] > point[0]]
+        cell = None
+        for below_point in below:
+            if not connected(point, below_point):
+                continue
+            for right_point in right:
+                if not connected(point, right_point):
+                    continue
+                corner = (right_point[0], below_point[1])
+                if corner in intersections and connected(corner, right_point) and connected(corner, below_point):
+                    cell = (point[0], point[1], corner[0], corner[1])
+                    break
+            if cell is not None:
+                break
+        if cell is not None:
+            cells.append(cell)
+    return cells
+
+def cells_to_tables(cells: List[tuple]) -> List[List[tuple]]:
+    """Raggruppa le celle che condividono un angolo, come pdfplumber.table.cells_to_tables"""
+    remaining = list(cells)
+    corners = set()
+    current: List[tuple] = []
+    tables = []
+    while remaining:
+        count = len(current)
+        for cell in list(remaining):
+            x0, top, x1, bottom = cell
+            cell_corners = ((x0, top), (x0, bottom), (x1, top), (x1, bottom))
+            if not current or any(corner in corners for corner in cell_corners):
+                corners.update(cell_corners)
+                current.append(cell)
+                remaining.remove(cell)
+        if len(current) == count:
+            tables.append(current)
+            corners = set()
+            current = []
+    if current:
+        tables.append(current)
+    
+    tables.sort(key=lambda table: min((cell[1], cell[0]) for cell in table))
+    return [table for table in tables if len(table) > 1]
+
+def table_rows(cells: List[tuple]) -> List[List[Optional[tuple]]]:
+    """Righe della tabella, con None dove una colonna non ha celle (come Table.rows)"""
+    columns = sorted(set(cell[0] for cell in cells))
+    rows = []
+    for _, row_cells in groupby(sorted(cells, key=lambda cell: (cell[1], cell[0])), key=lambda cell: cell[1]):
+        by_x = {cell[0]: cell for cell in row_cells}
+        rows.append([by_x.get(x) for x in columns])
+    return rows
+
+def find_tables(objects: PageObjects) -> List[List[tuple]]:
+    """Celle di ogni tabella della pagina, nell'ordine di page.find_tables()"""
+    v_edges, h_edges = merge_page_edges(objects)
+    return cells_to_tables(intersections_to_cells(edges_to_intersections(v_edges, h_edges)))
+
+# ============================================================================
+# TESTO
+# ============================================================================
+
+def _cluster(items: List, key, tolerance: float) -> List[List]:
+    """Gruppi di oggetti con chiave entro la tolleranza, come cluster_objects"""
+    indexes = _cluster_indexes([key(item) for item in items], tolerance)
+    ordered = sorted(items, key=lambda item: indexes[key(item)])
+    return [list(group) for _, group in groupby(ordered, key=lambda item: indexes[key(item)])]
+
+def chars_to_text(chars: List[tuple]) -> str:
+    """Testo dei caratteri (testo, x0, x1, top, bottom), come pdfplumber.utils.extract_text senza layout"""
+    words = []
+    
+    def flush(word):
+        if word:
+            words.append((''.join(LIGATURES.get(char[0], char[0]) for char in word), min(char[3] for char in word)))
+    
+    for line in _cluster(chars, lambda char: char[3], TEXT_TOLERANCE):
+        word = []
+        for char in sorted(line, key=lambda char: char[1]):
+            text = char[0]
+            if text.isspace():
+                flush(word)
+                word = []
+            elif text == '':
+                # '' in '' per split_at_punctuation: il carattere è una parola a sé
+                flush(word)
+                flush([char])
+                word = []
+            elif word and (char[1] < word[-1][1] or char[1] > word[-1][2] + TEXT_TOLERANCE
+                           or abs(char[3] - word[-1][3]) > TEXT_TOLERANCE):
+                flush(word)
+                word = [char]
+            else:
+                word.append(char)
+        flush(word)
+    
+    lines = _cluster(words, lambda word: word[1], TEXT_TOLERANCE)
+    return '\n'.join(' '.join(word[0] for word in line) for line in lines)
+
+def extract_table(cells: List[tuple], chars: List[tuple]) -> List[List[Optional[str]]]:
+    """
+    Testo delle celle riga per riga, come Table.extract(): i caratteri vengono
+    ordinati una volta per centro verticale e ogni cella prende i propri con
+    una ricerca binaria, tornando poi all'ordine del content stream
+    """
+    middles = [((char[3] + char[4]) / 2, (char[1] + char[2]) / 2, index) for index, char in enumerate(chars)]
+    middles.sort()
+    v_middles = [middle[0] for middle in middles]
+    
+    table = []
+    for row in table_rows(cells):
+        texts = []
+        for cell in row:
+            if cell is None:
+                texts.append(None)
+                continue
+            x0, top, x1, bottom = cell
+            start, end = bisect_left(v_middles, top), bisect_left(v_middles, bottom)
+            picked = sorted(index for _, h_middle, index in middles[start:end] if x0 <= h_middle < x1)
+            texts.append(chars_to_text([chars[index] for index in picked]) if picked else '')
+        table.append(texts)
+    return table
+
+# ============================================================================
+# MODELLO DELLA GRIGLIA
+# ============================================================================
+
+class GridTemplate(NamedTuple):
+    """Bordi della griglia: inizio di ogni colonna e riga, più il bordo destro e quello inferiore"""
+    columns: List[float]
+    rows: List[float]
+
+def table_template(cells: List[tuple]) -> GridTemplate:
+    """Modello della griglia di una tabella"""
+    return GridTemplate(
+        columns=sorted(set(cell[0] for cell in cells)) + [max(cell[2] for cell in cells)],
+        rows=sorted(set(cell[1] for cell in cells)) + [max(cell[3] for cell in cells)]
+    )
+
+def fits_template(template: GridTemplate, cells: List[tuple]) -> bool:
+    """
+    True se la tabella ha gli stessi bordi esterni del modello e ogni suo bordo
+    interno cade (entro TEMPLATE_TOLERANCE) su un bordo del modello
+    """
+    page = table_template(cells)
+    
+    def matches(values, reference):
+        return (abs(values[0] - reference[0]) <= TEMPLATE_TOLERANCE
+                and abs(values[-1] - reference[-1]) <= TEMPLATE_TOLERANCE
+                and all(any(abs(value - edge) <= TEMPLATE_TOLERANCE for edge in reference) for value in values))
+    
+    return matches(page.columns, template.columns) and matches(page.rows, template.rows)
+
+def load_template(template_path: str) -> GridTemplate:
+    with open(template_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != TEMPLATE_VERSION:
+        raise ValueError(f"Versione modello della griglia non supportata: {data.get('version')}")
+    return GridTemplate(columns=data['columns'], rows=data['rows'])
+
+def save_template(template: GridTemplate, template_path: str):
+    """Salva il modello (con un rename atomico: i worker paralleli possono scriverlo insieme)"""
+    data = {
+        'version': TEMPLATE_VERSION,
+        'columns': [round(x, 2) for x in template.columns],
+        'rows': [round(y, 2) for y in template.rows]
+    }
+    write_atomic(Path(template_path), [json.dumps(data, indent=2).encode('utf-8')])
+
+# ============================================================================
+# MOTORE
+# ============================================================================
+
+def _content_hash(path) -> str:
+    """Hash SHA-256 del contenuto di un file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class GridEngine:
+    """
+    Tabelle delle pagine dalla griglia, con l'estrattore generico come riferimento
+    
+    read_tables() restituisce le tabelle di una pagina come page.extract_tables(),
+    oppure None se la pagina va analizzata con pdfplumber (costrutti non gestiti,
+    più di una tabella, griglia fuori modello o con un numero di colonne diverso).
+    Quando needs_validation è True le tabelle lette vanno confrontate con quelle
+    generiche tramite validate(): succede per la prima pagina di ogni documento
+    e poi ogni VALIDATE_EVERY pagine lette dalla griglia. Alla prima pagina
+    concorde il documento è verificato e, se manca, il modello viene appreso;
+    alla prima discorde il documento viene scartato e le sue pagine successive
+    passano all'estrattore generico. I documenti sono riconosciuti dall'hash
+    del contenuto, non dal percorso; i messaggi passano da log (quello
+    dell'estrattore li omette in modalità silenziosa).
+    """
+    
+    def __init__(self, template_path: Optional[str] = None, log=print):
+        self.template_path = template_path
+        self.log = log
+        self.template_from_file = bool(template_path) and Path(template_path).exists()
+        self.template: Optional[GridTemplate] = load_template(template_path) if self.template_from_file else None
+        self._verified = set()
+        self._rejected = set()
+        self._unchecked = 0
+        self._document = None
+        self._pdf = None
+        self._glyphs: Dict = {}
+        self._cells: Optional[List[tuple]] = None
+    
+    @property
+    def validated(self) -> bool:
+        return self._document in self._verified
+    
+    @property
+    def needs_validation(self) -> bool:
+        """True se le tabelle dell'ultima read_tables() vanno confrontate con quelle generiche"""
+        return not self.validated or self._unchecked >= VALIDATE_EVERY
+    
+    def _switch_document(self, page):
+        if page.pdf is self._pdf:
+            return
+        # Font e glifi appartengono al PDF aperto: la cache vale solo per quello
+        self._pdf = page.pdf
+        self._glyphs = {}
+        # Il documento è il contenuto del file, non il percorso: un PDF
+        # riscritto nello stesso posto va verificato di nuovo
+        path = getattr(page.pdf, 'path', None)
+        document = _content_hash(path) if path else str(id(page.pdf))
+        if document != self._document:
+            self._document = document
+            self._unchecked = 0
+            if not self.template_from_file:
+                self.template = None
+    
+    def read_tables(self, page) -> Optional[List[List[List[Optional[str]]]]]:
+        self._switch_document(page)
+        if self._document in self._rejected:
+            return None
+        try:
+            objects = read_page_objects(page, self._glyphs)
+        except LayoutDeviation:
+            return None
+        
+        tables = find_tables(objects)
+        if len(tables) != 1 or (self.template is not None and not fits_template(self.template, tables[0])):
+            return None
+        table = extract_table(tables[0], objects.chars)
+        # Ogni riga deve avere tutte le colonne del modello, oltre a cadere sui suoi bordi
+        if self.template is not None and any(len(row) != len(self.template.columns) - 1 for row in table):
+            return None
+        self._cells = tables[0]
+        self._unchecked += 1
+        return [table]
+    
+    def validate(self, page_number: int, tables: List, generic_tables: List) -> bool:
+        """
+        Confronta le tabelle lette da read_tables() con quelle di page.extract_tables()
+        
+        Returns:
+            True se coincidono (il documento è verificato)
+        """
+        if tables != generic_tables:
+            self._verified.discard(self._document)
+            self._rejected.add(self._document)
+            self.log(f"⚠️  Pagina {page_number}: la griglia non coincide con l'estrattore generico, "
+                     f"uso pdfplumber per le altre pagine del documento")
+            return False
+        
+        self._verified.add(self._document)
+        self._unchecked = 0
+        if self.template is None:
+            self.template = table_template(self._cells)
+            if self.template_path:
+                save_template(self.template, self.template_path)
+                self.log(f"📐 Modello della griglia salvato: {self.template_path}")
+        return True
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def check(pdf_path: str, template_path: Optional[str] = None) -> Dict:
+    """
+    Confronta su ogni pagina le tabelle della griglia con page.extract_tables()
+    
+    Returns:
+        Pagine identiche, passate all'estrattore generico e diverse, con il tempo
+        medio per pagina (in ms) dei due metodi
+    """
+    import pdfplumber
+    
+    engine = GridEngine(template_path)
+    result = {'pages': 0, 'identical': [], 'fallback': [], 'different': [], 'grid_ms': 0.0, 'generic_ms': 0.0}
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_number, page in enumerate(pdf.pages, 1):
+            start = time.perf_counter()
+            tables = engine.read_tables(page)
+            result['grid_ms'] += (time.perf_counter() - start) * 1000
+            
+            start = time.perf_counter()
+            generic_tables = page.extract_tables()
+            result['generic_ms'] += (time.perf_counter() - start) * 1000
+            page.close()
+            
+            result['pages'] += 1
+            if tables is None:
+                result['fallback'].append(page_number)
+            elif tables == generic_tables:
+                result['identical'].append(page_number)
+                if engine.needs_validation:
+                    engine.validate(page_number, tables, generic_tables)
+            else:
+                result['different'].append(page_number)
+    
+    result['grid_ms'] /= max(result['pages'], 1)
+    result['generic_ms'] /= max(result['pages'], 1)
+    return result
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Confronta la griglia rapida con l'estrattore generico di pdfplumber")
+    parser.add_argument('pdf_path', help="PDF dell'orario")
+    parser.add_argument('--template', metavar='FILE',
+                        help="modello della griglia da usare (o da creare, se non esiste)")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    
+    if not Path(args.pdf_path).exists():
+        print(f"❌ File non trovato: {args.pdf_path}")
+        sys.exit(1)
+    
+    result = check(args.pdf_path, args.template)
+    
+    def pages(numbers):
+        return f" (pagine {', '.join(map(str, numbers))})" if numbers else ""
+    
+    print(f"Pagine:                {result['pages']}")
+    print(f"Identiche:             {len(result['identical'])}")
+    print(f"Estrattore generico:   {len(result['fallback'])}{pages(result['fallback'])}")
+    print(f"Diverse:               {len(result['different'])}{pages(result['different'])}")
+    print(f"pdfplumber:            {result['generic_ms']:.1f} ms per pagina")
+    print(f"Griglia:               {result['grid_ms']:.1f} ms per pagina "
+          f"({result['generic_ms'] / result['grid_ms']:.1f}× più veloce)")
+    
+    if result['different']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -7,21 +7,65 @@ Requisiti:
     pip install PyPDF2 pdfplumber tabula-py pandas
 
 Uso:
-    python pdf_timetable_extractor.py <percorso_pdf>
+    python pdf_timetable_extractor.py <percorso_pdf> [--workers N] [--cache FILE] [--compact FILE] [--indexes FILE] [--timeline FILE] [--store FILE] [--conflicts FILE]
+        [--delta PRECEDENTE FILE] [--no-views] [--quiet] [--profile FILE] [--trace FILE]
+    python pdf_timetable_extractor.py --batch <cartella|glob> [--output-dir DIR] [--jobs N]
+    python pdf_timetable_extractor.py <percorso_pdf> --class "5A INF" [--page-index FILE]
+    python pdf_timetable_extractor.py extract <percorso_pdf> [...]     (come sopra)
+    python pdf_timetable_extractor.py query teacher|room|free|build [...]
+    python pdf_timetable_extractor.py diff <precedente.json> <nuovo.json> <delta.json>
+    python pdf_timetable_extractor.py validate <orari_tutte_classi.json> [--ignore TIPO]
+
+pdfplumber viene importato solo per leggere un PDF: query, diff,
+validate e le estrazioni con --cache di un PDF invariato partono senza.
 """
 
+from __future__ import annotations
+
+import os
 import sys
 import json
 import re
-from typing import List, Dict, Tuple, Optional
+import argparse
+import hashlib
+import time
+from collections import deque
+from contextlib import ExitStack, redirect_stdout
+from functools import lru_cache
+from typing import List, Dict, Tuple, Optional, Iterator, Iterable, NamedTuple, Callable, TYPE_CHECKING
 from pathlib import Path
 
-try:
-    import pdfplumber
-except ImportError:
-    print("❌ Errore: pdfplumber non installato")
-    print("Installa con: pip install pdfplumber")
-    sys.exit(1)
+from schedule_json import encode_class, iter_all_classes_json, write_atomic, ParallelWriter
+
+if TYPE_CHECKING:
+    # Solo per le annotazioni: schedule_views importa a sua volta l'estrattore
+    from schedule_views import ScheduleViews
+
+# pdfplumber (con pdfminer) costa ~0.15 s di import: viene caricato da
+# require_pdf_stack solo quando serve davvero leggere un PDF
+pdfplumber = None
+resolve1 = None
+
+def require_pdf_stack():
+    """Importa pdfplumber e pdfminer (una volta sola)"""
+    global pdfplumber, resolve1
+    if pdfplumber is not None:
+        return
+    
+    try:
+        import pdfplumber as pdfplumber_module
+        from pdfminer.pdftypes import resolve1 as resolve1_function
+    except ImportError:
+        print("❌ Errore: pdfplumber non installato", file=sys.stderr)
+        print("Installa con: pip install pdfplumber", file=sys.stderr)
+        sys.exit(1)
+    
+    pdfplumber, resolve1 = pdfplumber_module, resolve1_function
+
+def open_pdf(pdf_path: str, **kwargs):
+    """pdfplumber.open, importando prima lo stack PDF"""
+    require_pdf_stack()
+    return pdfplumber.open(pdf_path, **kwargs)
 
 # ============================================================================
 # CONFIGURAZIONE SCANSIONI ORARIE
@@ -85,37 +129,9 @@ SCHEDULES = {
     }
 }
 
-SUBJECT_COLORS = {
-    "Inglese": "#42a5f5",
-    "Lingua inglese": "#42a5f5",
-    "Sistemi e reti": "#66bb6a",
-    "Sistemi automatici": "#66bb6a",
-    "Informatica": "#7e57c2",
-    "Tecnologie informatiche": "#7e57c2",
-    "T.P.S.I.T.": "#ffa726",
-    "T.P.S.E.E.": "#ffa726",
-    "Gestione progetto": "#26a69a",
-    "Matematica": "#ef5350",
-    "Italiano": "#8d6e63",
-    "Storia": "#6d4c41",
-    "Religione": "#fbc02d",
-    "Ginnastica": "#ff7043",
-    "Scienze motorie": "#ff7043",
-    "Telecomunicazioni": "#9c27b0",
-    "Elettrotecnica": "#f44336",
-    "Meccanica": "#795548",
-    "Francese": "#4fc3f7",
-    "Spagnolo": "#ffa726",
-    "Economia aziendale": "#4caf50",
-    "Diritto": "#2196f3",
-    "Fisica": "#ff5722",
-    "Chimica": "#00bcd4",
-    "Geografia": "#8bc34a",
-    "Filosofia": "#673ab7",
-    "Scienze naturali": "#4caf50",
-    "Arte": "#ff9800",
-    "INTERVALLO": "#ffd54f"
-}
+# Tabella materia → colore: le chiavi vengono confrontate in ordine,
+# la prima che contiene la materia (o è contenuta in essa) vince
+SUBJECT_COLORS_PATH = Path(__file__).resolve().parent / "subject_colors.json"
 
 DAYS_MAP = {
     'Lunedì': 1, 'Lun': 1, 'LUN': 1,
@@ -126,19 +142,310 @@ DAYS_MAP = {
     'Sabato': 6, 'Sab': 6, 'SAB': 6
 }
 
+# ============================================================================
+# STRUMENTAZIONE
+# ============================================================================
+
+# Messaggi di avanzamento per pagina/classe/lezione (disattivati da --quiet)
+VERBOSE = True
+
+def log(message: str):
+    """Messaggio di avanzamento, omesso in modalità silenziosa"""
+    if VERBOSE:
+        print(message)
+
+def set_verbose(verbose: bool):
+    global VERBOSE
+    VERBOSE = verbose
+
+class Profiler:
+    """
+    Tempi e conteggi delle fasi dell'estrazione
+    
+    Le statistiche aggregate per fase sono sempre raccolte (costano una
+    chiamata a perf_counter); il dettaglio per pagina e per classe e gli
+    eventi per il trace solo se abilitati con configure(). Altri strumenti
+    possono registrarsi con add_listener e ricevere ogni fase misurata.
+    """
+    
+    def __init__(self):
+        self.phases: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.detailed = False
+        self.tracing = False
+        self.listeners: List[Callable[[str, float, float, Optional[int], Optional[str]], None]] = []
+        
+        # Contesto corrente: le fasi vengono attribuite alla pagina o alla classe in corso
+        self.page: Optional[int] = None
+        self.class_name: Optional[str] = None
+        
+        self.page_phases: Dict[int, Dict[str, List[float]]] = {}
+        self.page_classes: Dict[int, str] = {}
+        self.class_phases: Dict[str, Dict[str, List[float]]] = {}
+        self.events: List[Tuple] = []
+    
+    def configure(self, detailed: bool = False, tracing: bool = False):
+        self.detailed = detailed or tracing
+        self.tracing = tracing
+    
+    def reset(self):
+        """Azzera i dati raccolti mantenendo la configurazione"""
+        self.phases.clear()
+        self.counters.clear()
+        self.page_phases.clear()
+        self.page_classes.clear()
+        self.class_phases.clear()
+        self.events.clear()
+        self.page = self.class_name = None
+    
+    def add_listener(self, listener: Callable[[str, float, float, Optional[int], Optional[str]], None]):
+        """listener(fase, inizio, fine, pagina, classe) viene chiamato per ogni fase misurata"""
+        self.listeners.append(listener)
+    
+    def begin_page(self, page_num: int):
+        self.page = page_num
+        self.class_name = None
+    
+    def set_class(self, class_name: Optional[str]):
+        self.class_name = class_name
+        if self.page is not None and class_name:
+            self.page_classes[self.page] = class_name
+    
+    def end_page(self):
+        self.page = self.class_name = None
+    
+    def record(self, name: str, start: float):
+        """Accumula nella fase indicata il tempo trascorso da start (time.perf_counter())"""
+        end = time.perf_counter()
+        _add_phase(self.phases, name, end - start)
+        
+        if self.detailed:
+            if self.page is not None:
+                _add_phase(self.page_phases.setdefault(self.page, {}), name, end - start)
+            elif self.class_name:
+                _add_phase(self.class_phases.setdefault(self.class_name, {}), name, end - start)
+            if self.tracing:
+                self.events.append((name, start, end, os.getpid(), self.page, self.class_name))
+        
+        for listener in self.listeners:
+            listener(name, start, end, self.page, self.class_name)
+    
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def export(self) -> Dict:
+        """Dati raccolti, da restituire da un processo worker"""
+        return {
+            'phases': self.phases,
+            'counters': self.counters,
+            'pagePhases': self.page_phases,
+            'pageClasses': self.page_classes,
+            'classPhases': self.class_phases,
+            'events': self.events
+        }
+    
+    def merge(self, other: Dict):
+        """Somma ai dati locali quelli raccolti in un altro processo"""
+        _merge_phases(self.phases, other['phases'])
+        for name, amount in other['counters'].items():
+            self.count(name, amount)
+        for page_num, phases in other['pagePhases'].items():
+            _merge_phases(self.page_phases.setdefault(page_num, {}), phases)
+        self.page_classes.update(other['pageClasses'])
+        for class_name, phases in other['classPhases'].items():
+            _merge_phases(self.class_phases.setdefault(class_name, {}), phases)
+        self.events.extend(other['events'])
+    
+    def profile(self) -> Dict:
+        """Report per fase, per pagina e per classe (le fasi di pagina vanno alla sua classe)"""
+        by_class: Dict[str, Dict[str, List[float]]] = {}
+        for page_num, phases in self.page_phases.items():
+            class_name = self.page_classes.get(page_num)
+            if class_name:
+                _merge_phases(by_class.setdefault(class_name, {}), phases)
+        for class_name, phases in self.class_phases.items():
+            _merge_phases(by_class.setdefault(class_name, {}), phases)
+        
+        def table(phases: Dict[str, List[float]]) -> Dict:
+            return {name: {'seconds': round(seconds, 6), 'calls': int(calls)}
+                    for name, (seconds, calls) in phases.items()}
+        
+        return {
+            'phases': table(self.phases),
+            'counters': dict(self.counters),
+            'pages': {str(page_num): {'class': self.page_classes.get(page_num), 'phases': table(phases)}
+                      for page_num, phases in sorted(self.page_phases.items())},
+            'classes': {class_name: table(phases) for class_name, phases in sorted(by_class.items())}
+        }
+    
+    def chrome_trace(self) -> Dict:
+        """Eventi nel formato Chrome trace (apribile anche con speedscope e Perfetto)"""
+        origin = min((event[1] for event in self.events), default=0.0)
+        trace_events = []
+        for name, start, end, pid, page_num, class_name in sorted(self.events, key=lambda e: e[1]):
+            args = {}
+            if page_num is not None:
+                args['page'] = page_num
+            if class_name or page_num in self.page_classes:
+                args['class'] = class_name or self.page_classes[page_num]
+            trace_events.append({
+                'name': name, 'cat': 'extractor', 'ph': 'X', 'pid': pid, 'tid': pid,
+                'ts': round((start - origin) * 1e6, 1), 'dur': round((end - start) * 1e6, 1), 'args': args
+            })
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+    
+    def report(self, top: int = 5):
+        """Stampa i tempi per fase e le pagine più lente"""
+        total = sum(seconds for seconds, _ in self.phases.values())
+        print("\n⏱️  Tempi per fase:")
+        for name, (seconds, calls) in sorted(self.phases.items(), key=lambda item: -item[1][0]):
+            share = seconds / total if total else 0
+            print(f"   {name:<10} {seconds:>8.3f} s  {share:>6.1%}  ({int(calls)} chiamate)")
+        if self.counters:
+            print("   " + ", ".join(f"{name}: {amount}" for name, amount in sorted(self.counters.items())))
+        
+        slowest = sorted(self.page_phases.items(), key=lambda item: -sum(s for s, _ in item[1].values()))[:top]
+        if slowest:
+            print("   Pagine più lente:")
+            for page_num, phases in slowest:
+                seconds = sum(s for s, _ in phases.values())
+                main_phase = max(phases, key=lambda name: phases[name][0])
+                print(f"     - pagina {page_num} ({self.page_classes.get(page_num, '?')}): "
+                      f"{seconds:.3f} s, soprattutto {main_phase}")
+
+def _add_phase(phases: Dict[str, List[float]], name: str, seconds: float, calls: int = 1):
+    stats = phases.setdefault(name, [0.0, 0])
+    stats[0] += seconds
+    stats[1] += calls
+
+def _merge_phases(phases: Dict[str, List[float]], other: Dict[str, List[float]]):
+    for name, (seconds, calls) in other.items():
+        _add_phase(phases, name, seconds, calls)
+
+PROFILER = Profiler()
+
+# {fase: [secondi, chiamate]}, letto da benchmark_extractor.py
+PHASE_STATS = PROFILER.phases
+
+def record_phase(name: str, start: float):
+    """Accumula nella fase indicata il tempo trascorso da start (time.perf_counter())"""
+    PROFILER.record(name, start)
+
+def save_profile(profile_path: Optional[str] = None, trace_path: Optional[str] = None):
+    """Salva il report per fase/pagina/classe e il trace degli eventi"""
+    if profile_path:
+        with open(profile_path, 'w', encoding='utf-8') as f:
+            json.dump(PROFILER.profile(), f, indent=2, ensure_ascii=False)
+        print(f"\n⏱️  Profilo salvato: {profile_path}")
+    
+    if trace_path:
+        with open(trace_path, 'w', encoding='utf-8') as f:
+            json.dump(PROFILER.chrome_trace(), f, ensure_ascii=False)
+        print(f"\n🧵 Trace salvato: {trace_path} ({len(PROFILER.events)} eventi)")
+
 # ============================================================================
 # FUNZIONI UTILITÀ
 # ============================================================================
 
-def get_color_for_subject(subject: str) -> str:
-    """Ottiene il colore per una materia"""
-    subject_clean = subject.strip()
+class SubjectColorResolver:
+    """
+    Risolve il colore di una materia con la tabella di subject_colors.json
+    
+    La tabella viene normalizzata una volta sola: le materie uguali a una chiave
+    si risolvono con un dizionario, le altre con la scansione in ordine delle
+    chiavi (stesso risultato della ricerca originale), memorizzata per materia.
+    fingerprint identifica la tabella (le lezioni in cache hanno già il colore).
+    """
+    
+    def __init__(self, config_path: Path = SUBJECT_COLORS_PATH, cache_size: int = 1024):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        
+        self.config_path = str(config_path)
+        self.default_color: str = config['default']
+        self.subject_colors: Dict[str, str] = config['subjects']
+        self.fingerprint = hashlib.sha256(json.dumps(
+            [self.default_color, list(self.subject_colors.items())], ensure_ascii=False
+        ).encode('utf-8')).hexdigest()
+        self._keys = [(key.lower(), color) for key, color in self.subject_colors.items()]
+        self._exact = {}
+        for key, _ in self._keys:
+            self._exact.setdefault(key, self._scan(key))
+        
+        self._cached = lru_cache(maxsize=cache_size)(self._resolve)
+        self._merged_hits = 0
+        self._merged_misses = 0
+        self.defaulted: set = set()
+    
+    def _scan(self, subject_lower: str) -> Optional[str]:
+        for key, color in self._keys:
+            if key in subject_lower or subject_lower in key:
+                return color
+        return None
+    
+    def _resolve(self, subject: str) -> str:
+        subject_lower = subject.strip().lower()
+        color = self._exact.get(subject_lower) or self._scan(subject_lower)
+        if color is None:
+            self.defaulted.add(subject.strip())
+            return self.default_color
+        return color
+    
+    def __call__(self, subject: str) -> str:
+        return self._cached(subject)
     
-    for key, color in SUBJECT_COLORS.items():
-        if key.lower() in subject_clean.lower() or subject_clean.lower() in key.lower():
-            return color
+    def stats(self) -> Dict:
+        info = self._cached.cache_info()
+        return {
+            'hits': info.hits + self._merged_hits,
+            'misses': info.misses + self._merged_misses,
+            'defaulted': sorted(self.defaulted)
+        }
+    
+    def reset(self):
+        """Azzera la memoizzazione e le statistiche"""
+        self._cached.cache_clear()
+        self._merged_hits = 0
+        self._merged_misses = 0
+        self.defaulted.clear()
     
-    return "#78909c"
+    def merge_stats(self, other: Dict):
+        """Somma le statistiche raccolte da un altro processo"""
+        self._merged_hits += other['hits']
+        self._merged_misses += other['misses']
+        self.defaulted.update(other['defaulted'])
+    
+    def report(self):
+        stats = self.stats()
+        lookups = stats['hits'] + stats['misses']
+        if not lookups:
+            return
+        print(f"\n🎨 Colori: cache hit {stats['hits'] / lookups:.1%} su {lookups} ricerche "
+              f"({stats['misses']} risolte con la tabella)")
+        if stats['defaulted']:
+            print(f"   ⚠️  {len(stats['defaulted'])} materie con il colore di default {self.default_color}:")
+            for subject in stats['defaulted']:
+                print(f"     - {subject}")
+
+# Creato al primo uso: chi importa l'estrattore senza risolvere colori
+# non legge (né richiede) subject_colors.json
+_COLOR_RESOLVER = None
+
+def configure_subject_colors(config_path: str):
+    """Sostituisce la tabella dei colori (anche nei worker, come initializer del pool)"""
+    global _COLOR_RESOLVER
+    _COLOR_RESOLVER = SubjectColorResolver(Path(config_path))
+
+def get_color_resolver() -> SubjectColorResolver:
+    """SubjectColorResolver condiviso dal processo, con la tabella predefinita se non configurata"""
+    global _COLOR_RESOLVER
+    if _COLOR_RESOLVER is None:
+        _COLOR_RESOLVER = SubjectColorResolver()
+    return _COLOR_RESOLVER
+
+def get_color_for_subject(subject: str) -> str:
+    """Ottiene il colore per una materia"""
+    return get_color_resolver()(subject)
 
 def detect_schedule_type(class_name: str) -> str:
     """Determina il tipo di scansione oraria per la classe"""
@@ -152,22 +459,25 @@ def detect_schedule_type(class_name: str) -> str:
     
     return 'standard'
 
-def get_schedule_for_day(class_name: str, day: int) -> Dict:
-    """Ottiene la scansione oraria per una classe in un giorno specifico"""
-    schedule_type = detect_schedule_type(class_name)
-    
+def schedule_variant(schedule_type: str, day: int) -> str:
+    """Sceglie la variante di SCHEDULES[schedule_type] valida in un giorno"""
     if schedule_type == 'lssa':
-        return SCHEDULES['lssa']['all']
+        return 'all'
     elif schedule_type == 'first_year':
         if day in [3, 5]:  # Mercoledì, Venerdì
-            return SCHEDULES['first_year']['mer_ven']
+            return 'mer_ven'
         else:
-            return SCHEDULES['first_year']['lun_mar_gio']
+            return 'lun_mar_gio'
     else:  # standard
         if day in [2, 4]:  # Martedì, Giovedì
-            return SCHEDULES['standard']['mar_gio']
+            return 'mar_gio'
         else:
-            return SCHEDULES['standard']['lun_mer_ven']
+            return 'lun_mer_ven'
+
+def get_schedule_for_day(class_name: str, day: int) -> Dict:
+    """Ottiene la scansione oraria per una classe in un giorno specifico"""
+    schedule_type = detect_schedule_type(class_name)
+    return SCHEDULES[schedule_type][schedule_variant(schedule_type, day)]
 
 def normalize_class_name(raw_name: str) -> str:
     """Normalizza il nome della classe"""
@@ -186,6 +496,10 @@ def normalize_teacher_name(raw_name: str) -> str:
     clean = re.sub(r'[^\w\s,.\']', '', clean)
     return clean
 
+def teacher_key(name: str) -> str:
+    """Chiave di un docente, uguale per "ROSSI M." e "Rossi M" """
+    return re.sub(r'[\s.]+', ' ', normalize_teacher_name(name)).strip().casefold()
+
 def time_to_minutes(time_str: str) -> int:
     """Converte orario in minuti dalla mezzanotte"""
     try:
@@ -194,281 +508,913 @@ def time_to_minutes(time_str: str) -> int:
     except:
         return 0
 
-def split_long_lessons(lesson: Dict, schedule: Dict) -> List[Dict]:
-    """Spezza lezioni consecutive in slot separati"""
-    start_min = time_to_minutes(lesson['startTime'])
-    end_min = time_to_minutes(lesson['endTime'])
+@lru_cache(maxsize=None)
+def minutes_to_time(minutes: int) -> str:
+    """Converte minuti dalla mezzanotte in orario "HH:MM" (stessa stringa per gli stessi minuti)"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+# ============================================================================
+# MODELLO DEI TEMPI
+# ============================================================================
+
+class DayTiming(NamedTuple):
+    """
+    Scansione oraria di un giorno in minuti dalla mezzanotte
+    
+    slots[n] = (inizio, fine) dello slot n (None per gli indici senza slot, come lo 0);
+    intervals = (inizio, fine) degli intervalli, in ordine.
+    """
+    slots: Tuple[Optional[Tuple[int, int]], ...]
+    intervals: Tuple[Tuple[int, int], ...]
+    
+    def slot(self, slot_num: int) -> Optional[Tuple[int, int]]:
+        return self.slots[slot_num] if 0 <= slot_num < len(self.slots) else None
+    
+    def covered_slots(self, start: int, end: int) -> List[int]:
+        """Slot che si sovrappongono all'intervallo [start, end)"""
+        return [n for n, span in enumerate(self.slots)
+                if span and start < span[1] and end > span[0]]
+
+def _build_day_timing(schedule: Dict) -> DayTiming:
+    slots: List[Optional[Tuple[int, int]]] = [None] * (max(k for k in schedule if isinstance(k, int)) + 1)
+    intervals = []
+    
+    for key, (start, end) in schedule.items():
+        span = (time_to_minutes(start), time_to_minutes(end))
+        if isinstance(key, int):
+            slots[key] = span
+        elif 'intervallo' in key.lower():
+            intervals.append(span)
     
+    return DayTiming(tuple(slots), tuple(intervals))
+
+# (tipo di scansione, giorno) → DayTiming, calcolato una volta da SCHEDULES
+TIMING_MODEL: Dict[Tuple[str, int], DayTiming] = {
+    (schedule_type, day): _build_day_timing(variants[schedule_variant(schedule_type, day)])
+    for schedule_type, variants in SCHEDULES.items()
+    for day in range(1, 7)
+}
+
+def get_day_timing(schedule_type: str, day: int) -> DayTiming:
+    """Scansione oraria in minuti per un tipo di scansione e un giorno (1=lunedì ... 6=sabato)"""
+    return TIMING_MODEL[(schedule_type, day)]
+
+# ============================================================================
+# MODELLO DELLE LEZIONI
+# ============================================================================
+
+class Lesson(NamedTuple):
+    """
+    Lezione (o intervallo) durante l'estrazione
+    
+    Una tupla con le stringhe internate e gli orari in minuti dalla mezzanotte:
+    i dizionari dello schema JSON vengono creati solo al salvataggio (to_dict).
+    Gli intervalli hanno class_name vuoto (nel JSON non hanno il campo 'class').
+    """
+    class_name: str
+    subject: str
+    teacher: str
+    classroom: str
+    day: int
+    start: int
+    end: int
+    color: str
+    
+    @classmethod
+    def create(cls, class_name: str, subject: str, teacher: str, classroom: str,
+               day: int, start: int, end: int, color: str) -> 'Lesson':
+        """Lezione con le stringhe internate (docenti, aule e materie si ripetono in tutto il PDF)"""
+        return cls(sys.intern(class_name), sys.intern(subject), sys.intern(teacher), sys.intern(classroom),
+                   day, start, end, sys.intern(color))
+    
+    @classmethod
+    def from_dict(cls, lesson: Dict) -> 'Lesson':
+        """Lezione dallo schema JSON (inverso di to_dict)"""
+        return cls.create(lesson.get('class', ''), lesson['subject'], lesson['teacher'], lesson['classroom'],
+                          lesson['dayOfWeek'], time_to_minutes(lesson['startTime']),
+                          time_to_minutes(lesson['endTime']), lesson['color'])
+    
+    @property
+    def is_interval(self) -> bool:
+        return not self.class_name
+    
+    def to_dict(self) -> Dict:
+        """Lezione nello schema JSON (stesso ordine delle chiavi dell'output)"""
+        lesson = {} if self.is_interval else {'class': self.class_name}
+        lesson['subject'] = self.subject
+        lesson['teacher'] = self.teacher
+        lesson['classroom'] = self.classroom
+        lesson['dayOfWeek'] = self.day
+        lesson['startTime'] = minutes_to_time(self.start)
+        lesson['endTime'] = minutes_to_time(self.end)
+        lesson['color'] = self.color
+        return lesson
+
+INTERVAL_COLOR = '#ffd54f'
+
+# (tipo di scansione, giorno) → intervalli del giorno, creati una volta sola e condivisi da tutte le classi
+INTERVAL_LESSONS: Dict[Tuple[str, int], Tuple[Lesson, ...]] = {
+    key: tuple(Lesson.create('', 'INTERVALLO', '', '', key[1], start, end, INTERVAL_COLOR)
+               for start, end in timing.intervals)
+    for key, timing in TIMING_MODEL.items()
+}
+
+def split_long_lessons(lesson: Lesson, timing: DayTiming) -> List[Lesson]:
+    """Spezza lezioni consecutive in slot separati"""
     # Trova slot coperti
-    covered_slots = []
-    for slot_num, (slot_start, slot_end) in schedule.items():
-        if isinstance(slot_num, str):
-            continue
-        
-        slot_start_min = time_to_minutes(slot_start)
-        slot_end_min = time_to_minutes(slot_end)
-        
-        if start_min < slot_end_min and end_min > slot_start_min:
-            covered_slots.append((slot_num, slot_start, slot_end))
+    covered_slots = timing.covered_slots(lesson.start, lesson.end)
     
     if len(covered_slots) <= 1:
         return [lesson]
     
     # Spezza in più lezioni
-    split_lessons = []
-    for slot_num, slot_start, slot_end in covered_slots:
-        new_lesson = lesson.copy()
-        new_lesson['startTime'] = slot_start
-        new_lesson['endTime'] = slot_end
-        split_lessons.append(new_lesson)
+    return [lesson._replace(start=timing.slots[slot_num][0], end=timing.slots[slot_num][1])
+            for slot_num in covered_slots]
+
+def add_intervals(lessons: List[Lesson], class_name: str) -> List[Lesson]:
+    """Aggiunge gli intervalli al programma, in ordine di giorno e di inizio"""
+    schedule_type = detect_schedule_type(class_name)
+    days = sorted({lesson.day for lesson in lessons})
+    
+    combined = list(lessons)
+    for day in days:
+        combined.extend(INTERVAL_LESSONS[(schedule_type, day)])
     
-    return split_lessons
+    # Ordinamento stabile: a parità di inizio le lezioni precedono gli intervalli
+    combined.sort(key=lambda x: (x.day, x.start))
+    return combined
 
-def add_intervals(lessons: List[Dict], class_name: str) -> List[Dict]:
-    """Aggiunge gli intervalli al programma"""
-    result = []
+# ============================================================================
+# RICOSTRUZIONE DELLA GRIGLIA
+# ============================================================================
+
+# Codici delle celle della griglia (giorni × slot)
+CELL_MISSING = -2   # oltre la fine della riga (o testo 'None'): la cella non esiste
+CELL_ARROW = -1     # freccia \uea1e: la lezione sopra continua
+CELL_EMPTY = 0      # vuota: parte di una cella unita (o slot libero)
+# codici > 0: indice + 1 nel vettore dei contenuti della tabella
+
+class LessonSpan(NamedTuple):
+    """Lezione ricostruita dalla griglia: giorno (1-6), primo slot, numero di slot e testo della cella"""
+    day: int
+    start_slot: int
+    length: int
+    cell: str
+
+def encode_grid(rows: List[List[Optional[str]]]) -> Tuple[List[List[int]], List[str]]:
+    """
+    Codifica le righe degli slot come matrice di interi (slot × giorni)
     
-    by_day = {}
-    for lesson in lessons:
-        day = lesson['dayOfWeek']
-        if day not in by_day:
-            by_day[day] = []
-        by_day[day].append(lesson)
+    Returns:
+        Codici delle celle e contenuti distinti (il codice k indica contents[k - 1])
+    """
+    width = min(7, max((len(row) for row in rows), default=0)) - 1
+    codes = [[CELL_MISSING] * 6 for _ in rows]
+    contents: List[str] = []
+    content_codes: Dict[str, int] = {}
     
-    for day in sorted(by_day.keys()):
-        day_lessons = sorted(by_day[day], key=lambda x: x['startTime'])
-        schedule = get_schedule_for_day(class_name, day)
-        
-        intervals = []
-        for key, (start, end) in schedule.items():
-            if isinstance(key, str) and 'intervallo' in key.lower():
-                intervals.append({
-                    'subject': 'INTERVALLO',
-                    'teacher': '',
-                    'classroom': '',
-                    'dayOfWeek': day,
-                    'startTime': start,
-                    'endTime': end,
-                    'color': '#ffd54f'
-                })
-        
-        combined = day_lessons + intervals
-        combined.sort(key=lambda x: x['startTime'])
-        result.extend(combined)
+    for row_idx, row in enumerate(rows):
+        for col_idx in range(1, min(width + 1, len(row))):
+            cell = row[col_idx]
+            if cell == 'None':
+                # Non è una cella unita da riempire: resta come se non ci fosse
+                continue
+            if not cell or not cell.strip():
+                code = CELL_EMPTY
+            elif '\uea1e' in cell:
+                code = CELL_ARROW
+            else:
+                code = content_codes.get(cell)
+                if code is None:
+                    contents.append(cell)
+                    code = content_codes[cell] = len(contents)
+            codes[row_idx][col_idx - 1] = code
     
-    return result
+    return codes, contents
+
+def fill_grid(codes: List[List[int]]) -> List[List[int]]:
+    """
+    Riempie le celle unite: ogni cella vuota prende il codice dell'ultima cella
+    non vuota sopra di essa nello stesso giorno
+    
+    Una cella vuota sotto un contenuto diventa una copia della lezione; sotto
+    una freccia resta una freccia (continuazione, non una nuova lezione).
+    Le celle inesistenti vengono attraversate senza interrompere il riempimento.
+    """
+    filled = []
+    above = [CELL_EMPTY] * 6
+    for row in codes:
+        filled_row = []
+        for day, code in enumerate(row):
+            if code > 0 or code == CELL_ARROW:
+                above[day] = code
+                filled_row.append(code)
+            elif code == CELL_MISSING:
+                filled_row.append(CELL_EMPTY)
+            else:
+                filled_row.append(above[day])
+        filled.append(filled_row)
+    return filled
+
+@lru_cache(maxsize=None)
+def lesson_slot_mask(schedule_type: str, slots: int) -> Tuple[Tuple[bool, ...], ...]:
+    """Matrice slot × giorni: True dove la scansione oraria prevede lo slot"""
+    return tuple(tuple(get_day_timing(schedule_type, day).slot(slot_num) is not None
+                       for day in range(1, 7))
+                 for slot_num in range(1, slots + 1))
+
+def lesson_spans(codes: List[List[int]], filled: List[List[int]], contents: List[str],
+                 slot_mask: Tuple[Tuple[bool, ...], ...]) -> List[LessonSpan]:
+    """
+    Ricava le lezioni dalla griglia riempita, ordinate per giorno e slot
+    
+    Ogni freccia allunga di uno slot la lezione più vicina sopra di essa nello
+    stesso giorno (anche se tra le due c'è una cella unita della freccia).
+    """
+    spans = []
+    for day in range(6):
+        # [primo slot, numero di slot, codice] delle lezioni del giorno, l'ultima è la più vicina sopra
+        day_spans = []
+        for row_idx, (code_row, filled_row, mask_row) in enumerate(zip(codes, filled, slot_mask)):
+            if filled_row[day] > 0 and mask_row[day]:
+                day_spans.append([row_idx + 1, 1, filled_row[day]])
+            elif code_row[day] == CELL_ARROW and day_spans:
+                day_spans[-1][1] += 1
+        spans.extend(LessonSpan(day + 1, start_slot, length, contents[code - 1])
+                     for start_slot, length, code in day_spans)
+    return spans
 
 # ============================================================================
 # ESTRAZIONE DAL PDF
 # ============================================================================
 
-def extract_tables_from_pdf(pdf_path: str) -> List[Dict]:
+# Estrattore delle tabelle: 'grid' legge la griglia dal content stream
+# (grid_extractor.py) e ripiega su pdfplumber per le pagine fuori modello,
+# 'generic' usa sempre page.extract_tables()
+GRID_SETTINGS = {'engine': 'grid', 'template': None}
+_GRID_ENGINE = None
+
+def configure_grid(engine: str, template_path: Optional[str] = None):
+    """Sceglie l'estrattore delle tabelle (anche nei worker, come initializer del pool)"""
+    global _GRID_ENGINE
+    GRID_SETTINGS.update(engine=engine, template=template_path)
+    _GRID_ENGINE = None
+
+def grid_engine():
+    """GridEngine condiviso dalle pagine del processo, None con l'estrattore generico"""
+    global _GRID_ENGINE
+    if GRID_SETTINGS['engine'] != 'grid':
+        return None
+    if _GRID_ENGINE is None:
+        from grid_extractor import GridEngine
+        _GRID_ENGINE = GridEngine(GRID_SETTINGS['template'], log=log)
+    return _GRID_ENGINE
+
+def parse_class_header(text: str, allow_plain: bool = True) -> Optional[str]:
+    """
+    Ricava il nome della classe dall'intestazione della pagina
+    
+    Con allow_plain=False accetta solo l'intestazione con caratteri doppiati.
     """
-    Estrae tutte le tabelle dal PDF usando pdfplumber
+    # Il formato del Vallauri ha caratteri doppiati: "11AA AAFFMM ((2277))"
+    # Dobbiamo rimuovere i caratteri doppi
+    
+    # Cerca il pattern con caratteri doppiati: 11AA AAFFMM ((27))
+    class_match = re.search(r'(\d)\1([A-Z])\2\s+([A-Z]+)\3*\s+\(\((\d+)\)\)', text)
+    
+    if not class_match:
+        if not allow_plain:
+            return None
+        
+        # Prova pattern alternativo senza doppiatura
+        class_match = re.search(r'(\d[A-Z])\s+([A-Z]+)\s+\((\d+)\)', text)
+        if class_match:
+            return f"{class_match.group(1)} {class_match.group(2)}"
+        return None
+    
+    # Ricostruisci dalla versione doppiata rimuovendo i caratteri duplicati
+    # Es: "AAFFMM" -> "AFM", "IINNFF" -> "INF"
+    numero = class_match.group(1)
+    lettera = class_match.group(2)
+    specializzazione = class_match.group(3)[::2]
+    
+    return f"{numero}{lettera} {specializzazione}"
+
+def table_class(tables: List) -> Optional[str]:
+    """Classe dall'intestazione della prima tabella (prima cella), None se non riconosciuta"""
+    header = tables[0][0][0] if tables and tables[0] and tables[0][0] else None
+    return parse_class_header(header, allow_plain=False) if header else None
+
+def parse_page(page, page_num: int, total_pages: int) -> List[Lesson]:
+    """
+    Estrae le lezioni di una singola pagina (una classe per pagina)
+    
+    Il rilevamento delle tabelle è l'unica analisi del layout: l'intestazione
+    con il nome della classe si trova nella prima cella della tabella, quindi
+    il testo completo della pagina serve solo se lì non viene riconosciuta.
+    Con l'estrattore 'grid' le tabelle vengono lette dalla griglia e pdfplumber
+    analizza solo le pagine fuori modello, quelle campione che verificano la
+    griglia (la prima e poi una ogni VALIDATE_EVERY) e quelle la cui intestazione
+    letta dalla griglia non è il nome di una classe.
     
     Returns:
-        Lista di dizionari con i dati estratti
+        Lista di lezioni della pagina, vuota se la pagina non contiene un orario
     """
-    all_data = []
+    lessons = []
     
-    print(f"📄 Apertura PDF: {pdf_path}")
+    log(f"📖 Processando pagina {page_num}/{total_pages}...")
+    PROFILER.begin_page(page_num)
+    PROFILER.count('pages')
+    
+    # Tabelle dalla griglia, se la pagina rientra nel modello
+    engine = grid_engine()
+    tables = None
+    if engine is not None:
+        phase_start = time.perf_counter()
+        tables = engine.read_tables(page)
+        record_phase('grid', phase_start)
+        PROFILER.count('grid' if tables is not None else 'fallback')
     
-    with pdfplumber.open(pdf_path) as pdf:
-        print(f"📚 Pagine totali: {len(pdf.pages)}")
+    # Le pagine campione e quelle con un'intestazione non riconosciuta (il controllo
+    # del testo letto dalla griglia su ogni pagina) passano anche da pdfplumber
+    if tables is None or engine.needs_validation or not table_class(tables):
+        # Interpretazione del content stream, condivisa da tabelle e testo
+        phase_start = time.perf_counter()
+        page.objects
+        record_phase('layout', phase_start)
         
-        for page_num, page in enumerate(pdf.pages, 1):
-            print(f"📖 Processando pagina {page_num}/{len(pdf.pages)}...")
-            
-            # Estrai testo completo della pagina
-            text = page.extract_text()
-            if not text:
-                continue
+        # Estrai tabelle
+        phase_start = time.perf_counter()
+        generic_tables = page.extract_tables()
+        record_phase('tables', phase_start)
+        
+        if tables is not None:
+            engine.validate(page_num, tables, generic_tables)
+        tables = generic_tables
+    
+    phase_start = time.perf_counter()
+    current_class = table_class(tables)
+    record_phase('header', phase_start)
+    
+    if not current_class:
+        # Intestazione non standard: ripiega sul testo completo della pagina
+        phase_start = time.perf_counter()
+        text = page.extract_text()
+        record_phase('text', phase_start)
+        if not text:
+            PROFILER.end_page()
+            return lessons
+        phase_start = time.perf_counter()
+        current_class = parse_class_header(text)
+        record_phase('header', phase_start)
+        if not current_class:
+            PROFILER.end_page()
+            return lessons
+    
+    log(f"  📚 Classe: {current_class}")
+    PROFILER.set_class(current_class)
+    schedule_type = detect_schedule_type(current_class)
+    
+    for table in tables:
+        if not table or len(table) < 2:
+            continue
+        
+        # La prima riga contiene l'intestazione, le successive gli slot
+        if table[0] and table[0][0]:
+            PROFILER.count('tables')
             
-            # Il formato del Vallauri ha caratteri doppiati: "11AA AAFFMM ((2277))"
-            # Dobbiamo rimuovere i caratteri doppi
+            # Griglia slot × giorni con le celle unite riempite
+            phase_start = time.perf_counter()
+            rows = [list(row) if row else [None] * 7 for row in table[1:]]
+            codes, contents = encode_grid(rows)
+            filled = fill_grid(codes)
+            record_phase('fill', phase_start)
             
-            # Cerca il pattern con caratteri doppiati: 11AA AAFFMM ((27))
-            class_match = re.search(r'(\d)\1([A-Z])\2\s+([A-Z]+)\3*\s+\(\((\d+)\)\)', text)
+            # Lezioni con la loro durata in slot (frecce comprese)
+            phase_start = time.perf_counter()
+            spans = lesson_spans(codes, filled, contents, lesson_slot_mask(schedule_type, len(rows)))
+            PROFILER.count('arrows', sum(row.count(CELL_ARROW) for row in codes))
+            record_phase('arrows', phase_start)
             
-            if not class_match:
-                # Prova pattern alternativo senza doppiatura
-                class_match = re.search(r'(\d[A-Z])\s+([A-Z]+)\s+\((\d+)\)', text)
-                if class_match:
-                    current_class = f"{class_match.group(1)} {class_match.group(2)}"
-                else:
-                    continue
-            else:
-                # Ricostruisci dalla versione doppiata rimuovendo i caratteri duplicati
-                numero = class_match.group(1)
-                lettera = class_match.group(2)
-                specializzazione_doppia = class_match.group(3)
+            phase_start = time.perf_counter()
+            for span in spans:
+                # Parse cell: formato "Materia\nDocente\nAula"
+                cell_lines = [l.strip() for l in span.cell.split('\n') if l.strip()]
+                subject = cell_lines[0]
+                teacher = cell_lines[1] if len(cell_lines) > 1 else ""
+                classroom = cell_lines[2] if len(cell_lines) > 2 else ""
                 
-                # Rimuovi caratteri doppi dalla specializzazione
-                # Es: "AAFFMM" -> "AFM", "IINNFF" -> "INF"
-                specializzazione = ""
-                for i in range(0, len(specializzazione_doppia), 2):
-                    if i < len(specializzazione_doppia):
-                        specializzazione += specializzazione_doppia[i]
+                # Orario dello slot in base al tipo di scansione e al giorno
+                timing = get_day_timing(schedule_type, span.day)
+                start, end = timing.slot(span.start_slot)
                 
-                current_class = f"{numero}{lettera} {specializzazione}"
-            
-            print(f"  📚 Classe: {current_class}")
+                if span.length > 1:
+                    # Blocco unito: termina con l'ultimo slot coperto dalle frecce
+                    extended_time = timing.slot(span.start_slot + span.length - 1)
+                    if extended_time:
+                        end = extended_time[1]
+                        PROFILER.count('extended')
+                        log(f"    ⚡ Estesa lezione {subject[:20]} su {span.length} slot: "
+                            f"{minutes_to_time(start)}-{minutes_to_time(end)}")
+                
+                lessons.append(Lesson.create(current_class, subject, normalize_teacher_name(teacher), classroom,
+                                             span.day, start, end, get_color_for_subject(subject)))
             
-            # Estrai tabelle
-            tables = page.extract_tables()
+            record_phase('lessons', phase_start)
+    
+    PROFILER.count('lessons', len(lessons))
+    PROFILER.end_page()
+    return lessons
+
+def _extract_pages(pdf_path: str, page_indexes: List[int]) -> Tuple[List[List[Lesson]], Dict]:
+    """
+    Worker: apre il PDF per conto proprio ed estrae le pagine indicate
+    
+    Returns:
+        Lezioni di ogni pagina e statistiche (tempi per fase, colori) raccolte nel worker
+    """
+    results = []
+    PROFILER.reset()
+    get_color_resolver().reset()
+    
+    phase_start = time.perf_counter()
+    with open_pdf(pdf_path) as pdf:
+        total_pages = len(pdf.pages)
+        record_phase('open', phase_start)
+        for page_idx in page_indexes:
+            page = pdf.pages[page_idx]
+            results.append(parse_page(page, page_idx + 1, total_pages))
+            page.close()
+    
+    return results, {'profile': PROFILER.export(), 'colors': get_color_resolver().stats()}
+
+def _init_worker(colors_path: str, verbose: bool, detailed: bool, tracing: bool, grid: Dict):
+    """Initializer del pool: i worker usano la stessa configurazione del processo principale"""
+    configure_subject_colors(colors_path)
+    configure_grid(grid['engine'], grid['template'])
+    set_verbose(verbose)
+    PROFILER.configure(detailed=detailed, tracing=tracing)
+
+def _page_chunks(page_indexes: List[int], workers: int) -> List[List[int]]:
+    """Divide le pagine in blocchi contigui (più blocchi che worker, per bilanciare il carico)"""
+    total = len(page_indexes)
+    chunks = min(total, workers * 4)
+    result = []
+    for i in range(chunks):
+        chunk = page_indexes[total * i // chunks:total * (i + 1) // chunks]
+        if chunk:
+            result.append(chunk)
+    return result
+
+# ============================================================================
+# CACHE INCREMENTALE PER PAGINA
+# ============================================================================
+
+# Da incrementare quando cambia la logica di parsing: invalida le cache esistenti
+PAGE_CACHE_VERSION = 3
+
+def page_content_hash(page) -> str:
+    """Hash SHA-256 dei content stream grezzi di una pagina (non richiede analisi del layout)"""
+    digest = hashlib.sha256()
+    for stream in page.page_obj.contents:
+        digest.update(resolve1(stream).get_data())
+    return digest.hexdigest()
+
+def class_fingerprint(class_data: Dict, class_json: Optional[bytes] = None) -> str:
+    """
+    Hash SHA-256 del file individuale di una classe, indipendente dall'ordine delle chiavi
+    
+    Se i byte del file (encode_class) sono già disponibili non vengono ricalcolati.
+    """
+    if class_json is None:
+        class_json = encode_class(class_data)
+    return hashlib.sha256(class_json).hexdigest()
+
+def load_page_cache(cache_path: str) -> Dict:
+    """
+    Carica la cache delle pagine, scartandola se assente, illeggibile o di versione diversa
+    
+    Se la tabella dei colori è cambiata vengono scartate solo le pagine (le
+    lezioni hanno il colore già risolto): le impronte delle classi restano, così
+    le classi ricolorate risultano modificate.
+    """
+    empty = {'version': PAGE_CACHE_VERSION, 'pages': {}, 'classes': {}}
+    
+    path = Path(cache_path)
+    if not path.exists():
+        return empty
+    
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        print(f"⚠️  Cache illeggibile, verrà ricostruita: {cache_path}")
+        return empty
+    
+    if cache.get('version') != PAGE_CACHE_VERSION:
+        print(f"⚠️  Cache di una versione precedente, verrà ricostruita: {cache_path}")
+        return empty
+    
+    if cache.get('colorsHash') != get_color_resolver().fingerprint:
+        print(f"🎨 Tabella dei colori cambiata, le pagine verranno rianalizzate: {cache_path}")
+        cache.update(pdfHash=None, pageOrder=[], pages={})
+    
+    # Le lezioni sono salvate come righe nell'ordine dei campi di Lesson
+    cache['pages'] = {page_hash: [Lesson.create(*row) for row in rows] for page_hash, rows in cache['pages'].items()}
+    return cache
+
+def save_page_cache(cache: Dict, cache_path: str):
+    """Salva la cache delle pagine (solo le voci persistenti)"""
+    data = {
+        'version': PAGE_CACHE_VERSION,
+        'pdfHash': cache.get('pdfHash'),
+        'pageOrder': cache.get('pageOrder', []),
+        'colorsHash': get_color_resolver().fingerprint,
+        'pages': cache['pages'],
+        'classes': cache['classes']
+    }
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    
+    print(f"\n🗃️  Cache salvata: {cache_path} ({len(cache['pages'])} pagine)")
+
+def cached_pdf_pages(cache: Dict, pdf_hash: str) -> Optional[List[List[Lesson]]]:
+    """
+    Lezioni di tutte le pagine se il PDF è identico a quello dell'ultima
+    esecuzione con questa cache (stesso hash del file), altrimenti None
+    
+    In quel caso il PDF non va nemmeno aperto: pdfplumber non viene importato.
+    """
+    page_order = cache.get('pageOrder')
+    if not page_order or cache.get('pdfHash') != pdf_hash:
+        return None
+    if any(page_hash not in cache['pages'] for page_hash in page_order):
+        return None
+    return [cache['pages'][page_hash] for page_hash in page_order]
+
+def diff_classes(old_fingerprints: Dict[str, str], new_fingerprints: Dict[str, str]) -> Dict[str, List[str]]:
+    """Confronta le impronte delle classi con quelle dell'esecuzione precedente"""
+    return {
+        'added': sorted(set(new_fingerprints) - set(old_fingerprints)),
+        'removed': sorted(set(old_fingerprints) - set(new_fingerprints)),
+        'modified': sorted(name for name, fp in new_fingerprints.items()
+                           if name in old_fingerprints and old_fingerprints[name] != fp)
+    }
+
+def save_class_diff(diff: Dict[str, List[str]], reparsed: List[str], output_path: str):
+    """Salva l'elenco delle classi cambiate, da inviare all'app"""
+    data = {
+        'reparsedClasses': reparsed,
+        'addedClasses': diff['added'],
+        'removedClasses': diff['removed'],
+        'modifiedClasses': diff['modified']
+    }
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    
+    changed = len(diff['added']) + len(diff['removed']) + len(diff['modified'])
+    print(f"\n🔀 Classi cambiate: {changed} (nuove {len(diff['added'])}, "
+          f"rimosse {len(diff['removed'])}, modificate {len(diff['modified'])}) → {output_path}")
+
+# ============================================================================
+# INDICE DELLE PAGINE PER CLASSE
+# ============================================================================
+
+# Da incrementare quando cambia il modo di leggere le intestazioni
+PAGE_INDEX_VERSION = 1
+
+# Blocco di testo, e al suo interno cambi di font e stringhe mostrate con Tj
+_TEXT_BLOCK = re.compile(rb'BT\b(.*?)\bET\b', re.S)
+_TEXT_OPERATOR = re.compile(rb'/[^\s/\[\]()<>]+\s+[-\d.]+\s+Tf|\(((?:\\.|[^\\)])*)\)\s*Tj', re.S)
+_STRING_ESCAPE = re.compile(rb'\\([0-7]{1,3}|.)', re.S)
+_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+
+def _unescape_pdf_string(raw: bytes) -> str:
+    def replace(match):
+        code = match.group(1)
+        if code[:1].isdigit():
+            return bytes([int(code, 8) & 0xFF])
+        return _ESCAPES.get(code, code)
+    return _STRING_ESCAPE.sub(replace, raw).decode('latin-1')
+
+def raw_page_header(page) -> Optional[str]:
+    """
+    Nome della classe letto dal content stream grezzo della pagina, senza analisi del layout
+    
+    L'intestazione è la prima riga di testo della pagina, scritta con un font
+    proprio: si leggono le stringhe del primo blocco di testo fino al primo
+    cambio di font. None se lì non c'è un'intestazione riconoscibile.
+    """
+    data = b''.join(resolve1(stream).get_data() for stream in page.page_obj.contents)
+    block = _TEXT_BLOCK.search(data)
+    if not block:
+        return None
+    
+    parts = []
+    fonts = 0
+    for match in _TEXT_OPERATOR.finditer(block.group(1)):
+        if match.group(1) is None:
+            fonts += 1
+            if fonts > 1:
+                break
+        else:
+            parts.append(_unescape_pdf_string(match.group(1)))
+    
+    return parse_class_header(''.join(parts))
+
+def page_index_path(pdf_path: str) -> Path:
+    """Percorso predefinito dell'indice delle pagine: accanto al PDF"""
+    path = Path(pdf_path)
+    return path.with_name(f".{path.stem}.pagine.json")
+
+def file_hash(path: str) -> str:
+    """Hash SHA-256 del contenuto di un file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def build_page_index(pdf_path: str) -> Dict:
+    """
+    Indice classe → pagine (numerate da 1) letto dalle sole intestazioni
+    
+    Nessuna tabella viene estratta: l'intestazione viene letta dal content
+    stream grezzo e, solo per le pagine in cui lì non viene riconosciuta, dal
+    testo della pagina come fa parse_page. Le pagine senza classe finiscono in 'unknown'.
+    """
+    classes: Dict[str, List[int]] = {}
+    unknown = []
+    
+    phase_start = time.perf_counter()
+    with open_pdf(pdf_path) as pdf:
+        for page_idx, page in enumerate(pdf.pages):
+            class_name = raw_page_header(page)
+            if not class_name:
+                text = page.extract_text()
+                class_name = parse_class_header(text) if text else None
+                page.close()
+            if class_name:
+                classes.setdefault(class_name, []).append(page_idx + 1)
+            else:
+                unknown.append(page_idx + 1)
+        total_pages = len(pdf.pages)
+    record_phase('index', phase_start)
+    
+    return {
+        'version': PAGE_INDEX_VERSION,
+        'pdfHash': file_hash(pdf_path),
+        'totalPages': total_pages,
+        'classes': classes,
+        'unknown': unknown
+    }
+
+def load_page_index(index_path: str, pdf_path: str) -> Optional[Dict]:
+    """Carica l'indice delle pagine se esiste ed è stato costruito su questo PDF"""
+    path = Path(index_path)
+    if not path.exists():
+        return None
+    
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        print(f"⚠️  Indice delle pagine illeggibile, verrà ricostruito: {index_path}")
+        return None
+    
+    if index.get('version') != PAGE_INDEX_VERSION or index.get('pdfHash') != file_hash(pdf_path):
+        print(f"⚠️  Indice delle pagine non aggiornato, verrà ricostruito: {index_path}")
+        return None
+    
+    return index
+
+def save_page_index(index: Dict, index_path: str):
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    
+    print(f"🗂️  Indice delle pagine salvato: {index_path} ({len(index['classes'])} classi, "
+          f"{index['totalPages']} pagine)")
+
+def extract_class(pdf_path: str, class_name: str, index_path: Optional[str] = None) -> Tuple[Optional[Dict], Dict]:
+    """
+    Estrae l'orario di una sola classe analizzando solo le sue pagine
+    
+    Le pagine vengono cercate nell'indice persistente (costruito e salvato alla
+    prima esecuzione dalle sole intestazioni): solo le pagine indicate vengono
+    caricate dal PDF e analizzate con parse_page.
+    
+    Returns:
+        Orario della classe (None se non trovata) e indice delle pagine usato
+    """
+    index_path = str(index_path or page_index_path(pdf_path))
+    index = load_page_index(index_path, pdf_path)
+    if index is None:
+        print("🗂️  Costruzione dell'indice delle pagine dalle intestazioni...")
+        index = build_page_index(pdf_path)
+        save_page_index(index, index_path)
+    
+    page_numbers = index['classes'].get(class_name)
+    if not page_numbers:
+        return None, index
+    
+    print(f"📄 Apertura PDF: {pdf_path} (pagine {', '.join(map(str, page_numbers))})")
+    
+    lessons = []
+    phase_start = time.perf_counter()
+    with open_pdf(pdf_path, pages=page_numbers) as pdf:
+        record_phase('open', phase_start)
+        for page_num, page in zip(page_numbers, pdf.pages):
+            page_lessons = parse_page(page, page_num, index['totalPages'])
+            page.close()
+            # L'intestazione letta da parse_page è quella che fa fede
+            if page_lessons and page_lessons[0].class_name == class_name:
+                lessons.extend(page_lessons)
+    
+    if not lessons:
+        return None, index
+    return schedule_to_dict(build_class_schedule(class_name, lessons)), index
+
+# ============================================================================
+# ESTRAZIONE COMPLETA
+# ============================================================================
+
+def iter_page_lessons(pdf_path: str, workers: int = 1, cache: Optional[Dict] = None) -> Iterator[List[Lesson]]:
+    """
+    Estrae il PDF pagina per pagina, restituendo le lezioni di ogni pagina
+    appena disponibili e sempre in ordine di pagina
+    
+    Con workers > 1 le pagine vengono distribuite su un pool di processi:
+    ogni worker apre il PDF per conto proprio e i risultati vengono
+    riuniti in ordine di pagina, quindi l'output è identico alla versione seriale.
+    
+    Se viene passata una cache (vedi load_page_cache), le pagine il cui content
+    stream non è cambiato vengono riprese dalla cache senza essere analizzate;
+    a generatore esaurito le classi effettivamente rianalizzate sono in cache['reparsed'].
+    Se l'intero file è identico a quello dell'esecuzione precedente il PDF non
+    viene aperto (vedi cached_pdf_pages).
+    """
+    if cache is not None:
+        phase_start = time.perf_counter()
+        pdf_hash = file_hash(pdf_path)
+        pages = cached_pdf_pages(cache, pdf_hash)
+        record_phase('cache', phase_start)
+        if pages is not None:
+            print(f"🗃️  PDF invariato, {len(pages)} pagine riprese dalla cache: {pdf_path}")
+            yield from pages
+            cache['reparsed'] = []
+            print("🔄 Classi rianalizzate: 0")
+            return
+    
+    print(f"📄 Apertura PDF: {pdf_path}")
+    
+    phase_start = time.perf_counter()
+    with open_pdf(pdf_path) as pdf:
+        total_pages = len(pdf.pages)
+        record_phase('open', phase_start)
+        print(f"📚 Pagine totali: {total_pages}")
+        
+        page_hashes = []
+        cached: Dict[int, List[Lesson]] = {}
+        if cache is not None:
+            phase_start = time.perf_counter()
+            page_hashes = [page_content_hash(page) for page in pdf.pages]
+            record_phase('cache', phase_start)
+            for page_idx, page_hash in enumerate(page_hashes):
+                if page_hash in cache['pages']:
+                    cached[page_idx] = cache['pages'][page_hash]
+            print(f"🗃️  Pagine invariate (da cache): {len(cached)}/{total_pages}")
+        
+        to_parse = [i for i in range(total_pages) if i not in cached]
+        reparsed = []
+        
+        with ExitStack() as stack:
+            if workers > 1 and to_parse:
+                from concurrent.futures import ProcessPoolExecutor
+                print(f"⚙️  Estrazione parallela con {workers} processi")
+                executor = stack.enter_context(ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_init_worker,
+                    initargs=(get_color_resolver().config_path, VERBOSE, PROFILER.detailed, PROFILER.tracing,
+                              dict(GRID_SETTINGS))
+                ))
+                pending = deque((chunk, executor.submit(_extract_pages, pdf_path, chunk))
+                                for chunk in _page_chunks(to_parse, workers))
+            else:
+                pending = deque()
+            parsed: Dict[int, List[Lesson]] = {}
             
-            for table_idx, table in enumerate(tables):
-                if not table or len(table) < 2:
+            for page_idx in range(total_pages):
+                if page_idx in cached:
+                    yield cached[page_idx]
                     continue
                 
-                # La prima cella contiene tutto il contenuto
-                if table[0] and table[0][0]:
-                    main_content = table[0][0]
-                    
-                    # Cerca le righe dell'orario (formato: "1 Materia\nDocente\nAula")
-                    # Ogni riga inizia con un numero (1-7)
-                    lines = main_content.split('\n')
-                    
-                    current_slot = None
-                    slot_data = {}
-                    
-                    for line in lines:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        
-                        # Controlla se inizia con un numero di slot (1-7)
-                        slot_match = re.match(r'^(\d)\s+(.+)', line)
-                        if slot_match:
-                            current_slot = int(slot_match.group(1))
-                            slot_data[current_slot] = {'content': [slot_match.group(2)]}
-                        elif current_slot:
-                            slot_data[current_slot]['content'].append(line)
-                    
-                    # Gestione celle unite: riempi None con valore precedente per ogni colonna
-                    filled_table = []
-                    for row in table[1:]:  # Salta la prima riga (header completo)
-                        filled_table.append(list(row) if row else [None] * 7)
-                    
-                    # Per ogni colonna (giorno), riempi le celle None con il valore precedente
-                    # MA NON riempire le celle dopo una freccia (sono estensioni, non nuove lezioni)
-                    for col_idx in range(1, min(7, max(len(r) for r in filled_table if r))):
-                        last_value = None
-                        last_was_arrow = False
-                        
-                        for row_idx in range(len(filled_table)):
-                            if col_idx < len(filled_table[row_idx]):
-                                cell = filled_table[row_idx][col_idx]
-                                
-                                # Se la cella precedente era una freccia, NON riempire
-                                if last_was_arrow and (not cell or not cell.strip() or cell == 'None'):
-                                    filled_table[row_idx][col_idx] = '___SKIP___'  # Marca per saltare
-                                    continue
-                                
-                                if cell and cell.strip() and cell not in ['None', '']:
-                                    # Controlla se è una freccia
-                                    if '\uea1e' in str(cell):
-                                        last_was_arrow = True
-                                    else:
-                                        last_value = cell
-                                        last_was_arrow = False
-                                elif last_value and not (cell and cell.strip()) and not last_was_arrow:
-                                    # Cella vuota o None: usa il valore precedente solo se non c'era freccia prima
-                                    filled_table[row_idx][col_idx] = last_value
-                    
-                    # Prima passata: estrai tutte le lezioni normali
-                    lessons_by_day = {}  # {(day, start_slot): lesson_data}
-                    
-                    for row_idx in range(len(filled_table)):
-                        row = filled_table[row_idx]
-                        if not row:
-                            continue
-                        
-                        slot_num = row_idx + 1  # Gli slot partono da 1
-                        
-                        # Processa le celle dei giorni (colonne 1-6 = lun-sab)
-                        for col_idx in range(1, min(7, len(row))):
-                            cell = row[col_idx]
-                            
-                            # Salta celle vuote, marcate per skip, o con freccia
-                            if not cell or cell == 'None' or cell == '___SKIP___' or not cell.strip():
-                                continue
-                            
-                            # Se contiene freccia, marca per estensione
-                            if '\uea1e' in str(cell):
-                                # Trova l'ultima lezione valida in questo giorno
-                                day_num = col_idx
-                                for prev_slot in range(row_idx, -1, -1):
-                                    key = (day_num, prev_slot + 1)
-                                    if key in lessons_by_day:
-                                        # Estendi la lezione precedente
-                                        lessons_by_day[key]['extended_slots'] = lessons_by_day[key].get('extended_slots', 0) + 1
-                                        break
-                                continue
-                            
-                            day_num = col_idx  # 1=lun, 2=mar, ..., 6=sab
-                            
-                            # Parse cell: formato "Materia\nDocente\nAula"
-                            cell_lines = [l.strip() for l in str(cell).split('\n') if l.strip() and '\uea1e' not in l]
-                            
-                            if len(cell_lines) >= 1:
-                                subject = cell_lines[0]
-                                teacher = cell_lines[1] if len(cell_lines) > 1 else ""
-                                classroom = cell_lines[2] if len(cell_lines) > 2 else ""
-                                
-                                # Determina orari in base alla classe e giorno
-                                schedule = get_schedule_for_day(current_class, day_num)
-                                
-                                # Trova l'orario dello slot
-                                slot_time = None
-                                for s_num, (start, end) in schedule.items():
-                                    if s_num == slot_num:
-                                        slot_time = (start, end)
-                                        break
-                                
-                                if not slot_time:
-                                    continue
-                                
-                                lesson_data = {
-                                    'class': current_class,
-                                    'subject': subject,
-                                    'teacher': normalize_teacher_name(teacher),
-                                    'classroom': classroom,
-                                    'dayOfWeek': day_num,
-                                    'startTime': slot_time[0],
-                                    'endTime': slot_time[1],
-                                    'color': get_color_for_subject(subject),
-                                    'extended_slots': 0  # Verrà incrementato se ci sono frecce dopo
-                                }
-                                
-                                # Salva nel dizionario temporaneo per gestire estensioni
-                                lessons_by_day[(day_num, slot_num)] = lesson_data
-                    
-                    # Seconda passata: applica estensioni e aggiungi a all_data
-                    schedule = get_schedule_for_day(current_class, 1)  # Usa giorno 1 per riferimento
-                    
-                    for (day_num, slot_num), lesson_data in sorted(lessons_by_day.items()):
-                        # Se la lezione ha slot estesi, aggiorna endTime
-                        if lesson_data['extended_slots'] > 0:
-                            day_schedule = get_schedule_for_day(current_class, day_num)
-                            # Trova l'orario finale esteso
-                            extended_slot = slot_num + lesson_data['extended_slots']
-                            if extended_slot in day_schedule:
-                                lesson_data['endTime'] = day_schedule[extended_slot][1]
-                                print(f"    ⚡ Estesa lezione {lesson_data['subject'][:20]} su {lesson_data['extended_slots']+1} slot: {lesson_data['startTime']}-{lesson_data['endTime']}")
-                        
-                        # Rimuovi il campo temporaneo
-                        del lesson_data['extended_slots']
-                        
-                        all_data.append(lesson_data)
+                if pending or page_idx in parsed:
+                    # I blocchi seguono l'ordine di pagina: la prossima pagina
+                    # da analizzare è sempre nel primo blocco in attesa
+                    if page_idx not in parsed:
+                        chunk, future = pending.popleft()
+                        results, worker_stats = future.result()
+                        PROFILER.merge(worker_stats['profile'])
+                        get_color_resolver().merge_stats(worker_stats['colors'])
+                        parsed.update(zip(chunk, results))
+                    lessons = parsed.pop(page_idx)
+                else:
+                    page = pdf.pages[page_idx]
+                    lessons = parse_page(page, page_idx + 1, total_pages)
+                    # Libera gli oggetti analizzati: la memoria non cresce con il numero di pagine
+                    page.close()
+                
+                if cache is not None:
+                    cache['pages'][page_hashes[page_idx]] = lessons
+                    if lessons and lessons[0].class_name not in reparsed:
+                        reparsed.append(lessons[0].class_name)
+                
+                yield lessons
+    
+    if cache is not None:
+        cache['pdfHash'] = pdf_hash
+        cache['pageOrder'] = page_hashes
+        cache['reparsed'] = reparsed
+        print(f"🔄 Classi rianalizzate: {len(reparsed)}" + (f" ({', '.join(reparsed)})" if reparsed else ""))
+
+def extract_tables_from_pdf(pdf_path: str, workers: int = 1, cache: Optional[Dict] = None) -> List[Dict]:
+    """
+    Estrae tutte le tabelle dal PDF usando pdfplumber (vedi iter_page_lessons)
+    
+    Returns:
+        Lista di dizionari con i dati estratti
+    """
+    all_data = []
+    for lessons in iter_page_lessons(pdf_path, workers=workers, cache=cache):
+        all_data.extend(lesson.to_dict() for lesson in lessons)
     
     print(f"\n✅ Estrazione completata: {len(all_data)} lezioni trovate")
     return all_data
 
-def extract_all_classes(pdf_path: str) -> Dict:
+def build_class_schedule(class_name: str, lessons: List[Lesson]) -> Dict:
+    """
+    Costruisce l'orario completo di una classe (con intervalli) dalle sue lezioni
+    
+    Le lezioni restano oggetti Lesson: schedule_to_dict lo porta allo schema JSON.
+    """
+    # NON spezzare lezioni lunghe - ora gestiamo correttamente i blocchi uniti dal PDF
+    # Le lezioni con durata > 1 slot sono blocchi uniti indicati dalle frecce nel PDF
+    
+    # Aggiungi intervalli
+    PROFILER.set_class(class_name)
+    phase_start = time.perf_counter()
+    with_intervals = add_intervals(lessons, class_name)
+    record_phase('intervals', phase_start)
+    PROFILER.set_class(None)
+    
+    return {
+        'className': class_name,
+        'scheduleType': detect_schedule_type(class_name),
+        'totalLessons': len(with_intervals),
+        'lessons': with_intervals
+    }
+
+def merge_class_schedules(existing: Dict, new: Dict) -> Dict:
+    """
+    Unisce due orari con lo stesso nome di classe (intestazione uguale su più pagine),
+    ricalcolando gli intervalli sulle lezioni di entrambi
+    """
+    lessons = [l for l in existing['lessons'] + new['lessons'] if not l.is_interval]
+    return build_class_schedule(existing['className'], lessons)
+
+def schedule_to_dict(schedule: Dict) -> Dict:
+    """Orario di una classe nello schema JSON (le lezioni diventano dizionari)"""
+    return {**schedule, 'lessons': [lesson.to_dict() for lesson in schedule['lessons']]}
+
+def schedule_from_dict(schedule: Dict) -> Dict:
+    """Orario di una classe dallo schema JSON (inverso di schedule_to_dict)"""
+    return {**schedule, 'lessons': [Lesson.from_dict(lesson) for lesson in schedule['lessons']]}
+
+def iter_class_schedules(pdf_path: str, workers: int = 1, cache: Optional[Dict] = None,
+                         views: Optional['ScheduleViews'] = None) -> Iterator[Dict]:
+    """
+    Restituisce l'orario completo (ClassSchedule) di ogni pagina appena analizzata
+    
+    Se più pagine hanno la stessa intestazione, la classe viene restituita più
+    volte: chi consuma il generatore le unisce con merge_class_schedules.
+    Se viene passato views (vedi schedule_views), ogni orario vi viene aggiunto
+    per costruire nello stesso passaggio gli orari per docente e per aula.
+    """
+    for lessons in iter_page_lessons(pdf_path, workers=workers, cache=cache):
+        if lessons:
+            schedule = build_class_schedule(lessons[0].class_name, lessons)
+            if views is not None:
+                views.add(schedule)
+            yield schedule
+
+def extract_all_classes(pdf_path: str, workers: int = 1, cache: Optional[Dict] = None,
+                        views: Optional['ScheduleViews'] = None) -> Dict:
     """
     Estrae gli orari di TUTTE le classi dal PDF
     
+    Se viene passato views, vi vengono raccolti anche gli orari per docente
+    e per aula (vedi iter_class_schedules).
+    
     Returns:
         Dizionario con chiave = nome classe, valore = dati orario
     """
@@ -476,68 +1422,38 @@ def extract_all_classes(pdf_path: str) -> Dict:
     print("🎓 ESTRATTORE ORARI VALLAURI - TUTTE LE CLASSI")
     print("="*70 + "\n")
     
-    # Estrai dati grezzi
-    raw_data = extract_tables_from_pdf(pdf_path)
+    result = {}
+    for schedule in iter_class_schedules(pdf_path, workers=workers, cache=cache, views=views):
+        class_name = schedule['className']
+        if class_name in result:
+            schedule = merge_class_schedules(result[class_name], schedule)
+        result[class_name] = schedule
     
-    if not raw_data:
+    if not result:
         print("❌ Nessun dato estratto dal PDF")
         return {}
     
-    # Raggruppa per classe
-    classes = {}
-    for lesson in raw_data:
-        class_name = lesson['class']
-        if class_name not in classes:
-            classes[class_name] = []
-        classes[class_name].append(lesson)
-    
-    print(f"\n📚 Classi trovate: {len(classes)}")
-    for class_name in sorted(classes.keys()):
-        print(f"  - {class_name}: {len(classes[class_name])} lezioni")
+    print(f"\n📚 Classi trovate: {len(result)}")
+    for class_name in sorted(result.keys()):
+        log(f"  - {class_name}: {result[class_name]['totalLessons']} slot totali (con intervalli)")
     
-    # Processa ogni classe
-    result = {}
-    print("\n🔄 Processing classi...")
-    
-    for class_name, lessons in classes.items():
-        print(f"\n  📖 Elaborazione {class_name}...")
-        
-        # NON spezzare lezioni lunghe - ora gestiamo correttamente i blocchi uniti dal PDF
-        # Le lezioni con durata > 1 slot sono blocchi uniti indicati dalle frecce nel PDF
-        processed = lessons
-        
-        # Aggiungi intervalli
-        with_intervals = add_intervals(processed, class_name)
-        
-        # Ordina
-        with_intervals.sort(key=lambda x: (x['dayOfWeek'], x['startTime']))
-        
-        result[class_name] = {
-            'className': class_name,
-            'scheduleType': detect_schedule_type(class_name),
-            'totalLessons': len(with_intervals),
-            'lessons': with_intervals
-        }
-        
-        print(f"    ✓ {len(with_intervals)} slot totali (con intervalli)")
-    
-    return result
+    return {class_name: schedule_to_dict(schedule) for class_name, schedule in result.items()}
 
 # ============================================================================
 # SALVATAGGIO OUTPUT
 # ============================================================================
 
+def class_file_name(class_name: str) -> str:
+    """Nome del file JSON individuale di una classe"""
+    safe_name = class_name.replace(' ', '_').replace('/', '-')
+    return f"{safe_name}.json"
+
 def save_all_classes_json(all_classes: Dict, output_path: str):
     """Salva tutte le classi in un unico JSON"""
-    output_data = {
-        'school': 'Istituto Vallauri',
-        'extractionDate': Path(output_path).stem,
-        'totalClasses': len(all_classes),
-        'classes': all_classes
-    }
-    
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    phase_start = time.perf_counter()
+    encoded = [(class_name, encode_class(class_data)) for class_name, class_data in all_classes.items()]
+    write_atomic(Path(output_path), iter_all_classes_json(encoded, len(encoded), Path(output_path).stem))
+    record_phase('json', phase_start)
     
     print(f"\n💾 JSON salvato: {output_path}")
     print(f"   Dimensione: {Path(output_path).stat().st_size / 1024:.2f} KB")
@@ -547,55 +1463,520 @@ def save_individual_class_jsons(all_classes: Dict, output_dir: str):
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True)
     
-    for class_name, class_data in all_classes.items():
-        safe_name = class_name.replace(' ', '_').replace('/', '-')
-        file_path = output_path / f"{safe_name}.json"
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(class_data, f, indent=2, ensure_ascii=False)
+    phase_start = time.perf_counter()
+    with ParallelWriter() as writer:
+        for class_name, class_data in all_classes.items():
+            writer.write(output_path / class_file_name(class_name), encode_class(class_data))
+    record_phase('json', phase_start)
     
     print(f"\n📁 {len(all_classes)} file JSON individuali salvati in: {output_dir}")
 
+def save_class_stream(schedules: Iterable[Dict], output_path: str, output_dir: str) -> Dict[str, Dict]:
+    """
+    Salva gli orari (come da iter_class_schedules) man mano che arrivano, senza tenerli tutti in memoria
+    
+    Ogni classe viene codificata una sola volta e scritta subito (in parallelo,
+    vedi ParallelWriter) nel suo file individuale; il JSON completo viene poi
+    composto con i byte dei file individuali, letti uno alla volta (totalClasses
+    precede le classi, e una classe può ricomparire su una pagina successiva).
+    I file il cui contenuto non cambia non vengono riscritti.
+    Il risultato è identico a save_all_classes_json + save_individual_class_jsons.
+    
+    Returns:
+        Per ogni classe salvata: totalLessons e impronta (class_fingerprint)
+    """
+    class_dir = Path(output_dir)
+    class_dir.mkdir(exist_ok=True)
+    
+    written: Dict[str, Dict] = {}
+    
+    with ParallelWriter() as writer:
+        for schedule in schedules:
+            class_name = schedule['className']
+            file_path = class_dir / class_file_name(class_name)
+            
+            if class_name in written:
+                writer.wait(file_path)
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    schedule = merge_class_schedules(schedule_from_dict(json.load(f)), schedule)
+            
+            PROFILER.set_class(class_name)
+            phase_start = time.perf_counter()
+            schedule_data = schedule_to_dict(schedule)
+            class_json = encode_class(schedule_data)
+            writer.write(file_path, class_json)
+            record_phase('json', phase_start)
+            PROFILER.set_class(None)
+            
+            written[class_name] = {
+                'totalLessons': schedule['totalLessons'],
+                'fingerprint': class_fingerprint(schedule_data, class_json)
+            }
+            log(f"  ✓ {class_name}: {schedule['totalLessons']} slot totali (con intervalli) → {file_path}")
+        
+        # Attesa delle scritture ancora in corso
+        phase_start = time.perf_counter()
+        writer.close()
+        record_phase('json', phase_start)
+    
+    print(f"\n📁 {len(written)} file JSON individuali salvati in: {output_dir}"
+          + (f" ({writer.unchanged} invariati)" if writer.unchanged else ""))
+    
+    def class_files() -> Iterator[Tuple[str, bytes]]:
+        for class_name in written:
+            with open(class_dir / class_file_name(class_name), 'rb') as f:
+                yield class_name, f.read()
+    
+    # Componi il JSON completo: stesso formato di json.dump(indent=2) sull'intero dizionario
+    phase_start = time.perf_counter()
+    write_atomic(Path(output_path), iter_all_classes_json(class_files(), len(written), Path(output_path).stem))
+    record_phase('json', phase_start)
+    
+    print(f"\n💾 JSON salvato: {output_path}")
+    print(f"   Dimensione: {Path(output_path).stat().st_size / 1024:.2f} KB")
+    
+    return written
+
+# ============================================================================
+# ELABORAZIONE DI UN PDF
+# ============================================================================
+
+def extract_to_directory(pdf_path: str, output_dir: str = '.', workers: int = 1, cache: Optional[Dict] = None,
+                         compact: Optional[str] = None, indexes: Optional[str] = None,
+                         timeline: Optional[str] = None, views: bool = True,
+                         store: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Estrae un PDF e salva tutti gli output in una cartella
+    
+    Scrive orari_tutte_classi.json e orari_classi/ in output_dir, gli orari per
+    docente e per aula (orari_docenti/, orari_aule/) se views è vero, più il
+    formato compatto, gli indici, la linea temporale e l'archivio ad accesso
+    diretto se richiesti (percorsi relativi a output_dir).
+    
+    Returns:
+        Classi salvate, come restituite da save_class_stream (vuoto se nessuna)
+    """
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    
+    collected_views = None
+    if views:
+        from schedule_views import ScheduleViews
+        collected_views = ScheduleViews()
+    
+    # Estrai e salva le classi man mano che le pagine vengono analizzate
+    schedules = iter_class_schedules(pdf_path, workers=workers, cache=cache, views=collected_views)
+    output_file = out / "orari_tutte_classi.json"
+    written = save_class_stream(schedules, str(output_file), str(out / "orari_classi"))
+    
+    if not written:
+        return written
+    
+    if collected_views is not None:
+        phase_start = time.perf_counter()
+        collected_views.save(str(out))
+        record_phase('json', phase_start)
+    
+    # Output derivati, calcolati sul JSON completo appena scritto
+    if compact or indexes or timeline or store:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            output_data = json.load(f)
+        
+        if compact:
+            from compact_schedule import save_compact_json
+            save_compact_json(output_data, str(out / compact))
+        
+        if indexes:
+            from schedule_index import save_indexes
+            save_indexes(output_data['classes'], str(out / indexes))
+        
+        if timeline:
+            from schedule_timeline import save_timeline
+            save_timeline(output_data['classes'], str(out / timeline))
+        
+        if store:
+            from schedule_store import save_store
+            save_store(output_data, str(out / store))
+    
+    return written
+
+# ============================================================================
+# ELABORAZIONE BATCH
+# ============================================================================
+
+def find_batch_inputs(source: str) -> List[Path]:
+    """PDF da elaborare: tutti quelli di una cartella, oppure quelli di un glob"""
+    path = Path(source)
+    if path.is_dir():
+        return sorted(p for p in path.iterdir() if p.is_file() and p.suffix.lower() == '.pdf')
+    
+    import glob
+    return sorted(Path(p) for p in glob.glob(source, recursive=True) if p.lower().endswith('.pdf'))
+
+def batch_output_dirs(pdf_paths: List[Path], output_root: str) -> List[Path]:
+    """Una cartella per PDF, con il nome del file (con suffisso se due PDF hanno lo stesso nome)"""
+    used = set()
+    dirs = []
+    for pdf_path in pdf_paths:
+        name = pdf_path.stem
+        suffix = 2
+        while name in used:
+            name = f"{pdf_path.stem}_{suffix}"
+            suffix += 1
+        used.add(name)
+        dirs.append(Path(output_root) / name)
+    return dirs
+
+def _batch_extract(pdf_path: str, output_dir: str, compact: Optional[str], indexes: Optional[str],
+                   colors: Optional[str], profile: Optional[str] = None, trace: Optional[str] = None,
+                   views: bool = True, timeline: Optional[str] = None, engine: str = 'grid',
+                   layout_template: Optional[str] = None, store: Optional[str] = None) -> Dict:
+    """Worker batch: estrae un PDF con l'output su file di log, senza mai sollevare eccezioni"""
+    start = time.perf_counter()
+    entry = {'pdf': pdf_path, 'outputDir': output_dir}
+    
+    try:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        with open(Path(output_dir) / "estrazione.log", 'w', encoding='utf-8') as log_file, redirect_stdout(log_file):
+            if colors:
+                configure_subject_colors(colors)
+            configure_grid(engine, layout_template)
+            # Il processo del pool può aver già estratto altri PDF
+            PROFILER.configure(detailed=bool(profile or trace), tracing=bool(trace))
+            PROFILER.reset()
+            written = extract_to_directory(pdf_path, output_dir, compact=compact, indexes=indexes,
+                                           timeline=timeline, views=views, store=store)
+            save_profile(str(Path(output_dir) / profile) if profile else None,
+                         str(Path(output_dir) / trace) if trace else None)
+        
+        if not written:
+            raise ValueError("nessuna classe estratta")
+        
+        entry.update({
+            'status': 'ok',
+            'classes': len(written),
+            'lessons': sum(info['totalLessons'] for info in written.values())
+        })
+    except Exception as e:
+        entry.update({'status': 'error', 'error': f"{type(e).__name__}: {e}"})
+    
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    return entry
+
+def run_batch(source: str, output_root: str, jobs: int = 1, compact: Optional[str] = None,
+              indexes: Optional[str] = None, colors: Optional[str] = None,
+              profile: Optional[str] = None, trace: Optional[str] = None, views: bool = True,
+              timeline: Optional[str] = None, engine: str = 'grid', layout_template: Optional[str] = None,
+              store: Optional[str] = None) -> Dict:
+    """
+    Estrae in parallelo (al massimo jobs PDF alla volta) tutti i PDF di una
+    cartella o di un glob, ciascuno nella propria cartella di output
+    
+    Un errore su un PDF viene registrato nel manifest senza interrompere gli altri.
+    
+    Returns:
+        Manifest dell'elaborazione (salvato anche in output_root/manifest.json)
+    """
+    pdf_paths = find_batch_inputs(source)
+    output_dirs = batch_output_dirs(pdf_paths, output_root)
+    
+    print(f"📦 PDF da elaborare: {len(pdf_paths)} (fino a {jobs} alla volta)")
+    
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    
+    start = time.perf_counter()
+    entries = []
+    
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = [executor.submit(_batch_extract, str(pdf_path), str(output_dir), compact, indexes, colors,
+                                   profile, trace, views, timeline, engine, layout_template, store)
+                   for pdf_path, output_dir in zip(pdf_paths, output_dirs)]
+        
+        for future in as_completed(futures):
+            entry = future.result()
+            if entry['status'] == 'ok':
+                print(f"  ✓ {entry['pdf']}: {entry['classes']} classi, {entry['lessons']} lezioni "
+                      f"in {entry['seconds']:.1f} s → {entry['outputDir']}")
+            else:
+                print(f"  ❌ {entry['pdf']}: {entry['error']}")
+        
+        # Il manifest segue l'ordine degli input, non quello di completamento
+        entries = [future.result() for future in futures]
+    
+    manifest = {
+        'source': source,
+        'totalFiles': len(entries),
+        'succeeded': sum(1 for e in entries if e['status'] == 'ok'),
+        'failed': sum(1 for e in entries if e['status'] != 'ok'),
+        'totalSeconds': round(time.perf_counter() - start, 3),
+        'files': entries
+    }
+    
+    Path(output_root).mkdir(parents=True, exist_ok=True)
+    manifest_path = Path(output_root) / "manifest.json"
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    
+    print(f"\n📋 Manifest salvato: {manifest_path}")
+    return manifest
+
 # ============================================================================
 # MAIN
 # ============================================================================
 
-def main():
-    if len(sys.argv) < 2:
-        print("❌ Uso: python pdf_timetable_extractor.py <percorso_pdf>")
-        print("\nEsempio:")
-        print("  python pdf_timetable_extractor.py orario_vallauri.pdf")
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Estrae l'orario di tutte le classi dal PDF del Vallauri",
+        epilog="Esempio: python pdf_timetable_extractor.py orario_vallauri.pdf --workers 4. "
+               "Altri sottocomandi: query (vedi schedule_index.py), diff PRECEDENTE NUOVO DELTA, "
+               "validate FILE (vedi schedule_conflicts.py)"
+    )
+    parser.add_argument('pdf_path', nargs='?', help="percorso del PDF con gli orari")
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help="numero di processi per l'estrazione parallela delle pagine (default: 1)")
+    parser.add_argument('--cache', metavar='FILE',
+                        help="cache persistente per pagina: le pagine invariate non vengono rianalizzate")
+    parser.add_argument('--diff', metavar='FILE', default='classi_modificate.json',
+                        help="con --cache, dove salvare l'elenco delle classi cambiate (default: classi_modificate.json)")
+    parser.add_argument('--compact', metavar='FILE',
+                        help="salva anche il formato compatto per l'app (es. orari_tutte_classi.min.json)")
+    parser.add_argument('--indexes', metavar='FILE',
+                        help="salva anche gli indici per docente, aula e aule libere (es. orari_indici.json)")
+    parser.add_argument('--timeline', metavar='FILE',
+                        help="salva anche la linea temporale per lezione in corso e successiva (es. orari_timeline.json)")
+    parser.add_argument('--store', metavar='FILE',
+                        help="salva anche l'archivio binario ad accesso diretto per i servizi (es. orari.store)")
+    parser.add_argument('--colors', metavar='FILE',
+                        help="tabella materia → colore (default: subject_colors.json accanto allo script)")
+    parser.add_argument('--engine', choices=['grid', 'generic'], default='grid',
+                        help="estrattore delle tabelle: grid legge la griglia dal content stream e usa pdfplumber "
+                             "solo per le pagine fuori modello, generic usa sempre pdfplumber (default: grid)")
+    parser.add_argument('--layout-template', metavar='FILE',
+                        help="modello della griglia per --engine grid (se non esiste viene appreso e salvato)")
+    parser.add_argument('--no-views', dest='views', action='store_false',
+                        help="non salvare gli orari per docente e per aula (orari_docenti/, orari_aule/)")
+    parser.add_argument('--delta', nargs=2, metavar=('PRECEDENTE', 'FILE'),
+                        help="salva in FILE le lezioni aggiunte, rimosse e modificate rispetto al JSON completo "
+                             "PRECEDENTE (può essere lo stesso orari_tutte_classi.json, letto prima dell'estrazione)")
+    parser.add_argument('--conflicts', metavar='FILE',
+                        help="controlla i conflitti tra classi (docenti, aule, intervalli) e salva il report; "
+                             "esce con codice 2 se ce ne sono")
+    parser.add_argument('--quiet', action='store_true',
+                        help="nessun output su console (restano solo gli errori, su stderr)")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="salva i tempi e i conteggi di ogni fase per pagina e per classe")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="salva gli eventi di ogni fase in formato Chrome trace (chrome://tracing, speedscope)")
+    parser.add_argument('--class', dest='class_name', metavar='CLASSE',
+                        help="estrae solo la classe indicata (es. \"5A INF\"), analizzando solo le sue pagine")
+    parser.add_argument('--page-index', metavar='FILE',
+                        help="con --class, indice classe → pagine (default: .<nome_pdf>.pagine.json accanto al PDF)")
+    
+    batch = parser.add_argument_group('elaborazione batch')
+    batch.add_argument('--batch', metavar='DIR|GLOB',
+                       help="estrae tutti i PDF di una cartella o di un glob (es. 'archivio/**/*.pdf')")
+    batch.add_argument('--output-dir', metavar='DIR', default='orari_batch',
+                       help="cartella di output del batch, una sottocartella per PDF (default: orari_batch)")
+    batch.add_argument('--jobs', type=int, default=os.cpu_count() or 1, metavar='N',
+                       help="PDF elaborati contemporaneamente (default: numero di CPU)")
+    
+    args = parser.parse_args(argv)
+    if bool(args.pdf_path) == bool(args.batch):
+        parser.error("indicare un PDF oppure --batch")
+    if args.batch and args.conflicts:
+        parser.error("--conflicts non è supportato con --batch")
+    if args.batch and args.cache:
+        parser.error("--cache non è supportato con --batch")
+    if args.batch and args.delta:
+        parser.error("--delta non è supportato con --batch")
+    if args.class_name:
+        for option in ('batch', 'cache', 'compact', 'indexes', 'timeline', 'store', 'delta', 'conflicts'):
+            if getattr(args, option):
+                parser.error(f"--{option} non è supportato con --class")
+    return args
+
+def main_batch(args: argparse.Namespace):
+    print("\n" + "="*70)
+    print("🎓 ESTRATTORE ORARI VALLAURI - BATCH")
+    print("="*70 + "\n")
+    
+    manifest = run_batch(args.batch, args.output_dir, jobs=args.jobs, compact=args.compact,
+                         indexes=args.indexes, colors=args.colors, profile=args.profile, trace=args.trace,
+                         views=args.views, timeline=args.timeline, engine=args.engine,
+                         layout_template=args.layout_template, store=args.store)
+    
+    if not manifest['totalFiles']:
+        print(f"❌ Nessun PDF trovato: {args.batch}", file=sys.stderr)
+        sys.exit(1)
+    
+    print("\n" + "="*70)
+    print("📊 STATISTICHE")
+    print("="*70)
+    print(f"PDF elaborati: {manifest['succeeded']}/{manifest['totalFiles']}")
+    print(f"Tempo totale: {manifest['totalSeconds']:.1f} s")
+    
+    if manifest['failed']:
+        print(f"\n❌ {manifest['failed']} PDF non elaborati (dettagli nel manifest)", file=sys.stderr)
+        print("="*70 + "\n")
+        sys.exit(1)
+    
+    print("\n✅ Batch completato con successo!")
+    print("="*70 + "\n")
+
+# Sottocomandi: ognuno importa solo ciò che gli serve (query, diff e validate
+# non caricano pdfplumber). Senza sottocomando vale extract, come in passato.
+COMMANDS = ('extract', 'query', 'diff', 'validate')
+
+def run_command(command: str, argv: List[str]):
+    """Esegue query, diff o validate con il CLI del modulo corrispondente"""
+    if command == 'query':
+        from schedule_index import main as command_main
+    elif command == 'diff':
+        from schedule_delta import main as command_main
+        argv = ['diff'] + argv
+    else:
+        from schedule_conflicts import main as command_main
+    command_main(argv)
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in COMMANDS:
+        command = argv.pop(0)
+        if command != 'extract':
+            run_command(command, argv)
+            return
+    
+    args = parse_args(argv)
+    run = main_batch if args.batch else main_class if args.class_name else main_extract
+    
+    if not args.quiet:
+        run(args)
+        return
+    
+    # Modalità silenziosa: niente avanzamento né riepiloghi, gli errori vanno su stderr
+    set_verbose(False)
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        run(args)
+
+def main_class(args: argparse.Namespace):
+    pdf_path = args.pdf_path
+    class_name = normalize_class_name(args.class_name.upper())
+    
+    if not Path(pdf_path).exists():
+        print(f"❌ File non trovato: {pdf_path}", file=sys.stderr)
+        sys.exit(1)
+    
+    PROFILER.configure(detailed=bool(args.profile or args.trace), tracing=bool(args.trace))
+    
+    if args.colors:
+        configure_subject_colors(args.colors)
+    configure_grid(args.engine, args.layout_template)
+    
+    print("\n" + "="*70)
+    print(f"🎓 ESTRATTORE ORARI VALLAURI - CLASSE {class_name}")
+    print("="*70 + "\n")
+    
+    schedule, index = extract_class(pdf_path, class_name, args.page_index)
+    
+    if schedule is None:
+        print(f"\n❌ Classe non trovata: {class_name}", file=sys.stderr)
+        print(f"   Classi nel PDF: {', '.join(sorted(index['classes']))}", file=sys.stderr)
         sys.exit(1)
     
-    pdf_path = sys.argv[1]
+    save_individual_class_jsons({class_name: schedule}, "orari_classi")
+    
+    get_color_resolver().report()
+    
+    if args.profile or args.trace:
+        PROFILER.report()
+        save_profile(args.profile, args.trace)
+    
+    print("\n" + "="*70)
+    print("📊 STATISTICHE")
+    print("="*70)
+    print(f"Pagine analizzate: {len(index['classes'][class_name])}/{index['totalPages']}")
+    print(f"Lezioni totali: {schedule['totalLessons']}")
+    print("\n✅ Estrazione completata con successo!")
+    print("="*70 + "\n")
+
+def main_extract(args: argparse.Namespace):
+    pdf_path = args.pdf_path
     
     if not Path(pdf_path).exists():
-        print(f"❌ File non trovato: {pdf_path}")
+        print(f"❌ File non trovato: {pdf_path}", file=sys.stderr)
         sys.exit(1)
     
-    # Estrai tutte le classi
-    all_classes = extract_all_classes(pdf_path)
+    PROFILER.configure(detailed=bool(args.profile or args.trace), tracing=bool(args.trace))
+    
+    if args.colors:
+        configure_subject_colors(args.colors)
+    configure_grid(args.engine, args.layout_template)
+    
+    cache = load_page_cache(args.cache) if args.cache else None
+    
+    # La versione precedente va letta prima che l'estrazione la sovrascriva
+    previous = None
+    if args.delta:
+        if not Path(args.delta[0]).exists():
+            print(f"❌ File non trovato: {args.delta[0]}", file=sys.stderr)
+            sys.exit(1)
+        with open(args.delta[0], 'r', encoding='utf-8') as f:
+            previous = json.load(f)
     
-    if not all_classes:
-        print("\n❌ Nessuna classe estratta")
+    print("\n" + "="*70)
+    print("🎓 ESTRATTORE ORARI VALLAURI - TUTTE LE CLASSI")
+    print("="*70 + "\n")
+    
+    written = extract_to_directory(pdf_path, workers=args.workers, cache=cache,
+                                   compact=args.compact, indexes=args.indexes,
+                                   timeline=args.timeline, views=args.views, store=args.store)
+    
+    if not written:
+        print("\n❌ Nessuna classe estratta", file=sys.stderr)
         sys.exit(1)
     
-    # Salva output
-    output_file = "orari_tutte_classi.json"
-    save_all_classes_json(all_classes, output_file)
+    # Aggiorna la cache e segnala le classi cambiate rispetto all'esecuzione precedente
+    if cache is not None:
+        fingerprints = {name: info['fingerprint'] for name, info in written.items()}
+        diff = diff_classes(cache['classes'], fingerprints)
+        save_class_diff(diff, cache['reparsed'], args.diff)
+        cache['classes'] = fingerprints
+        save_page_cache(cache, args.cache)
     
-    # Salva anche file individuali
-    save_individual_class_jsons(all_classes, "orari_classi")
+    if previous is not None:
+        from schedule_delta import save_delta
+        with open("orari_tutte_classi.json", 'r', encoding='utf-8') as f:
+            save_delta(previous, json.load(f), args.delta[1])
     
     # Statistiche finali
+    get_color_resolver().report()
+    
+    if args.profile or args.trace:
+        PROFILER.report()
+        save_profile(args.profile, args.trace)
+    
+    # Controllo dei conflitti tra classi sul JSON appena scritto
+    conflicts = 0
+    if args.conflicts:
+        from schedule_conflicts import find_conflicts, save_conflict_report
+        with open("orari_tutte_classi.json", 'r', encoding='utf-8') as f:
+            report = find_conflicts(json.load(f)['classes'])
+        save_conflict_report(report, args.conflicts)
+        conflicts = report['totalConflicts']
+    
     print("\n" + "="*70)
     print("📊 STATISTICHE")
     print("="*70)
-    print(f"Classi totali: {len(all_classes)}")
+    print(f"Classi totali: {len(written)}")
     
-    total_lessons = sum(c['totalLessons'] for c in all_classes.values())
+    total_lessons = sum(info['totalLessons'] for info in written.values())
     print(f"Lezioni totali: {total_lessons}")
     
+    if conflicts:
+        print(f"\n⚠️  Estrazione completata con {conflicts} conflitti (dettagli in {args.conflicts})")
+        print("="*70 + "\n")
+        sys.exit(2)
+    
     print("\n✅ Estrazione completata con successo!")
     print("="*70 + "\n")
 
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Controllo di regressione dell'estrattore di orari - Vallauri da Vincenzo
+Confronta l'output di ogni modalità di estrazione con le impronte per classe
+salvate dal PDF incluso (golden_output.json):
+
+    serial      extract_to_directory, una pagina alla volta (griglia rapida)
+    generic     come serial, con l'estrattore generico di pdfplumber
+    parallel    extract_to_directory con un pool di processi
+    cached      seconda esecuzione con --cache sullo stesso PDF (PDF non aperto)
+    partial     cache con metà delle pagine, le altre rianalizzate
+    memory      extract_all_classes, tutto in memoria invece che in streaming
+
+L'impronta di una classe è il numero di lezioni (intervalli compresi) e
+l'hash SHA-256 delle lezioni ordinate per giorno, orario e contenuto, quindi
+non dipende dall'ordine in cui l'estrattore le produce. Il file conserva anche
+un hash breve per lezione: per ogni classe diversa viene riportata la prima
+lezione che non coincide.
+
+Ogni ottimizzazione dell'estrattore va verificata con questo controllo, e il
+file golden va aggiornato (--save-golden) solo per correzioni volute.
+
+Uso:
+    python regression_extractor.py [--modes serial parallel ...] [--workers N]
+    python regression_extractor.py --save-golden
+    python regression_extractor.py --reference orari_tutte_classi.json
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import contextlib
+from typing import List, Dict, Optional, Callable
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_PDF = SCRIPT_DIR / "orario_vallauri.pdf"
+DEFAULT_GOLDEN = SCRIPT_DIR / "golden_output.json"
+
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import pdf_timetable_extractor as extractor
+
+GOLDEN_VERSION = 1
+
+# Cifre esadecimali dell'hash di ogni lezione
+LESSON_HASH_LENGTH = 12
+
+DAY_NAMES = {1: 'Lun', 2: 'Mar', 3: 'Mer', 4: 'Gio', 5: 'Ven', 6: 'Sab'}
+
+# ============================================================================
+# IMPRONTE
+# ============================================================================
+
+def canonical_lesson(lesson: Dict) -> str:
+    """Lezione come JSON compatto con le chiavi ordinate"""
+    return json.dumps(lesson, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+def sorted_lessons(lessons: List[Dict]) -> List[Dict]:
+    """Lezioni ordinate per giorno, inizio, fine e contenuto"""
+    return sorted(lessons, key=lambda l: (l['dayOfWeek'], l['startTime'], l['endTime'], canonical_lesson(l)))
+
+def lesson_hash(lesson: Dict) -> str:
+    return hashlib.sha256(canonical_lesson(lesson).encode('utf-8')).hexdigest()[:LESSON_HASH_LENGTH]
+
+def class_golden(class_data: Dict) -> Dict:
+    """Impronta di una classe: numero di lezioni, hash complessivo e hash di ogni lezione"""
+    lessons = sorted_lessons(class_data['lessons'])
+    digest = hashlib.sha256('\n'.join(canonical_lesson(l) for l in lessons).encode('utf-8'))
+    return {
+        'totalLessons': len(lessons),
+        'hash': digest.hexdigest(),
+        'lessonHashes': [lesson_hash(l) for l in lessons]
+    }
+
+def build_golden(pdf_path: str, classes: Dict[str, Dict]) -> Dict:
+    return {
+        'version': GOLDEN_VERSION,
+        'pdf': Path(pdf_path).name,
+        'pdfHash': extractor.file_hash(pdf_path),
+        'totalClasses': len(classes),
+        'totalLessons': sum(len(c['lessons']) for c in classes.values()),
+        'classes': {name: class_golden(class_data) for name, class_data in sorted(classes.items())}
+    }
+
+def load_golden(golden_path: str) -> Dict:
+    with open(golden_path, 'r', encoding='utf-8') as f:
+        golden = json.load(f)
+    if golden.get('version') != GOLDEN_VERSION:
+        raise ValueError(f"Versione del file golden non supportata: {golden.get('version')}")
+    return golden
+
+# ============================================================================
+# CONFRONTO
+# ============================================================================
+
+def format_lesson(lesson: Dict) -> str:
+    text = f"{DAY_NAMES.get(lesson['dayOfWeek'], lesson['dayOfWeek'])} {lesson['startTime']}-{lesson['endTime']} {lesson['subject']}"
+    if lesson.get('teacher') or lesson.get('classroom'):
+        text += f" {lesson.get('teacher', '')} [{lesson.get('classroom', '')}]"
+    return text
+
+def first_difference(expected: Dict, class_data: Dict, reference: Optional[Dict] = None) -> str:
+    """
+    Descrizione della prima lezione diversa (nell'ordine di sorted_lessons)
+    
+    Se è disponibile l'orario di riferimento della classe (--reference) viene
+    mostrata anche la lezione attesa, altrimenti solo il suo hash.
+    """
+    lessons = sorted_lessons(class_data['lessons'])
+    expected_lessons = sorted_lessons(reference['lessons']) if reference else None
+    
+    for i, expected_hash in enumerate(expected['lessonHashes']):
+        if i < len(lessons) and lesson_hash(lessons[i]) == expected_hash:
+            continue
+        got = format_lesson(lessons[i]) if i < len(lessons) else "nessuna"
+        if expected_lessons is not None and i < len(expected_lessons) and lesson_hash(expected_lessons[i]) == expected_hash:
+            wanted = format_lesson(expected_lessons[i])
+        else:
+            wanted = f"hash {expected_hash}"
+        return f"lezione {i + 1}: ottenuta {got}, attesa {wanted}"
+    
+    i = len(expected['lessonHashes'])
+    return f"lezione {i + 1}: ottenuta {format_lesson(lessons[i])}, attesa nessuna"
+
+def compare_with_golden(classes: Dict[str, Dict], golden: Dict,
+                        reference: Optional[Dict[str, Dict]] = None) -> List[str]:
+    """
+    Confronta le classi estratte con le impronte golden
+    
+    Returns:
+        Una riga per ogni classe mancante, in più o diversa (vuoto se tutto coincide)
+    """
+    differences = []
+    for name, expected in golden['classes'].items():
+        class_data = classes.get(name)
+        if class_data is None:
+            differences.append(f"{name}: classe mancante")
+        elif class_golden(class_data)['hash'] != expected['hash']:
+            count = len(class_data['lessons'])
+            counts = (f"{count} lezioni invece di {expected['totalLessons']}, "
+                      if count != expected['totalLessons'] else "")
+            differences.append(f"{name}: {counts}"
+                               f"{first_difference(expected, class_data, (reference or {}).get(name))}")
+    
+    for name in sorted(classes.keys() - golden['classes'].keys()):
+        differences.append(f"{name}: classe in più ({len(classes[name]['lessons'])} lezioni)")
+    return differences
+
+# ============================================================================
+# MODALITÀ DI ESTRAZIONE
+# ============================================================================
+
+def _read_output(output_dir: str) -> Dict[str, Dict]:
+    with open(Path(output_dir) / "orari_tutte_classi.json", 'r', encoding='utf-8') as f:
+        return json.load(f)['classes']
+
+def _extract(pdf_path: str, tmp_dir: str, workers: int = 1, cache: Optional[Dict] = None) -> Dict[str, Dict]:
+    extractor.extract_to_directory(pdf_path, tmp_dir, workers=workers, cache=cache, views=False)
+    return _read_output(tmp_dir)
+
+def run_serial(pdf_path: str, tmp_dir: str, workers: int) -> Dict[str, Dict]:
+    return _extract(pdf_path, tmp_dir)
+
+def run_generic(pdf_path: str, tmp_dir: str, workers: int) -> Dict[str, Dict]:
+    extractor.configure_grid('generic')
+    return _extract(pdf_path, tmp_dir)
+
+def run_parallel(pdf_path: str, tmp_dir: str, workers: int) -> Dict[str, Dict]:
+    return _extract(pdf_path, tmp_dir, workers=workers)
+
+def _warm_cache(pdf_path: str, tmp_dir: str) -> str:
+    """Cache delle pagine riempita da un'estrazione completa, salvata e da rileggere"""
+    cache_path = str(Path(tmp_dir) / "cache.json")
+    cache = extractor.load_page_cache(cache_path)
+    extractor.extract_to_directory(pdf_path, str(Path(tmp_dir) / "warm"), cache=cache, views=False)
+    extractor.save_page_cache(cache, cache_path)
+    return cache_path
+
+def run_cached(pdf_path: str, tmp_dir: str, workers: int) -> Dict[str, Dict]:
+    cache = extractor.load_page_cache(_warm_cache(pdf_path, tmp_dir))
+    return _extract(pdf_path, tmp_dir, cache=cache)
+
+def run_partial(pdf_path: str, tmp_dir: str, workers: int) -> Dict[str, Dict]:
+    cache = extractor.load_page_cache(_warm_cache(pdf_path, tmp_dir))
+    # Un PDF "diverso" con metà delle pagine già note
+    cache['pdfHash'] = None
+    for page_hash in cache['pageOrder'][::2]:
+        cache['pages'].pop(page_hash, None)
+    return _extract(pdf_path, tmp_dir, cache=cache)
+
+def run_memory(pdf_path: str, tmp_dir: str, workers: int) -> Dict[str, Dict]:
+    return extractor.extract_all_classes(pdf_path)
+
+MODES: Dict[str, Callable[[str, str, int], Dict[str, Dict]]] = {
+    'serial': run_serial,
+    'generic': run_generic,
+    'parallel': run_parallel,
+    'cached': run_cached,
+    'partial': run_partial,
+    'memory': run_memory
+}
+
+def run_mode(mode: str, pdf_path: str, workers: int) -> Dict[str, Dict]:
+    """Esegue una modalità senza output su console, con la configurazione predefinita dell'estrattore"""
+    extractor.configure_grid('grid')
+    extractor.set_verbose(False)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir, open(os.devnull, 'w') as devnull:
+            with contextlib.redirect_stdout(devnull):
+                return MODES[mode](pdf_path, tmp_dir, workers)
+    finally:
+        extractor.configure_grid('grid')
+        extractor.set_verbose(True)
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Controllo di regressione dell'output dell'estrattore")
+    parser.add_argument('pdf_path', nargs='?', default=str(DEFAULT_PDF),
+                        help="PDF da estrarre (default: orario_vallauri.pdf)")
+    parser.add_argument('--golden', metavar='FILE', default=str(DEFAULT_GOLDEN),
+                        help="impronte di riferimento (default: golden_output.json)")
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES), metavar='MODALITÀ',
+                        help=f"modalità da verificare (default: tutte, {', '.join(MODES)})")
+    parser.add_argument('--workers', type=int, default=4, metavar='N',
+                        help="processi per la modalità parallel (default: 4)")
+    parser.add_argument('--reference', metavar='FILE',
+                        help="JSON completo corretto, per mostrare le lezioni attese oltre al loro hash")
+    parser.add_argument('--save-golden', action='store_true',
+                        help="salva le impronte dell'estrattore generico come nuovo riferimento")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    
+    if not Path(args.pdf_path).exists():
+        print(f"❌ File non trovato: {args.pdf_path}")
+        sys.exit(1)
+    
+    if args.save_golden:
+        golden = build_golden(args.pdf_path, run_mode('generic', args.pdf_path, args.workers))
+        with open(args.golden, 'w', encoding='utf-8') as f:
+            json.dump(golden, f, indent=2, ensure_ascii=False)
+        print(f"💾 Impronte salvate: {args.golden} ({golden['totalClasses']} classi, {golden['totalLessons']} lezioni)")
+        return
+    
+    if not Path(args.golden).exists():
+        print(f"❌ File golden non trovato: {args.golden} (crealo con --save-golden)")
+        sys.exit(1)
+    
+    golden = load_golden(args.golden)
+    if golden['pdfHash'] != extractor.file_hash(args.pdf_path):
+        print(f"❌ {args.golden} si riferisce a un altro PDF ({golden['pdf']})")
+        sys.exit(1)
+    
+    reference = None
+    if args.reference:
+        with open(args.reference, 'r', encoding='utf-8') as f:
+            reference = json.load(f)['classes']
+    
+    print(f"🔍 Riferimento: {golden['totalClasses']} classi, {golden['totalLessons']} lezioni ({golden['pdf']})")
+    failed = []
+    for mode in args.modes:
+        start = time.perf_counter()
+        classes = run_mode(mode, args.pdf_path, args.workers)
+        seconds = time.perf_counter() - start
+        differences = compare_with_golden(classes, golden, reference)
+        
+        lessons = sum(len(c['lessons']) for c in classes.values())
+        marker = "❌" if differences else "✓"
+        print(f"  {marker} {mode:<9} {len(classes)} classi, {lessons} lezioni in {seconds:.1f} s"
+              + (f", {len(differences)} classi diverse" if differences else ""))
+        for difference in differences:
+            print(f"      - {difference}")
+        if differences:
+            failed.append(mode)
+    
+    if failed:
+        print(f"\n❌ Output diverso dal riferimento: {', '.join(failed)}")
+        sys.exit(1)
+    
+    print("\n✅ Tutte le modalità riproducono il riferimento")
+
+if __name__ == "__main__":
+    main()
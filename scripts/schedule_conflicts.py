@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Controllo dei conflitti tra classi - Vallauri da Vincenzo
+Verifica l'output dell'estrattore al posto delle correzioni manuali:
+
+    docente    lo stesso docente in due classi nello stesso momento
+    aula       due classi nella stessa aula nello stesso momento
+    intervallo un blocco unito che scavalca un intervallo della propria classe
+
+Per ogni docente e ogni aula le lezioni vengono indicizzate per giorno come
+intervalli in minuti, ordinate per inizio e confrontate con un'unica scansione:
+ogni lezione viene confrontata solo con quelle ancora in corso quando inizia.
+
+Uso:
+    python schedule_conflicts.py orari_tutte_classi.json [--report orari_conflitti.json]
+    python schedule_conflicts.py orari_tutte_classi.json --ignore interval
+
+Codice di uscita: 0 senza conflitti, 2 con conflitti dei tipi non ignorati, 1 per gli errori.
+"""
+
+import sys
+import json
+import heapq
+import argparse
+from typing import List, Dict, Tuple, Optional
+from pathlib import Path
+
+from pdf_timetable_extractor import (
+    detect_schedule_type, get_day_timing, time_to_minutes, minutes_to_time, normalize_teacher_name, teacher_key
+)
+from schedule_index import split_names
+
+REPORT_VERSION = 1
+
+# Tipi di conflitto, nell'ordine del report
+CONFLICT_TYPES = ['teacher', 'room', 'interval']
+
+# Campi delle lezioni riportati nel report
+REPORT_LESSON_KEYS = ['class', 'subject', 'teacher', 'classroom', 'dayOfWeek', 'startTime', 'endTime']
+
+# ============================================================================
+# INDICE A INTERVALLI
+# ============================================================================
+
+# (inizio, fine, lezione) in minuti dalla mezzanotte
+Interval = Tuple[int, int, Dict]
+
+def build_interval_index(all_classes: Dict) -> Tuple[Dict, Dict]:
+    """
+    Indicizza le lezioni per docente e per aula, per giorno, ordinate per inizio
+    
+    I docenti sono raggruppati per teacher_key ("ROSSI M." e "Rossi M" sono lo
+    stesso docente) e riportati con il primo nome normalizzato incontrato.
+    
+    Returns:
+        (docenti, aule): nome → giorno → lista di Interval
+    """
+    teachers: Dict[str, Dict[int, List[Interval]]] = {}
+    teacher_names: Dict[str, str] = {}
+    rooms: Dict[str, Dict[int, List[Interval]]] = {}
+    
+    for class_data in all_classes.values():
+        for lesson in class_data['lessons']:
+            # Gli intervalli non hanno la classe, né docente né aula
+            if 'class' not in lesson:
+                continue
+            
+            interval = (time_to_minutes(lesson['startTime']), time_to_minutes(lesson['endTime']), lesson)
+            day = lesson['dayOfWeek']
+            seen = set()
+            for teacher in split_names(lesson['teacher']):
+                key = teacher_key(teacher)
+                if key and key not in seen:
+                    seen.add(key)
+                    teacher_names.setdefault(key, normalize_teacher_name(teacher))
+                    teachers.setdefault(key, {}).setdefault(day, []).append(interval)
+            for room in split_names(lesson['classroom']):
+                rooms.setdefault(room, {}).setdefault(day, []).append(interval)
+    
+    for index in (teachers, rooms):
+        for days in index.values():
+            for intervals in days.values():
+                intervals.sort(key=lambda item: (item[0], item[1], item[2]['class']))
+    
+    return {teacher_names[key]: days for key, days in teachers.items()}, rooms
+
+def sweep_overlaps(intervals: List[Interval]) -> List[Tuple[Interval, Interval]]:
+    """
+    Coppie di intervalli sovrapposti in una lista ordinata per inizio
+    
+    Gli intervalli ancora in corso stanno in un heap per fine: quelli finiti
+    prima dell'inizio del successivo vengono scartati, gli altri si sovrappongono.
+    """
+    overlaps = []
+    active: List[Tuple[int, int, Interval]] = []
+    
+    for position, interval in enumerate(intervals):
+        start = interval[0]
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for _, _, other in sorted(active, key=lambda item: item[1]):
+            overlaps.append((other, interval))
+        heapq.heappush(active, (interval[1], position, interval))
+    
+    return overlaps
+
+# ============================================================================
+# CONFLITTI
+# ============================================================================
+
+def lesson_record(lesson: Dict) -> Dict:
+    return {key: lesson[key] for key in REPORT_LESSON_KEYS}
+
+def resource_conflicts(index: Dict[str, Dict[int, List[Interval]]], conflict_type: str) -> List[Dict]:
+    """Sovrapposizioni tra lezioni di classi diverse che usano la stessa risorsa (docente o aula)"""
+    conflicts = []
+    for name, days in sorted(index.items()):
+        for day, intervals in sorted(days.items()):
+            for first, second in sweep_overlaps(intervals):
+                # Lo stesso docente o aula nella stessa classe non è un conflitto
+                # (es. due righe della stessa cella unita)
+                if first[2]['class'] == second[2]['class']:
+                    continue
+                start, end = max(first[0], second[0]), min(first[1], second[1])
+                conflicts.append({
+                    'type': conflict_type,
+                    'resource': name,
+                    'dayOfWeek': day,
+                    'startTime': minutes_to_time(start),
+                    'endTime': minutes_to_time(end),
+                    'overlapMinutes': end - start,
+                    'lessons': [lesson_record(first[2]), lesson_record(second[2])]
+                })
+    return conflicts
+
+def interval_conflicts(all_classes: Dict) -> List[Dict]:
+    """Lezioni (blocchi uniti) che iniziano prima di un intervallo della classe e finiscono dopo"""
+    conflicts = []
+    for class_name, class_data in all_classes.items():
+        schedule_type = detect_schedule_type(class_name)
+        for lesson in class_data['lessons']:
+            if 'class' not in lesson:
+                continue
+            start, end = time_to_minutes(lesson['startTime']), time_to_minutes(lesson['endTime'])
+            for interval_start, interval_end in get_day_timing(schedule_type, lesson['dayOfWeek']).intervals:
+                if start < interval_start and end > interval_end:
+                    conflicts.append({
+                        'type': 'interval',
+                        'resource': class_name,
+                        'dayOfWeek': lesson['dayOfWeek'],
+                        'startTime': minutes_to_time(interval_start),
+                        'endTime': minutes_to_time(interval_end),
+                        'overlapMinutes': interval_end - interval_start,
+                        'lessons': [lesson_record(lesson)]
+                    })
+    return conflicts
+
+def find_conflicts(all_classes: Dict, min_overlap: int = 1) -> Dict:
+    """
+    Cerca tutti i conflitti in un dizionario classe → orario (output di extract_all_classes)
+    
+    Args:
+        min_overlap: minuti minimi di sovrapposizione perché un conflitto venga riportato
+    
+    Returns:
+        Report serializzabile in JSON
+    """
+    teachers, rooms = build_interval_index(all_classes)
+    conflicts = (resource_conflicts(teachers, 'teacher') +
+                 resource_conflicts(rooms, 'room') +
+                 interval_conflicts(all_classes))
+    conflicts = [c for c in conflicts if c['overlapMinutes'] >= min_overlap]
+    
+    return {
+        'version': REPORT_VERSION,
+        'totalConflicts': len(conflicts),
+        'counts': {conflict_type: sum(1 for c in conflicts if c['type'] == conflict_type)
+                   for conflict_type in CONFLICT_TYPES},
+        'conflicts': conflicts
+    }
+
+def save_conflict_report(report: Dict, output_path: str):
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    
+    print(f"\n🚦 Conflitti: {report['totalConflicts']} "
+          f"(docenti {report['counts']['teacher']}, aule {report['counts']['room']}, "
+          f"intervalli {report['counts']['interval']}) → {output_path}")
+
+def format_conflict(conflict: Dict) -> str:
+    lessons = ' / '.join(f"{l['class']} {l['subject'][:25]} {l['startTime']}-{l['endTime']}"
+                         for l in conflict['lessons'])
+    return (f"[{conflict['type']}] {conflict['resource']} - giorno {conflict['dayOfWeek']} "
+            f"{conflict['startTime']}-{conflict['endTime']}: {lessons}")
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Controllo dei conflitti tra classi (docenti, aule, intervalli)")
+    parser.add_argument('input', help="orari_tutte_classi.json")
+    parser.add_argument('--report', metavar='FILE', default='orari_conflitti.json',
+                        help="dove salvare il report (default: orari_conflitti.json)")
+    parser.add_argument('--ignore', nargs='+', choices=CONFLICT_TYPES, default=[], metavar='TIPO',
+                        help="tipi di conflitto da non considerare: teacher, room, interval")
+    parser.add_argument('--min-overlap', type=int, default=1, metavar='MIN',
+                        help="minuti minimi di sovrapposizione (default: 1)")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    
+    if not Path(args.input).exists():
+        print(f"❌ File non trovato: {args.input}")
+        sys.exit(1)
+    
+    with open(args.input, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    report = find_conflicts(data['classes'], min_overlap=args.min_overlap)
+    save_conflict_report(report, args.report)
+    
+    blocking = [c for c in report['conflicts'] if c['type'] not in args.ignore]
+    for conflict in blocking:
+        print(f"  ❌ {format_conflict(conflict)}")
+    
+    if blocking:
+        # 2 come l'estrattore con --conflicts: 1 resta per gli errori
+        sys.exit(2)
+    
+    print("\n✅ Nessun conflitto")
+
+if __name__ == "__main__":
+    main()
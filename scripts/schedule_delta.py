@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Delta tra due versioni degli orari - Vallauri da Vincenzo
+Confronta due JSON completi (schema di orari_tutte_classi.json) lezione per
+lezione e produce un delta compatto che, applicato alla versione precedente,
+ricostruisce la nuova: l'app scarica pochi KB invece dell'intero file.
+
+Ogni lezione è identificata da (classe, giorno, inizio, n), dove n distingue
+le lezioni con lo stesso giorno e inizio nella stessa classe (classi su più
+pagine), nell'ordine in cui compaiono. Il confronto usa tabelle hash per
+classe, quindi è lineare nel numero di lezioni.
+
+Struttura del delta:
+    base, target   impronte (snapshot_hash) della versione precedente e della nuova
+    meta           campi di primo livello cambiati (school, extractionDate)
+    removedClasses classi eliminate
+    classes        classi nuove o da sostituire per intero, con l'orario completo
+    classFields    campi cambiati dell'intestazione di una classe (es. totalLessons)
+    lessons        per classe: removed [giorno, inizio, n],
+                   added [giorno, inizio, n, lezione],
+                   modified [giorno, inizio, n, {campo: valore}]
+    classOrder     ordine delle classi, solo se non è quello predefinito
+                   (precedenti nell'ordine originale, poi le nuove)
+
+Le lezioni di una classe vengono ricostruite in ordine di giorno e inizio,
+come le genera l'estrattore; una classe con un ordine diverso viene inclusa
+per intero in 'classes'.
+
+Uso:
+    python schedule_delta.py diff orari_precedenti.json orari_tutte_classi.json orari_delta.json
+    python schedule_delta.py apply orari_precedenti.json orari_delta.json orari_tutte_classi.json
+"""
+
+import sys
+import json
+import hashlib
+import argparse
+from typing import List, Dict, Tuple, Optional
+from pathlib import Path
+
+from schedule_json import canonical_schedule, dumps_indented
+
+DELTA_FORMAT = 'vallauri-delta'
+DELTA_VERSION = 1
+
+# (giorno, inizio, n) di una lezione all'interno della sua classe
+LessonKey = Tuple[int, str, int]
+
+# ============================================================================
+# CONFRONTO
+# ============================================================================
+
+def canonical_snapshot(data: Dict) -> Dict:
+    """JSON completo con le chiavi delle classi e delle lezioni in ordine fisso"""
+    snapshot = {key: value for key, value in data.items() if key != 'classes'}
+    snapshot['classes'] = {name: canonical_schedule(class_data) for name, class_data in data['classes'].items()}
+    return snapshot
+
+def snapshot_hash(data: Dict) -> str:
+    """Impronta SHA-256 di un JSON completo, indipendente dall'ordine delle chiavi"""
+    return hashlib.sha256(dumps_indented(canonical_snapshot(data))).hexdigest()
+
+def keyed_lessons(lessons: List[Dict]) -> Dict[LessonKey, Dict]:
+    """Lezioni di una classe indicizzate per (giorno, inizio, n), nell'ordine originale"""
+    keyed = {}
+    seen: Dict[Tuple[int, str], int] = {}
+    for lesson in lessons:
+        slot = (lesson['dayOfWeek'], lesson['startTime'])
+        n = seen.get(slot, 0)
+        seen[slot] = n + 1
+        keyed[slot + (n,)] = lesson
+    return keyed
+
+def _in_lesson_order(keys: List[LessonKey]) -> bool:
+    return all(a < b for a, b in zip(keys, keys[1:]))
+
+def diff_lessons(old: Dict[LessonKey, Dict], new: Dict[LessonKey, Dict]) -> Dict[str, List]:
+    """Lezioni rimosse, aggiunte e modificate (solo i campi cambiati) di una classe"""
+    removed = [list(key) for key in old if key not in new]
+    added = []
+    modified = []
+    
+    for key, lesson in new.items():
+        previous = old.get(key)
+        if previous is None:
+            added.append(list(key) + [lesson])
+        elif previous != lesson:
+            if previous.keys() != lesson.keys():
+                # Lezione diventata intervallo o viceversa: rimossa e aggiunta
+                removed.append(list(key))
+                added.append(list(key) + [lesson])
+            else:
+                changes = {field: value for field, value in lesson.items() if previous[field] != value}
+                modified.append(list(key) + [changes])
+    
+    changes = {}
+    for name, entries in (('removed', removed), ('added', added), ('modified', modified)):
+        if entries:
+            changes[name] = entries
+    return changes
+
+def diff_snapshots(old: Dict, new: Dict) -> Dict:
+    """Delta che trasforma il JSON completo old in new"""
+    old_classes = old['classes']
+    new_classes = new['classes']
+    
+    meta = {key: value for key, value in new.items()
+            if key not in ('classes', 'totalClasses') and old.get(key) != value}
+    removed_classes = [name for name in old_classes if name not in new_classes]
+    classes = {}
+    class_fields = {}
+    lessons = {}
+    
+    for name, class_data in new_classes.items():
+        previous = old_classes.get(name)
+        new_lessons = keyed_lessons(class_data['lessons'])
+        if previous is None or not _in_lesson_order(list(new_lessons)):
+            classes[name] = class_data
+            continue
+        
+        fields = {field: value for field, value in class_data.items()
+                  if field != 'lessons' and previous.get(field) != value}
+        if fields:
+            class_fields[name] = fields
+        
+        changes = diff_lessons(keyed_lessons(previous['lessons']), new_lessons)
+        if changes:
+            lessons[name] = changes
+    
+    delta = {
+        'format': DELTA_FORMAT,
+        'version': DELTA_VERSION,
+        'base': snapshot_hash(old),
+        'target': snapshot_hash(new)
+    }
+    if meta:
+        delta['meta'] = meta
+    if removed_classes:
+        delta['removedClasses'] = removed_classes
+    if classes:
+        delta['classes'] = classes
+    if class_fields:
+        delta['classFields'] = class_fields
+    if lessons:
+        delta['lessons'] = lessons
+    
+    default_order = [name for name in old_classes if name in new_classes]
+    default_order += [name for name in new_classes if name not in old_classes]
+    if default_order != list(new_classes):
+        delta['classOrder'] = list(new_classes)
+    
+    return delta
+
+def delta_stats(delta: Dict) -> Dict[str, int]:
+    """Numero di lezioni aggiunte, rimosse e modificate e di classi sostituite"""
+    stats = {'added': 0, 'removed': 0, 'modified': 0}
+    for changes in delta.get('lessons', {}).values():
+        for name in stats:
+            stats[name] += len(changes.get(name, []))
+    stats['classes'] = len(delta.get('classes', {})) + len(delta.get('removedClasses', []))
+    return stats
+
+# ============================================================================
+# APPLICAZIONE
+# ============================================================================
+
+def apply_delta(old: Dict, delta: Dict) -> Dict:
+    """
+    Ricostruisce il JSON completo nuovo dal precedente e dal delta
+    
+    Il risultato ha le chiavi nell'ordine dell'estrattore (vedi canonical_schedule).
+    
+    Raises:
+        ValueError: se il delta non è di questo formato, non è stato calcolato su
+                    old o non ricostruisce la versione attesa
+    """
+    if delta.get('format') != DELTA_FORMAT or delta.get('version') != DELTA_VERSION:
+        raise ValueError(f"Formato non supportato: {delta.get('format')} v{delta.get('version')}")
+    if snapshot_hash(old) != delta['base']:
+        raise ValueError("Il delta non è stato calcolato su questa versione degli orari")
+    
+    removed_classes = set(delta.get('removedClasses', []))
+    replaced = delta.get('classes', {})
+    classes = {name: class_data for name, class_data in old['classes'].items() if name not in removed_classes}
+    
+    for name, fields in delta.get('classFields', {}).items():
+        classes[name] = {**classes[name], **fields}
+    
+    for name, changes in delta.get('lessons', {}).items():
+        lessons = keyed_lessons(classes[name]['lessons'])
+        for day, start, n in changes.get('removed', []):
+            del lessons[(day, start, n)]
+        for day, start, n, lesson in changes.get('added', []):
+            lessons[(day, start, n)] = lesson
+        for day, start, n, fields in changes.get('modified', []):
+            lessons[(day, start, n)] = {**lessons[(day, start, n)], **fields}
+        classes[name] = {**classes[name], 'lessons': [lessons[key] for key in sorted(lessons)]}
+    
+    classes.update(replaced)
+    order = delta.get('classOrder') or list(classes)
+    
+    result = {key: value for key, value in old.items() if key != 'classes'}
+    result.update(delta.get('meta', {}))
+    result['totalClasses'] = len(order)
+    result['classes'] = {name: classes[name] for name in order}
+    result = canonical_snapshot(result)
+    
+    if snapshot_hash(result) != delta['target']:
+        raise ValueError("Il delta applicato non ricostruisce la versione attesa")
+    return result
+
+# ============================================================================
+# FILE
+# ============================================================================
+
+def save_delta(old: Dict, new: Dict, output_path: str) -> Dict:
+    """Calcola il delta tra due JSON completi e lo salva minificato"""
+    delta = diff_snapshots(old, new)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(delta, f, ensure_ascii=False, separators=(',', ':'))
+    
+    stats = delta_stats(delta)
+    print(f"\n🧩 Delta salvato: {output_path} ({Path(output_path).stat().st_size / 1024:.2f} KB)")
+    print(f"   Lezioni: {stats['added']} aggiunte, {stats['removed']} rimosse, {stats['modified']} modificate"
+          + (f"; classi nuove, rimosse o sostituite: {stats['classes']}" if stats['classes'] else ""))
+    return delta
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Delta tra due versioni degli orari")
+    parser.add_argument('command', choices=['diff', 'apply'],
+                        help="diff: PRECEDENTE NUOVO → DELTA; apply: PRECEDENTE DELTA → NUOVO")
+    parser.add_argument('base', help="JSON completo della versione precedente")
+    parser.add_argument('input', help="JSON completo nuovo (diff) oppure delta (apply)")
+    parser.add_argument('output', help="file di uscita")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    
+    for path in (args.base, args.input):
+        if not Path(path).exists():
+            print(f"❌ File non trovato: {path}")
+            sys.exit(1)
+    
+    with open(args.base, 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    with open(args.input, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    if args.command == 'diff':
+        save_delta(old, data, args.output)
+        return
+    
+    try:
+        new = apply_delta(old, data)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    with open(args.output, 'wb') as f:
+        f.write(dumps_indented(new))
+    print(f"\n💾 JSON salvato: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Indici di ricerca sugli orari - Vallauri da Vincenzo
+Costruisce indici invertiti sull'output dell'estrattore per rispondere senza
+scandire tutte le lezioni di tutte le classi:
+
+    docente → lezioni          ("dove si trova il docente X adesso")
+    aula → lezioni             ("quali classi usano il laboratorio Y")
+    giorno → intervalli in minuti con le aule occupate e la bitmap delle aule libere
+                               ("quali aule sono libere martedì alle 10:15")
+
+Le classi seguono scansioni orarie diverse (vedi TIMING_MODEL): lo stesso
+numero di slot indica orari diversi per classi diverse. Per questo le aule sono
+indicizzate per minuti: la giornata viene divisa negli intervalli elementari
+delimitati dagli inizi e dalle fini degli slot di tutte le scansioni, e ogni
+lezione (anche un blocco unito) occupa l'aula negli intervalli che copre.
+
+Uso:
+    python schedule_index.py build orari_tutte_classi.json orari_indici.json
+    python schedule_index.py teacher "BERNARDI M." [--day 1 --time 08:30]
+    python schedule_index.py room "LAB.119A PASCAL (27)"
+    python schedule_index.py free --day 2 --time 10:15
+    python schedule_index.py free --day 2 --slot 4 [--schedule standard]
+"""
+
+import sys
+import json
+import argparse
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Tuple, Optional
+from pathlib import Path
+
+from pdf_timetable_extractor import (
+    SCHEDULES, TIMING_MODEL, get_day_timing, time_to_minutes, minutes_to_time,
+    normalize_teacher_name, teacher_key
+)
+
+INDEX_VERSION = 2
+
+# Campi delle lezioni riportati negli indici (il colore non serve alle ricerche)
+INDEX_LESSON_KEYS = ['class', 'subject', 'teacher', 'classroom', 'dayOfWeek', 'startTime', 'endTime']
+
+# ============================================================================
+# COSTRUZIONE
+# ============================================================================
+
+def split_names(value: str) -> List[str]:
+    """Docenti e aule in compresenza sono separati da virgole: "ROSSI M.,BIANCHI L." """
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+def day_boundaries(day: int) -> List[int]:
+    """Inizi e fini degli slot di tutte le scansioni orarie in un giorno, in minuti"""
+    return sorted({minutes
+                   for (_, timing_day), timing in TIMING_MODEL.items() if timing_day == day
+                   for span in timing.slots if span
+                   for minutes in span})
+
+def build_indexes(all_classes: Dict) -> Dict:
+    """
+    Costruisce gli indici da un dizionario classe → orario (output di extract_all_classes)
+    
+    Returns:
+        Indici serializzabili in JSON
+    """
+    # chiave del docente (teacher_key) → [nome, lezioni]: "ROSSI M." e "Rossi M" sono lo stesso docente
+    teachers: Dict[str, list] = {}
+    classrooms: Dict[str, List[Dict]] = {}
+    # giorno → [(inizio, fine, aule)] delle lezioni, in minuti
+    day_lessons: Dict[int, List[Tuple[int, int, List[str]]]] = {}
+    
+    for class_data in all_classes.values():
+        for lesson in class_data['lessons']:
+            # Gli intervalli non hanno la classe e non occupano aule
+            if 'class' not in lesson:
+                continue
+            
+            record = {key: lesson[key] for key in INDEX_LESSON_KEYS}
+            lesson_rooms = split_names(lesson['classroom'])
+            
+            seen = set()
+            for teacher in split_names(lesson['teacher']):
+                key = teacher_key(teacher)
+                if key and key not in seen:
+                    seen.add(key)
+                    teachers.setdefault(key, [normalize_teacher_name(teacher), []])[1].append(record)
+            for room in lesson_rooms:
+                classrooms.setdefault(room, []).append(record)
+            
+            if lesson_rooms:
+                day_lessons.setdefault(lesson['dayOfWeek'], []).append(
+                    (time_to_minutes(lesson['startTime']), time_to_minutes(lesson['endTime']), lesson_rooms))
+    
+    rooms = sorted(classrooms)
+    room_pos = {room: i for i, room in enumerate(rooms)}
+    all_rooms_mask = (1 << len(rooms)) - 1
+    
+    def sort_key(record: Dict):
+        return (record['dayOfWeek'], record['startTime'], record['class'])
+    
+    occupied_rooms = {}
+    free_rooms = {}
+    for day in sorted(day_lessons):
+        # Intervalli elementari: tra due confini consecutivi nessuna lezione inizia o finisce
+        bounds = sorted(set(day_boundaries(day)).union(*((start, end) for start, end, _ in day_lessons[day])))
+        occupied: List[set] = [set() for _ in bounds[1:]]
+        for start, end, lesson_rooms in day_lessons[day]:
+            for i in range(bisect_left(bounds, start), bisect_left(bounds, end)):
+                occupied[i].update(lesson_rooms)
+        
+        day_occupied, day_free = [], []
+        for i, rooms_in_use in enumerate(occupied):
+            if not rooms_in_use:
+                continue
+            positions = sorted(room_pos[room] for room in rooms_in_use)
+            mask = 0
+            for pos in positions:
+                mask |= 1 << pos
+            day_occupied.append([bounds[i], bounds[i + 1], positions])
+            day_free.append([bounds[i], bounds[i + 1], format(all_rooms_mask & ~mask, 'x')])
+        occupied_rooms[str(day)] = day_occupied
+        free_rooms[str(day)] = day_free
+    
+    return {
+        'version': INDEX_VERSION,
+        'rooms': rooms,
+        'teachers': {name: sorted(records, key=sort_key) for name, records in sorted(teachers.values(), key=lambda item: item[0])},
+        'classrooms': {name: sorted(records, key=sort_key) for name, records in sorted(classrooms.items())},
+        'occupiedRooms': occupied_rooms,
+        'freeRooms': free_rooms
+    }
+
+def save_indexes(all_classes: Dict, output_path: str):
+    """Costruisce e salva gli indici"""
+    indexes = build_indexes(all_classes)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(indexes, f, ensure_ascii=False, separators=(',', ':'))
+    
+    print(f"\n🔎 Indici salvati: {output_path}")
+    print(f"   {len(indexes['teachers'])} docenti, {len(indexes['rooms'])} aule, "
+          f"{sum(map(len, indexes['occupiedRooms'].values()))} intervalli con aule occupate")
+
+# ============================================================================
+# RICERCHE
+# ============================================================================
+
+class ScheduleIndex:
+    """Ricerche O(1)/O(k) sugli indici salvati da save_indexes"""
+    
+    def __init__(self, indexes: Dict):
+        if indexes.get('version') != INDEX_VERSION:
+            raise ValueError(f"Versione indici non supportata: {indexes.get('version')}")
+        
+        self.rooms: List[str] = indexes['rooms']
+        self.teachers: Dict[str, List[Dict]] = indexes['teachers']
+        self.classrooms: Dict[str, List[Dict]] = indexes['classrooms']
+        # giorno → inizi, fini e aule degli intervalli occupati, per la ricerca binaria
+        self.interval_starts: Dict[int, List[int]] = {}
+        self.interval_ends: Dict[int, List[int]] = {}
+        self.occupied_rooms: Dict[int, List[List[int]]] = {}
+        self.free_rooms_mask: Dict[int, List[int]] = {}
+        for day, intervals in indexes['occupiedRooms'].items():
+            self.interval_starts[int(day)] = [start for start, _, _ in intervals]
+            self.interval_ends[int(day)] = [end for _, end, _ in intervals]
+            self.occupied_rooms[int(day)] = [positions for _, _, positions in intervals]
+        for day, intervals in indexes['freeRooms'].items():
+            self.free_rooms_mask[int(day)] = [int(mask, 16) for _, _, mask in intervals]
+        
+        # Ricerca dei docenti per chiave (maiuscole, spazi e punti non contano), delle aule senza maiuscole
+        self._teacher_names = {teacher_key(name): name for name in self.teachers}
+        self._room_names = {name.casefold(): name for name in self.classrooms}
+    
+    @classmethod
+    def load(cls, index_path: str) -> 'ScheduleIndex':
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+    
+    def teacher_lessons(self, teacher: str) -> List[Dict]:
+        """Tutte le lezioni di un docente, ordinate per giorno e ora"""
+        name = self._teacher_names.get(teacher_key(teacher))
+        return self.teachers[name] if name else []
+    
+    def teacher_at(self, teacher: str, day: int, time: str) -> Optional[Dict]:
+        """Lezione in corso per un docente in un dato giorno e orario ("HH:MM")"""
+        minutes = time_to_minutes(time)
+        for lesson in self.teacher_lessons(teacher):
+            if (lesson['dayOfWeek'] == day and
+                    time_to_minutes(lesson['startTime']) <= minutes < time_to_minutes(lesson['endTime'])):
+                return lesson
+        return None
+    
+    def room_lessons(self, room: str) -> List[Dict]:
+        """Tutte le lezioni in un'aula, ordinate per giorno e ora"""
+        name = self._room_names.get(room.strip().casefold())
+        return self.classrooms[name] if name else []
+    
+    def room_classes(self, room: str) -> List[str]:
+        """Classi che usano un'aula"""
+        return sorted({lesson['class'] for lesson in self.room_lessons(room)})
+    
+    def _intervals(self, day: int, start: int, end: int) -> range:
+        """Posizioni degli intervalli occupati del giorno che si sovrappongono a [start, end)"""
+        starts = self.interval_starts.get(day, [])
+        first = bisect_right(self.interval_ends.get(day, []), start)
+        return range(first, max(first, bisect_left(starts, end)))
+    
+    def occupied_between(self, day: int, start: int, end: int) -> List[str]:
+        """Aule occupate in almeno un momento di [start, end) (minuti dalla mezzanotte)"""
+        positions = set()
+        for i in self._intervals(day, start, end):
+            positions.update(self.occupied_rooms[day][i])
+        return [self.rooms[i] for i in sorted(positions)]
+    
+    def free_between(self, day: int, start: int, end: int) -> List[str]:
+        """Aule libere per tutto [start, end) (minuti dalla mezzanotte)"""
+        mask = (1 << len(self.rooms)) - 1
+        for i in self._intervals(day, start, end):
+            mask &= self.free_rooms_mask[day][i]
+        return [room for i, room in enumerate(self.rooms) if mask >> i & 1]
+    
+    def occupied_at(self, day: int, time: str) -> List[str]:
+        """Aule occupate in un giorno e orario ("HH:MM")"""
+        minutes = time_to_minutes(time)
+        return self.occupied_between(day, minutes, minutes + 1)
+    
+    def free_at(self, day: int, time: str) -> List[str]:
+        """Aule libere in un giorno e orario ("HH:MM"): tutte, se a quell'ora non c'è lezione"""
+        minutes = time_to_minutes(time)
+        return self.free_between(day, minutes, minutes + 1)
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def format_lesson(lesson: Dict) -> str:
+    return (f"{lesson['dayOfWeek']} {lesson['startTime']}-{lesson['endTime']}  "
+            f"{lesson['class']:<12} {lesson['subject']}  [{lesson['classroom']}]")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Indici di ricerca su docenti, aule e aule libere")
+    parser.add_argument('--index', default='orari_indici.json', metavar='FILE',
+                        help="file degli indici (default: orari_indici.json)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    build = subparsers.add_parser('build', help="costruisce gli indici dal JSON completo")
+    build.add_argument('input', help="orari_tutte_classi.json")
+    build.add_argument('output', nargs='?', help="file degli indici (default: --index)")
+    
+    teacher = subparsers.add_parser('teacher', help="lezioni di un docente")
+    teacher.add_argument('name')
+    teacher.add_argument('--day', type=int, choices=range(1, 7), help="giorno (1=lunedì ... 6=sabato)")
+    teacher.add_argument('--time', help="orario HH:MM: mostra solo la lezione in corso")
+    
+    room = subparsers.add_parser('room', help="lezioni e classi in un'aula")
+    room.add_argument('name')
+    
+    free = subparsers.add_parser('free', help="aule libere in un giorno, a un orario o per uno slot")
+    free.add_argument('--day', type=int, choices=range(1, 7), required=True, help="giorno (1=lunedì ... 6=sabato)")
+    when = free.add_mutually_exclusive_group(required=True)
+    when.add_argument('--time', help="orario HH:MM")
+    when.add_argument('--slot', type=int, help="slot (1-7) della scansione indicata con --schedule")
+    free.add_argument('--schedule', choices=sorted(SCHEDULES), default='standard',
+                      help="scansione oraria di --slot (default: standard)")
+    
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    
+    if args.command == 'build':
+        with open(args.input, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        save_indexes(data['classes'], args.output or args.index)
+        return
+    
+    if not Path(args.index).exists():
+        print(f"❌ File non trovato: {args.index}")
+        sys.exit(1)
+    
+    index = ScheduleIndex.load(args.index)
+    
+    if args.command == 'teacher':
+        if args.time:
+            if args.day is None:
+                print("❌ --time richiede --day")
+                sys.exit(1)
+            lesson = index.teacher_at(args.name, args.day, args.time)
+            print(format_lesson(lesson) if lesson else "Nessuna lezione in corso")
+            return
+        
+        lessons = [l for l in index.teacher_lessons(args.name) if args.day is None or l['dayOfWeek'] == args.day]
+        if not lessons:
+            print(f"❌ Nessuna lezione per: {args.name}")
+            sys.exit(1)
+        for lesson in lessons:
+            print(format_lesson(lesson))
+    
+    elif args.command == 'room':
+        lessons = index.room_lessons(args.name)
+        if not lessons:
+            print(f"❌ Nessuna lezione in: {args.name}")
+            sys.exit(1)
+        print(f"Classi: {', '.join(index.room_classes(args.name))}")
+        for lesson in lessons:
+            print(format_lesson(lesson))
+    
+    elif args.command == 'free':
+        if args.time:
+            rooms = index.free_at(args.day, args.time)
+            print(f"{len(rooms)} aule libere alle {args.time}:")
+        else:
+            span = get_day_timing(args.schedule, args.day).slot(args.slot)
+            if span is None:
+                print(f"❌ Slot {args.slot} non previsto dalla scansione {args.schedule} nel giorno {args.day}")
+                sys.exit(1)
+            rooms = index.free_between(args.day, *span)
+            print(f"{len(rooms)} aule libere dalle {minutes_to_time(span[0])} alle {minutes_to_time(span[1])}:")
+        for room in rooms:
+            print(f"  {room}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Serializzazione JSON degli orari - Vallauri da Vincenzo
+Codifica ogni classe una sola volta e riusa gli stessi byte per il file
+individuale e per orari_tutte_classi.json, scrivendo i file in parallelo e in
+modo atomico (file temporaneo + rename).
+
+L'output è identico byte per byte a json.dump(indent=2, ensure_ascii=False):
+se orjson è installato viene usato per la codifica, altrimenti si usa la
+libreria standard. Le chiavi seguono un ordine fisso (CLASS_KEYS, LESSON_KEYS),
+quindi una classe invariata produce sempre lo stesso file, e i file il cui
+contenuto non cambia non vengono riscritti (data di modifica compresa).
+"""
+
+import os
+import json
+import uuid
+from typing import TYPE_CHECKING, List, Dict, Tuple, Optional, Iterable
+from pathlib import Path
+
+from compact_schedule import LESSON_KEYS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+CLASS_KEYS = ['className', 'scheduleType', 'totalLessons', 'lessons']
+
+# ============================================================================
+# CODIFICA
+# ============================================================================
+
+def dumps_indented(data) -> bytes:
+    """JSON con indentazione di 2 spazi, come json.dumps(indent=2, ensure_ascii=False)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+def _ordered(data: Dict, keys: List[str]) -> Dict:
+    """Copia di data con le chiavi note nell'ordine indicato e le altre in ordine alfabetico"""
+    ordered = {key: data[key] for key in keys if key in data}
+    for key in sorted(data.keys() - ordered.keys()):
+        ordered[key] = data[key]
+    return ordered
+
+def canonical_schedule(schedule: Dict) -> Dict:
+    """Orario di una classe con le chiavi in ordine fisso (anche nelle lezioni)"""
+    canonical = _ordered(schedule, CLASS_KEYS)
+    canonical['lessons'] = [_ordered(lesson, LESSON_KEYS) for lesson in schedule['lessons']]
+    return canonical
+
+def encode_class(schedule: Dict) -> bytes:
+    """Byte del file individuale di una classe"""
+    return dumps_indented(canonical_schedule(schedule))
+
+def iter_all_classes_json(classes: Iterable[Tuple[str, bytes]], total_classes: int,
+                          extraction_date: str) -> Iterable[bytes]:
+    """
+    Blocchi di orari_tutte_classi.json composti dai byte già codificati delle classi
+    
+    Il risultato è lo stesso di json.dump(indent=2) sull'intero dizionario:
+    ogni classe viene solo reindentata di un livello.
+    """
+    yield b'{\n'
+    yield b'  "school": "Istituto Vallauri",\n'
+    yield b'  "extractionDate": ' + dumps_indented(extraction_date) + b',\n'
+    yield f'  "totalClasses": {total_classes},\n'.encode('utf-8')
+    yield b'  "classes": {'
+    
+    written = False
+    for class_name, class_json in classes:
+        yield b',\n' if written else b'\n'
+        yield b'    ' + dumps_indented(class_name) + b': '
+        yield class_json.replace(b'\n', b'\n    ')
+        written = True
+    
+    yield b'\n  }\n}' if written else b'}\n}'
+
+# ============================================================================
+# SCRITTURA
+# ============================================================================
+
+def write_atomic(path: Path, chunks: Iterable[bytes]) -> bool:
+    """
+    Scrive il file tramite un file temporaneo nella stessa cartella e un rename
+    
+    Se il file esiste già con lo stesso contenuto viene lasciato com'è.
+    
+    Returns:
+        True se il file è stato scritto, False se era già identico
+    """
+    path = Path(path)
+    tmp_path = str(path.parent / f".{path.name}.{uuid.uuid4().hex}.tmp")
+    # Creato con 0o666 come fa open(), così vale la umask del processo;
+    # un file già esistente mantiene invece i suoi permessi
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        try:
+            os.chmod(tmp_path, path.stat().st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        
+        if _same_content(path, tmp_path):
+            os.unlink(tmp_path)
+            return False
+        
+        os.replace(tmp_path, path)
+        return True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def _same_content(path: Path, other_path: str) -> bool:
+    try:
+        if path.stat().st_size != os.path.getsize(other_path):
+            return False
+        with open(path, 'rb') as a, open(other_path, 'rb') as b:
+            while True:
+                block = a.read(1 << 16)
+                if block != b.read(1 << 16):
+                    return False
+                if not block:
+                    return True
+    except OSError:
+        return False
+
+class ParallelWriter:
+    """
+    Scrive file in parallelo su un pool di thread, ognuno con write_atomic
+    
+    write() restituisce subito; wait() attende la scrittura di un file già
+    accodato (per rileggerlo), close() attende tutte le scritture e propaga
+    il primo errore.
+    """
+    
+    def __init__(self, workers: int = 4):
+        # Importati qui: i comandi che non scrivono file non ne pagano il costo
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending: Dict[Path, 'Future'] = {}
+        self._lock = threading.Lock()
+        self.written = 0
+        self.unchanged = 0
+    
+    def write(self, path: Path, data: bytes):
+        path = Path(path)
+        # Due scritture dello stesso file restano in ordine
+        previous = self._pending.get(path)
+        self._pending[path] = self._executor.submit(self._write, path, data, previous)
+    
+    def _write(self, path: Path, data: bytes, previous: Optional['Future']):
+        if previous is not None:
+            previous.result()
+        changed = write_atomic(path, [data])
+        with self._lock:
+            if changed:
+                self.written += 1
+            else:
+                self.unchanged += 1
+    
+    def wait(self, path: Path):
+        future = self._pending.get(Path(path))
+        if future is not None:
+            future.result()
+    
+    def close(self):
+        try:
+            for future in list(self._pending.values()):
+                future.result()
+        finally:
+            self._executor.shutdown(wait=True)
+    
+    def __enter__(self) -> 'ParallelWriter':
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Archivio binario ad accesso diretto degli orari - Vallauri da Vincenzo
+Salva orari_tutte_classi.json in un file da aprire con mmap: un servizio con
+più processi lo condivide nella page cache e per ogni richiesta legge solo i
+byte della classe richiesta, senza caricare né analizzare il resto.
+
+Struttura del file (interi little-endian senza segno a 32 bit):
+    intestazione  HEADER, a dimensione fissa: formato, versione, numero di
+                  classi, lezioni e stringhe, posizione delle tre sezioni,
+                  stringhe di scuola e data di estrazione
+    directory     una voce DIRECTORY_ENTRY per classe, ordinate per nome
+                  (byte UTF-8): nome, tipo di scansione, posizione delle
+                  lezioni e loro numero
+    stringhe      posizione di ogni stringa (più la fine dell'ultima), poi i
+                  testi UTF-8 uno dopo l'altro
+    lezioni       per ogni classe le sue lezioni contigue, nell'ordine del
+                  JSON, come LESSON: giorno e indici di inizio, fine, classe,
+                  materia, docente, aula e colore (NO_STRING per gli
+                  intervalli, che non hanno il campo 'class')
+
+Una classe si trova con una ricerca binaria nella directory, che confronta
+solo i nomi visitati; le sue lezioni sono un blocco contiguo del file.
+
+Uso:
+    python schedule_store.py build orari_tutte_classi.json orari.store
+    python schedule_store.py get orari.store "5A INF"
+    python schedule_store.py bench orari_tutte_classi.json orari.store
+"""
+
+import sys
+import mmap
+import json
+import time
+import struct
+import argparse
+from typing import List, Dict, Optional, Iterator
+from pathlib import Path
+
+from compact_schedule import LESSON_KEYS, INTERVAL_KEYS
+from schedule_json import write_atomic, dumps_indented
+
+STORE_MAGIC = b'VLST'
+STORE_VERSION = 1
+
+# formato, versione, dimensione dell'intestazione, classi, lezioni, stringhe,
+# posizione di directory, stringhe e lezioni, indici di scuola e data
+HEADER = struct.Struct('<4sHHIIIIIIII')
+# nome, tipo di scansione, posizione della prima lezione, numero di lezioni
+DIRECTORY_ENTRY = struct.Struct('<IIII')
+# giorno, inizio, fine, classe, materia, docente, aula, colore
+LESSON = struct.Struct('<IIIIIIII')
+LESSON_FIELDS = ('dayOfWeek', 'startTime', 'endTime', 'class', 'subject', 'teacher', 'classroom', 'color')
+
+NO_STRING = 0xFFFFFFFF
+
+# ============================================================================
+# SCRITTURA
+# ============================================================================
+
+class _StringTable:
+    """Stringhe distinte nell'ordine di primo utilizzo"""
+    
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+    
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        return self.index.setdefault(value, len(self.index))
+    
+    def encode(self) -> bytes:
+        texts = [value.encode('utf-8') for value in self.index]
+        offsets = [0]
+        for text in texts:
+            offsets.append(offsets[-1] + len(text))
+        return struct.pack(f'<{len(offsets)}I', *offsets) + b''.join(texts)
+
+def build_store(data: Dict) -> bytes:
+    """Byte dell'archivio di un JSON completo (schema di orari_tutte_classi.json)"""
+    strings = _StringTable()
+    school = strings.add(data.get('school', ''))
+    extraction_date = strings.add(data.get('extractionDate', ''))
+    
+    classes = sorted(data['classes'].items(), key=lambda item: item[0].encode('utf-8'))
+    directory_offset = HEADER.size
+    lessons_blob = bytearray()
+    entries = []
+    for class_name, class_data in classes:
+        lessons = class_data['lessons']
+        entries.append((strings.add(class_name), strings.add(class_data['scheduleType']),
+                        len(lessons_blob), len(lessons)))
+        for lesson in lessons:
+            if set(lesson) not in (set(LESSON_KEYS), set(INTERVAL_KEYS)):
+                raise ValueError(f"{class_name}: lezione con campi non supportati: {', '.join(sorted(lesson))}")
+            lessons_blob += LESSON.pack(lesson['dayOfWeek'],
+                                        *(strings.add(lesson.get(key)) for key in LESSON_FIELDS[1:]))
+    
+    strings_offset = directory_offset + DIRECTORY_ENTRY.size * len(entries)
+    string_blob = strings.encode()
+    lessons_offset = strings_offset + len(string_blob)
+    
+    header = HEADER.pack(STORE_MAGIC, STORE_VERSION, HEADER.size, len(entries),
+                         len(lessons_blob) // LESSON.size, len(strings.index),
+                         directory_offset, strings_offset, lessons_offset, school, extraction_date)
+    directory = b''.join(DIRECTORY_ENTRY.pack(name, schedule_type, lessons_offset + offset, count)
+                         for name, schedule_type, offset, count in entries)
+    return header + directory + string_blob + bytes(lessons_blob)
+
+def save_store(data: Dict, output_path: str):
+    """Salva l'archivio (tramite file temporaneo e rename: i lettori aperti continuano a vedere il vecchio)"""
+    store = build_store(data)
+    write_atomic(Path(output_path), [store])
+    
+    print(f"\n🗄️  Archivio ad accesso diretto salvato: {output_path} "
+          f"({len(store) / 1024:.2f} KB, {len(data['classes'])} classi)")
+
+# ============================================================================
+# LETTURA
+# ============================================================================
+
+class ScheduleStore:
+    """
+    Lettore dell'archivio tramite mmap
+    
+    L'apertura legge solo l'intestazione; lessons() e schedule() leggono la voce
+    della classe, le sue lezioni e le sole stringhe che usano (decodificate una
+    volta per processo). Il file può essere sostituito da save_store mentre è
+    aperto: il lettore continua a vedere la versione che ha mappato.
+    """
+    
+    def __init__(self, store_path: str):
+        with open(store_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header(store_path)
+        except Exception:
+            self._mmap.close()
+            raise
+        self._strings: Dict[int, str] = {}
+    
+    def _read_header(self, store_path: str):
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f"Archivio troncato: {store_path}")
+        (magic, version, header_size, self.total_classes, self.total_lessons, self._string_count,
+         self._directory_offset, self._strings_offset, self._lessons_offset,
+         self._school, self._extraction_date) = HEADER.unpack_from(self._mmap, 0)
+        if magic != STORE_MAGIC:
+            raise ValueError(f"Non è un archivio degli orari: {store_path}")
+        if version != STORE_VERSION or header_size != HEADER.size:
+            raise ValueError(f"Versione archivio non supportata: {version}")
+        self._string_data = self._strings_offset + 4 * (self._string_count + 1)
+    
+    def close(self):
+        self._mmap.close()
+    
+    def __enter__(self) -> 'ScheduleStore':
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def __len__(self) -> int:
+        return self.total_classes
+    
+    def __contains__(self, class_name: str) -> bool:
+        return self._find(class_name) is not None
+    
+    def _string_bytes(self, index: int) -> bytes:
+        start, end = struct.unpack_from('<II', self._mmap, self._strings_offset + 4 * index)
+        return self._mmap[self._string_data + start:self._string_data + end]
+    
+    def _string(self, index: int) -> Optional[str]:
+        if index == NO_STRING:
+            return None
+        value = self._strings.get(index)
+        if value is None:
+            value = self._strings[index] = self._string_bytes(index).decode('utf-8')
+        return value
+    
+    def _entry(self, position: int) -> tuple:
+        return DIRECTORY_ENTRY.unpack_from(self._mmap, self._directory_offset + DIRECTORY_ENTRY.size * position)
+    
+    def _find(self, class_name: str) -> Optional[tuple]:
+        """Voce della directory di una classe, con una ricerca binaria sui nomi"""
+        key = class_name.encode('utf-8')
+        low, high = 0, self.total_classes
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._entry(middle)
+            name = self._string_bytes(entry[0])
+            if name == key:
+                return entry
+            if name < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+    
+    @property
+    def school(self) -> str:
+        return self._string(self._school)
+    
+    @property
+    def extraction_date(self) -> str:
+        return self._string(self._extraction_date)
+    
+    def class_names(self) -> List[str]:
+        """Nomi di tutte le classi, nell'ordine dei byte UTF-8"""
+        return [self._string(self._entry(position)[0]) for position in range(self.total_classes)]
+    
+    def records(self, class_name: str) -> Optional[memoryview]:
+        """Byte delle lezioni di una classe (LESSON una dopo l'altra), senza copie (da rilasciare prima di close())"""
+        entry = self._find(class_name)
+        if entry is None:
+            return None
+        _, _, offset, count = entry
+        return memoryview(self._mmap)[offset:offset + LESSON.size * count]
+    
+    def lessons(self, class_name: str) -> Optional[List[Dict]]:
+        """Lezioni di una classe nello schema dei file in orari_classi/, None se la classe non c'è"""
+        entry = self._find(class_name)
+        return None if entry is None else self._entry_lessons(entry)
+    
+    def _entry_lessons(self, entry: tuple) -> List[Dict]:
+        _, _, offset, count = entry
+        lessons = []
+        for position in range(count):
+            day, *indexes = LESSON.unpack_from(self._mmap, offset + LESSON.size * position)
+            values = dict(zip(LESSON_FIELDS[1:], map(self._string, indexes)))
+            values['dayOfWeek'] = day
+            keys = LESSON_KEYS if values['class'] is not None else INTERVAL_KEYS
+            lessons.append({key: values[key] for key in keys})
+        return lessons
+    
+    def schedule(self, class_name: str) -> Optional[Dict]:
+        """Orario di una classe, identico al suo file in orari_classi/"""
+        entry = self._find(class_name)
+        return None if entry is None else self._entry_schedule(entry)
+    
+    def _entry_schedule(self, entry: tuple) -> Dict:
+        lessons = self._entry_lessons(entry)
+        return {
+            'className': self._string(entry[0]),
+            'scheduleType': self._string(entry[1]),
+            'totalLessons': len(lessons),
+            'lessons': lessons
+        }
+    
+    def iter_schedules(self) -> Iterator[Dict]:
+        for position in range(self.total_classes):
+            yield self._entry_schedule(self._entry(position))
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def bench(json_path: str, store_path: str) -> Dict:
+    """
+    Confronta, per ogni classe, il caricamento del JSON completo con la lettura
+    dall'archivio, verificando che gli orari coincidano
+    
+    Returns:
+        Numero di classi e tempo medio per classe (in ms) dei due metodi
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        class_names = list(json.load(f)['classes'])
+    
+    start = time.perf_counter()
+    from_json = []
+    for class_name in class_names:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            from_json.append(json.load(f)['classes'][class_name])
+    json_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    with ScheduleStore(store_path) as store:
+        from_store = [store.schedule(class_name) for class_name in class_names]
+    store_seconds = time.perf_counter() - start
+    
+    mismatches = [name for name, a, b in zip(class_names, from_json, from_store) if a != b]
+    if mismatches:
+        raise ValueError(f"Orari diversi dal JSON: {', '.join(mismatches)}")
+    
+    return {
+        'classes': len(class_names),
+        'json_ms': json_seconds / len(class_names) * 1000,
+        'store_ms': store_seconds / len(class_names) * 1000
+    }
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Archivio binario ad accesso diretto degli orari")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    build = subparsers.add_parser('build', help="crea l'archivio da un JSON completo")
+    build.add_argument('input', help="orari_tutte_classi.json")
+    build.add_argument('output', help="file dell'archivio (es. orari.store)")
+    
+    get = subparsers.add_parser('get', help="stampa l'orario di una classe")
+    get.add_argument('store', help="file dell'archivio")
+    get.add_argument('class_name', metavar='CLASSE')
+    
+    bench_parser = subparsers.add_parser('bench', help="confronta l'archivio con il caricamento del JSON completo")
+    bench_parser.add_argument('input', help="orari_tutte_classi.json")
+    bench_parser.add_argument('store', help="file dell'archivio")
+    
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    
+    for path in (getattr(args, 'input', None), getattr(args, 'store', None)):
+        if path and not Path(path).exists():
+            print(f"❌ File non trovato: {path}")
+            sys.exit(1)
+    
+    if args.command == 'build':
+        with open(args.input, 'r', encoding='utf-8') as f:
+            save_store(json.load(f), args.output)
+        return
+    
+    if args.command == 'bench':
+        result = bench(args.input, args.store)
+        print(f"Classi:        {result['classes']} (orari identici)")
+        print(f"JSON completo: {result['json_ms']:.2f} ms per classe")
+        print(f"Archivio:      {result['store_ms']:.3f} ms per classe "
+              f"({result['json_ms'] / result['store_ms']:.0f}× più veloce)")
+        return
+    
+    with ScheduleStore(args.store) as store:
+        schedule = store.schedule(args.class_name)
+    if schedule is None:
+        print(f"❌ Classe non trovata: {args.class_name}")
+        sys.exit(1)
+    sys.stdout.buffer.write(dumps_indented(schedule) + b'\n')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Linea temporale per la lezione in corso e la successiva - Vallauri da Vincenzo
+Precalcola per ogni classe e ogni giorno i confini (in minuti dalla mezzanotte)
+in cui cambia la lezione in corso, così il widget e l'aggiornamento in
+background trovano "lezione attuale e prossima" con una ricerca binaria invece
+di scandire tutte le lezioni della classe (intervalli compresi).
+
+Per ogni classe:
+    fingerprint   impronta del file della classe (class_fingerprint), per
+                  verificare che i riferimenti valgano per le lezioni in uso
+    days          giorno → bounds, current, next
+
+bounds è l'elenco ordinato degli inizi e delle fine delle lezioni del giorno;
+current e next hanno un elemento in più. Per un orario t (in minuti), con
+i = bisect_right(bounds, t):
+    current[i]    indice (in 'lessons' della classe) della lezione o dell'intervallo
+                  in corso, -1 se nessuno
+    next[i]       indice della prossima lezione (intervalli esclusi) che inizia
+                  dopo t, -1 se non ce ne sono altre nel giorno
+
+Il risultato è lo stesso della scansione lineare (linear_lookup): a parità di
+orario vale la prima lezione in ordine di 'lessons'.
+
+Uso:
+    python schedule_timeline.py build orari_tutte_classi.json orari_timeline.json
+    python schedule_timeline.py now "5A INF" --day 1 --time 09:00
+    python schedule_timeline.py bench orari_tutte_classi.json
+"""
+
+import sys
+import json
+import time
+import argparse
+from bisect import bisect_right
+from typing import List, Dict, Tuple, Optional
+from pathlib import Path
+
+from pdf_timetable_extractor import time_to_minutes, class_fingerprint
+
+TIMELINE_VERSION = 1
+
+# Orari provati da bench per ogni classe e giorno (ogni minuto dalle 7 alle 18)
+BENCH_MINUTES = range(7 * 60, 18 * 60)
+
+# ============================================================================
+# COSTRUZIONE
+# ============================================================================
+
+def build_day_timeline(entries: List[Tuple[int, int, int, bool]]) -> Dict[str, List[int]]:
+    """
+    Linea temporale di un giorno da (indice, inizio, fine, intervallo) delle sue lezioni,
+    nell'ordine di 'lessons'
+    """
+    bounds = sorted({minutes for _, start, end, _ in entries for minutes in (start, end)})
+    
+    # Segmento i: da bounds[i - 1] (escluso per i = 0) a bounds[i]; l'ultimo non ha fine
+    current = [-1]
+    for bound in bounds:
+        current.append(next((index for index, start, end, _ in entries if start <= bound < end), -1))
+    
+    following = []
+    for bound in bounds:
+        following.append(next((index for index, start, _, interval in entries
+                               if not interval and start >= bound), -1))
+    following.append(-1)
+    
+    return {'bounds': bounds, 'current': current, 'next': following}
+
+def build_class_timeline(class_data: Dict) -> Dict:
+    """Linea temporale di una classe (orario nello schema di orari_classi/)"""
+    by_day: Dict[int, List[Tuple[int, int, int, bool]]] = {}
+    for index, lesson in enumerate(class_data['lessons']):
+        by_day.setdefault(lesson['dayOfWeek'], []).append(
+            (index, time_to_minutes(lesson['startTime']), time_to_minutes(lesson['endTime']), 'class' not in lesson)
+        )
+    
+    return {
+        'fingerprint': class_fingerprint(class_data),
+        'days': {str(day): build_day_timeline(entries) for day, entries in sorted(by_day.items())}
+    }
+
+def build_timeline(all_classes: Dict) -> Dict:
+    """Linee temporali di tutte le classi (dizionario classe → orario, output di extract_all_classes)"""
+    return {
+        'version': TIMELINE_VERSION,
+        'classes': {name: build_class_timeline(class_data) for name, class_data in all_classes.items()}
+    }
+
+def save_timeline(all_classes: Dict, output_path: str):
+    """Costruisce e salva le linee temporali"""
+    timeline = build_timeline(all_classes)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(timeline, f, ensure_ascii=False, separators=(',', ':'))
+    
+    print(f"\n🕒 Linea temporale salvata: {output_path} ({Path(output_path).stat().st_size / 1024:.2f} KB, "
+          f"{len(timeline['classes'])} classi)")
+
+# ============================================================================
+# RICERCHE
+# ============================================================================
+
+def timeline_lookup(day_timeline: Optional[Dict], minutes: int) -> Tuple[int, int]:
+    """(lezione in corso, prossima lezione) come indici in 'lessons', -1 se assenti"""
+    if day_timeline is None:
+        return -1, -1
+    i = bisect_right(day_timeline['bounds'], minutes)
+    return day_timeline['current'][i], day_timeline['next'][i]
+
+def linear_lookup(lessons: List[Dict], day: int, minutes: int) -> Tuple[int, int]:
+    """Come timeline_lookup, scandendo le lezioni (riferimento per i controlli e per bench)"""
+    current = -1
+    following = -1
+    for index, lesson in enumerate(lessons):
+        if lesson['dayOfWeek'] != day:
+            continue
+        start = time_to_minutes(lesson['startTime'])
+        if current < 0 and start <= minutes < time_to_minutes(lesson['endTime']):
+            current = index
+        if following < 0 and 'class' in lesson and start > minutes:
+            following = index
+    return current, following
+
+class ScheduleTimeline:
+    """Lezione in corso e successiva in O(log n) sulle linee temporali salvate da save_timeline"""
+    
+    def __init__(self, timeline: Dict):
+        if timeline.get('version') != TIMELINE_VERSION:
+            raise ValueError(f"Versione linea temporale non supportata: {timeline.get('version')}")
+        self.classes: Dict[str, Dict] = timeline['classes']
+    
+    @classmethod
+    def load(cls, timeline_path: str) -> 'ScheduleTimeline':
+        with open(timeline_path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+    
+    def lookup(self, class_name: str, day: int, minutes: int) -> Tuple[int, int]:
+        """(lezione in corso, prossima lezione) di una classe, come indici in 'lessons'"""
+        class_timeline = self.classes.get(class_name)
+        if class_timeline is None:
+            return -1, -1
+        return timeline_lookup(class_timeline['days'].get(str(day)), minutes)
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def bench(all_classes: Dict) -> Dict:
+    """
+    Confronta timeline_lookup con la scansione lineare su ogni classe, giorno
+    e minuto di BENCH_MINUTES, verificando che i risultati coincidano
+    
+    Returns:
+        Numero di ricerche e tempo medio per ricerca (in µs) dei due metodi
+    """
+    timeline = ScheduleTimeline(build_timeline(all_classes))
+    queries = [(name, day, minutes)
+               for name, class_data in all_classes.items()
+               for day in sorted({lesson['dayOfWeek'] for lesson in class_data['lessons']})
+               for minutes in BENCH_MINUTES]
+    
+    start = time.perf_counter()
+    linear = [linear_lookup(all_classes[name]['lessons'], day, minutes) for name, day, minutes in queries]
+    linear_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    binary = [timeline.lookup(name, day, minutes) for name, day, minutes in queries]
+    binary_seconds = time.perf_counter() - start
+    
+    mismatches = sum(1 for a, b in zip(linear, binary) if a != b)
+    if mismatches:
+        raise ValueError(f"{mismatches} ricerche con risultato diverso dalla scansione lineare")
+    
+    return {
+        'queries': len(queries),
+        'linear_us': linear_seconds / len(queries) * 1e6,
+        'timeline_us': binary_seconds / len(queries) * 1e6
+    }
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def format_lesson(lesson: Dict) -> str:
+    return (f"{lesson['startTime']}-{lesson['endTime']}  {lesson['subject']}"
+            + (f"  {lesson['teacher']}  [{lesson['classroom']}]" if lesson['teacher'] else ""))
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Lezione in corso e successiva per classe")
+    parser.add_argument('--timeline', default='orari_timeline.json', metavar='FILE',
+                        help="file delle linee temporali (default: orari_timeline.json)")
+    parser.add_argument('--schedule', default='orari_tutte_classi.json', metavar='FILE',
+                        help="JSON completo a cui si riferiscono gli indici (default: orari_tutte_classi.json)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    build = subparsers.add_parser('build', help="costruisce le linee temporali dal JSON completo")
+    build.add_argument('input', help="orari_tutte_classi.json")
+    build.add_argument('output', nargs='?', help="file delle linee temporali (default: --timeline)")
+    
+    now = subparsers.add_parser('now', help="lezione in corso e successiva di una classe")
+    now.add_argument('class_name', metavar='CLASSE')
+    now.add_argument('--day', type=int, required=True, help="giorno (1=lunedì ... 6=sabato)")
+    now.add_argument('--time', required=True, help="orario HH:MM")
+    
+    bench_parser = subparsers.add_parser('bench', help="confronta la ricerca binaria con la scansione lineare")
+    bench_parser.add_argument('input', help="orari_tutte_classi.json")
+    
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    
+    if args.command in ('build', 'bench'):
+        with open(args.input, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        if args.command == 'build':
+            save_timeline(data['classes'], args.output or args.timeline)
+            return
+        
+        result = bench(data['classes'])
+        print(f"Ricerche:           {result['queries']} (risultati identici)")
+        print(f"Scansione lineare:  {result['linear_us']:.2f} µs per ricerca")
+        print(f"Linea temporale:    {result['timeline_us']:.2f} µs per ricerca "
+              f"({result['linear_us'] / result['timeline_us']:.0f}× più veloce)")
+        return
+    
+    for path in (args.timeline, args.schedule):
+        if not Path(path).exists():
+            print(f"❌ File non trovato: {path}")
+            sys.exit(1)
+    
+    timeline = ScheduleTimeline.load(args.timeline)
+    with open(args.schedule, 'r', encoding='utf-8') as f:
+        class_data = json.load(f)['classes'].get(args.class_name)
+    
+    if class_data is None or args.class_name not in timeline.classes:
+        print(f"❌ Classe non trovata: {args.class_name}")
+        sys.exit(1)
+    if timeline.classes[args.class_name]['fingerprint'] != class_fingerprint(class_data):
+        print(f"❌ {args.timeline} non corrisponde all'orario di {args.class_name} in {args.schedule}")
+        sys.exit(1)
+    
+    current, following = timeline.lookup(args.class_name, args.day, time_to_minutes(args.time))
+    print(f"Adesso:    {format_lesson(class_data['lessons'][current]) if current >= 0 else 'nessuna lezione'}")
+    print(f"Prossima:  {format_lesson(class_data['lessons'][following]) if following >= 0 else 'nessuna'}")
+
+if __name__ == "__main__":
+    main()
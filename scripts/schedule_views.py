@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Orari per docente e per aula - Vallauri da Vincenzo
+Raccoglie le lezioni per docente e per aula mentre l'estrattore analizza le
+pagine (nessuna analisi in più) e le salva in orari_docenti/ e orari_aule/,
+un file per docente o aula nello stesso schema di ClassSchedule:
+
+    className      nome del docente o dell'aula
+    scheduleType   'teacher' oppure 'classroom'
+    totalLessons   numero di lezioni
+    lessons        lezioni (con 'class') ordinate per giorno, ora e classe
+
+Gli intervalli non compaiono: appartengono alla scansione oraria della classe.
+I docenti in compresenza ("ROSSI M.,BIANCHI L.") ricevono entrambi la lezione;
+lo stesso docente scritto in modi diversi ("ROSSI M." e "Rossi M") finisce in
+un solo orario, con il nome come compare la prima volta nel PDF.
+
+Uso:
+    python schedule_views.py orari_tutte_classi.json [--output-dir DIR]
+"""
+
+import re
+import sys
+import json
+import argparse
+from typing import List, Dict, Optional, Iterator
+from pathlib import Path
+
+from pdf_timetable_extractor import Lesson, normalize_teacher_name, teacher_key, class_file_name, schedule_from_dict
+from schedule_index import split_names
+from schedule_json import encode_class, ParallelWriter
+
+# Tipo di orario → cartella di output
+VIEW_DIRS = {
+    'teacher': 'orari_docenti',
+    'classroom': 'orari_aule'
+}
+
+# ============================================================================
+# NOMI
+# ============================================================================
+
+def classroom_key(name: str) -> str:
+    """Chiave di un'aula, senza distinzione tra maiuscole e minuscole"""
+    return re.sub(r'\s+', ' ', name).strip().casefold()
+
+def view_file_name(name: str) -> str:
+    """Nome del file di un docente o di un'aula ("BERNARDI M." → BERNARDI_M.json)"""
+    return class_file_name(name.rstrip('.'))
+
+# ============================================================================
+# RACCOLTA
+# ============================================================================
+
+class ScheduleViews:
+    """
+    Orari per docente e per aula, costruiti dagli orari delle classi
+    (con le lezioni come Lesson) man mano che l'estrattore li produce
+    """
+    
+    def __init__(self):
+        # tipo → chiave → [nome, lezioni]
+        self._views: Dict[str, Dict[str, list]] = {kind: {} for kind in VIEW_DIRS}
+    
+    def add(self, schedule: Dict):
+        """Aggiunge le lezioni dell'orario di una classe (o di una sua pagina)"""
+        for lesson in schedule['lessons']:
+            if lesson.is_interval:
+                continue
+            self._add('teacher', lesson, [(teacher_key(name), normalize_teacher_name(name))
+                                          for name in split_names(lesson.teacher)])
+            self._add('classroom', lesson, [(classroom_key(name), name) for name in split_names(lesson.classroom)])
+    
+    def _add(self, kind: str, lesson: Lesson, names: List[tuple]):
+        views = self._views[kind]
+        seen = set()
+        for key, name in names:
+            # Lo stesso docente scritto due volte nella stessa lezione conta una volta
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            views.setdefault(key, [name, []])[1].append(lesson)
+    
+    def count(self, kind: str) -> int:
+        return len(self._views[kind])
+    
+    def schedules(self, kind: str) -> Iterator[Dict]:
+        """Orari di tutti i docenti ('teacher') o di tutte le aule ('classroom'), in ordine di nome"""
+        for name, lessons in sorted(self._views[kind].values(), key=lambda view: view[0].casefold()):
+            lessons = sorted(lessons, key=lambda l: (l.day, l.start, l.class_name))
+            yield {
+                'className': name,
+                'scheduleType': kind,
+                'totalLessons': len(lessons),
+                'lessons': [lesson.to_dict() for lesson in lessons]
+            }
+    
+    def save(self, output_dir: str) -> Dict[str, int]:
+        """
+        Salva un file per docente in orari_docenti/ e uno per aula in orari_aule/
+        
+        Returns:
+            Numero di orari salvati per tipo
+        """
+        saved = {}
+        with ParallelWriter() as writer:
+            for kind, dir_name in VIEW_DIRS.items():
+                view_dir = Path(output_dir) / dir_name
+                view_dir.mkdir(parents=True, exist_ok=True)
+                for schedule in self.schedules(kind):
+                    writer.write(view_dir / view_file_name(schedule['className']), encode_class(schedule))
+                saved[kind] = self.count(kind)
+        
+        print(f"\n👥 Orari per docente e per aula: {saved['teacher']} in {VIEW_DIRS['teacher']}/, "
+              f"{saved['classroom']} in {VIEW_DIRS['classroom']}/"
+              + (f" ({writer.unchanged} invariati)" if writer.unchanged else ""))
+        return saved
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Orari per docente e per aula da un JSON completo")
+    parser.add_argument('input', help="JSON completo (orari_tutte_classi.json)")
+    parser.add_argument('--output-dir', metavar='DIR', default='.',
+                        help="cartella in cui creare orari_docenti/ e orari_aule/ (default: cartella corrente)")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    
+    if not Path(args.input).exists():
+        print(f"❌ File non trovato: {args.input}")
+        sys.exit(1)
+    
+    with open(args.input, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    views = ScheduleViews()
+    for class_data in data['classes'].values():
+        views.add(schedule_from_dict(class_data))
+    views.save(args.output_dir)
+
+if __name__ == "__main__":
+    main()
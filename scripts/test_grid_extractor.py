@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test del lettore del content stream di grid_extractor.py
+
+Le pagine sintetiche vengono confrontate con pdfplumber (page.chars), che è
+il riferimento dell'estrattore generico.
+
+Uso:
+    python -m pytest test_grid_extractor.py
+"""
+
+import pytest
+import pdfplumber
+
+from grid_extractor import LayoutDeviation, read_page_objects
+
+def build_pdf(path, content: bytes, fonts: bytes = b"/F1 5 0 R", resources: bytes = b"", extra_objects=()):
+    """
+    Scrive un PDF di una pagina (A4 orizzontale, Helvetica come /F1) con il
+    content stream dato; fonts e resources vanno nelle risorse della pagina,
+    extra_objects diventano gli oggetti 6, 7...
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 842 595] "
+        b"/Resources << /Font << " + fonts + b" >> " + resources + b" >> /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        *extra_objects,
+    ]
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(data)
+
+def page_chars(path):
+    """Caratteri letti dal content stream e da pdfplumber, arrotondati"""
+    def rounded(values):
+        return [(text, *(round(v, 3) for v in coords)) for text, *coords in values]
+    
+    with pdfplumber.open(str(path)) as pdf:
+        page = pdf.pages[0]
+        ours = rounded(read_page_objects(page).chars)
+        theirs = rounded((c['text'], c['x0'], c['x1'], c['top'], c['bottom']) for c in page.chars)
+    return ours, theirs
+
+def test_leading_operators(tmp_path):
+    # TL e TD impostano l'interlinea, T* e ' la usano per andare a capo;
+    # " (come in pdfminer) imposta le spaziature e scrive sulla stessa riga
+    content = b"\n".join([
+        b"BT /F1 10 Tf 50 500 Td (A) Tj",
+        b"14 TL T* (B) Tj",
+        b"0 -20 TD (C) Tj",
+        b"T* (D) Tj",
+        b"(E) '",
+        b"1 0 (F) \"",
+        b"ET",
+        b"BT /F1 10 Tf 14 TL 300 500 Td (G) Tj T* (H) Tj ET",
+    ])
+    pdf_path = tmp_path / "leading.pdf"
+    build_pdf(pdf_path, content)
+    
+    ours, theirs = page_chars(pdf_path)
+    assert [c[0] for c in theirs] == list("ABCDEFGH")
+    assert ours == theirs
+
+def test_nested_strings(tmp_path):
+    # Un livello di parentesi annidate viene letto, di più la pagina va a pdfplumber
+    pdf_path = tmp_path / "nested.pdf"
+    build_pdf(pdf_path, b"BT /F1 10 Tf 50 500 Td (a(b)c) Tj (d\\(e) Tj ET")
+    ours, theirs = page_chars(pdf_path)
+    assert [c[0] for c in theirs] == list("a(b)cd(e")
+    assert ours == theirs
+    
+    # Letta un livello alla volta diventerebbe Tj, (x(y)z) e w: operatori validi, testo perso
+    build_pdf(pdf_path, b"BT /F1 10 Tf 50 500 Td (Tj(x(y)z)w) Tj ET")
+    with pdfplumber.open(str(pdf_path)) as pdf:
+        with pytest.raises(LayoutDeviation):
+            read_page_objects(pdf.pages[0])
+
+def test_name_escapes(tmp_path):
+    # /F#31 è il nome F1 scritto con una sequenza #xx
+    pdf_path = tmp_path / "names.pdf"
+    build_pdf(pdf_path, b"BT /F#31 10 Tf 50 500 Td (A) Tj ET")
+    ours, theirs = page_chars(pdf_path)
+    assert [c[0] for c in theirs] == ["A"]
+    assert ours == theirs
+
+def test_extgstate_font(tmp_path):
+    # pdfminer non applica ExtGState: il font di /GS1 non cambia i caratteri
+    pdf_path = tmp_path / "extgstate.pdf"
+    build_pdf(pdf_path, b"BT /F1 10 Tf /GS1 gs 50 500 Td (AB) Tj ET",
+              resources=b"/ExtGState << /GS1 << /Type /ExtGState /Font [5 0 R 24] >> >>")
+    ours, theirs = page_chars(pdf_path)
+    assert [c[0] for c in theirs] == ["A", "B"]
+    assert ours == theirs
+
+def test_type3_font(tmp_path):
+    # Larghezze e altezza dei glifi Type3 dipendono da FontMatrix
+    glyph = b"60 0 0 0 60 100 d1 0 0 60 100 re f"
+    pdf_path = tmp_path / "type3.pdf"
+    build_pdf(pdf_path, b"BT /T3 12 Tf 50 500 Td (ABA) Tj ET",
+              fonts=b"/F1 5 0 R /T3 6 0 R",
+              extra_objects=[
+                  b"<< /Type /Font /Subtype /Type3 /FontBBox [0 -20 60 100] "
+                  b"/FontMatrix [0.01 0 0 0.01 0 0] /CharProcs << /A 7 0 R /B 7 0 R >> "
+                  b"/Encoding << /Type /Encoding /Differences [65 /A /B] >> "
+                  b"/FirstChar 65 /LastChar 66 /Widths [60 80] >>",
+                  b"<< /Length %d >>\nstream\n" % len(glyph) + glyph + b"\nendstream",
+              ])
+    ours, theirs = page_chars(pdf_path)
+    assert [c[0] for c in theirs] == list("ABA")
+    assert ours == theirs
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Test dell'import di pdf_timetable_extractor.py
+
+I comandi che non leggono PDF (indici, viste, conflitti, daemon) importano
+l'estrattore: l'import non deve caricare pdfplumber/pdfminer, che vengono
+importati solo da require_pdf_stack().
+
+Uso:
+    python -m pytest test_pdf_timetable_extractor.py
+"""
+
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Moduli che l'import dell'estrattore non deve caricare
+PDF_STACK_MODULES = ['pdfplumber', 'pdfminer']
+
+def loaded_modules(statement: str) -> list:
+    """Moduli dello stack PDF presenti in sys.modules dopo statement, in un interprete nuovo"""
+    code = (
+        "import sys, json\n"
+        f"{statement}\n"
+        f"print(json.dumps([m for m in {PDF_STACK_MODULES!r} if m in sys.modules]))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=SCRIPT_DIR,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+def test_import_is_light():
+    assert loaded_modules("import pdf_timetable_extractor") == []
+
+def test_pdf_stack_on_demand():
+    # Controllo del test stesso: require_pdf_stack() carica davvero i moduli
+    statement = "import pdf_timetable_extractor; pdf_timetable_extractor.require_pdf_stack()"
+    assert loaded_modules(statement) == PDF_STACK_MODULES
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Controllo di regressione (regression_extractor.py) eseguito da pytest
+
+Ogni modalità estrae il PDF incluso e deve riprodurre golden_output.json;
+generic, la più lenta, resta al comando completo.
+
+Uso:
+    python -m pytest test_regression_extractor.py
+"""
+
+import pytest
+
+import pdf_timetable_extractor as extractor
+from regression_extractor import DEFAULT_PDF, DEFAULT_GOLDEN, load_golden, run_mode, compare_with_golden
+
+@pytest.fixture(scope='module')
+def golden():
+    golden = load_golden(str(DEFAULT_GOLDEN))
+    assert golden['pdfHash'] == extractor.file_hash(str(DEFAULT_PDF)), "golden_output.json è di un altro PDF"
+    return golden
+
+@pytest.mark.parametrize('mode', ['serial', 'parallel', 'cached', 'partial', 'memory'])
+def test_mode_matches_golden(golden, mode):
+    classes = run_mode(mode, str(DEFAULT_PDF), workers=2)
+    assert compare_with_golden(classes, golden) == []
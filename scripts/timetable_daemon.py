@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Servizio orari - Vallauri da Vincenzo
+Demone asyncio che sorveglia una cartella di PDF, riestrae solo i file nuovi o
+modificati e serve gli orari via HTTP locale, con ETag e risposte 304 per i
+client che interrogano periodicamente.
+
+    GET /orari              JSON completo (schema di orari_tutte_classi.json)
+    GET /classi             elenco delle classi
+    GET /classi/<classe>    orario di una classe (schema dei file in orari_classi/)
+    GET /docenti            elenco dei docenti
+    GET /docenti/<docente>  lezioni di un docente, ordinate per giorno e ora
+    GET /stato              stato del servizio (PDF caricati, versione, errori)
+
+L'estrazione gira in un pool di processi con una cache per pagina per ogni PDF
+(vedi --cache in pdf_timetable_extractor.py), quindi un PDF corretto viene
+rianalizzato solo nelle pagine cambiate. Le risposte vengono serializzate una
+volta sola per versione e sostituite in blocco: una richiesta vede sempre per
+intero la versione precedente o quella nuova.
+
+Uso:
+    python timetable_daemon.py <cartella_pdf> [--port 8765] [--interval 2] [--jobs N]
+"""
+
+import os
+import sys
+import time
+import signal
+import asyncio
+import hashlib
+import argparse
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple, Optional
+from urllib.parse import unquote, urlsplit
+from pathlib import Path
+
+from pdf_timetable_extractor import (
+    extract_all_classes, configure_subject_colors, load_page_cache,
+    save_page_cache, class_fingerprint, SUBJECT_COLORS_PATH, normalize_teacher_name, teacher_key
+)
+from schedule_index import split_names
+from schedule_json import dumps_indented
+
+# Nome usato come extractionDate, come nel file generato dall'estrattore
+OUTPUT_STEM = 'orari_tutte_classi'
+
+# Dimensione massima della riga di richiesta e delle intestazioni HTTP
+MAX_REQUEST_LINE = 8192
+MAX_HEADERS = 100
+
+# Tempo massimo di attesa della richiesta su una connessione aperta (secondi)
+REQUEST_TIMEOUT = 10
+
+# ============================================================================
+# ESTRAZIONE (nei processi del pool)
+# ============================================================================
+
+def extract_pdf(pdf_path: str, cache_path: str, colors: Optional[str] = None) -> Dict:
+    """
+    Estrae un PDF riusando la sua cache per pagina, senza output su console
+    
+    Returns:
+        {'classes': classe → orario, 'reparsed': classi rianalizzate}
+    """
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        # Tabella riletta a ogni estrazione: il processo del pool può essere
+        # più vecchio dell'ultima modifica di subject_colors.json
+        configure_subject_colors(colors or SUBJECT_COLORS_PATH)
+        
+        cache = load_page_cache(cache_path)
+        classes = extract_all_classes(pdf_path, cache=cache)
+        cache['classes'] = {name: class_fingerprint(data) for name, data in classes.items()}
+        
+        # Scrittura atomica: un demone interrotto non lascia una cache troncata
+        tmp_path = f"{cache_path}.tmp"
+        save_page_cache(cache, tmp_path)
+        os.replace(tmp_path, cache_path)
+    
+    return {'classes': classes, 'reparsed': cache['reparsed']}
+
+# ============================================================================
+# SNAPSHOT
+# ============================================================================
+
+def encode_json(data) -> Tuple[bytes, str]:
+    """Corpo della risposta e relativo ETag"""
+    body = dumps_indented(data)
+    return body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def merge_pdf_results(results: List[Dict]) -> Dict:
+    """Unisce le classi di più PDF: a parità di nome vince il PDF più recente (results in ordine di data)"""
+    classes = {}
+    for result in results:
+        classes.update(result['classes'])
+    return classes
+
+def group_by_teacher(classes: Dict) -> Dict[str, List[Dict]]:
+    """
+    Lezioni di ogni docente (i docenti in compresenza sono separati da virgole)
+    
+    I docenti sono raggruppati per teacher_key, come negli orari per docente:
+    ogni docente compare con il primo nome normalizzato incontrato.
+    """
+    teachers: Dict[str, list] = {}
+    for class_data in classes.values():
+        for lesson in class_data['lessons']:
+            # Gli intervalli non hanno la classe né un docente
+            if 'class' not in lesson:
+                continue
+            seen = set()
+            for teacher in split_names(lesson['teacher']):
+                key = teacher_key(teacher)
+                if key and key not in seen:
+                    seen.add(key)
+                    teachers.setdefault(key, [normalize_teacher_name(teacher), []])[1].append(lesson)
+    
+    return {name: sorted(lessons, key=lambda l: (l['dayOfWeek'], l['startTime'], l['class']))
+            for name, lessons in sorted(teachers.values(), key=lambda item: item[0])}
+
+def build_responses(classes: Dict) -> Dict[str, Tuple[bytes, str]]:
+    """Serializza tutte le risposte di una versione: percorso → (corpo, ETag)"""
+    teachers = group_by_teacher(classes)
+    
+    responses = {
+        '/orari': encode_json({
+            'school': 'Istituto Vallauri',
+            'extractionDate': OUTPUT_STEM,
+            'totalClasses': len(classes),
+            'classes': classes
+        }),
+        '/classi': encode_json(sorted(classes)),
+        '/docenti': encode_json(list(teachers))
+    }
+    
+    for class_name, class_data in classes.items():
+        responses[f"/classi/{class_name.casefold()}"] = encode_json(class_data)
+    
+    for teacher, lessons in teachers.items():
+        responses[f"/docenti/{teacher_key(teacher)}"] = encode_json({
+            'teacher': teacher,
+            'totalLessons': len(lessons),
+            'lessons': lessons
+        })
+    
+    return responses
+
+class Snapshot:
+    """Versione immutabile degli orari servita dal demone"""
+    
+    def __init__(self, version: int, classes: Dict, pdfs: List[str]):
+        self.version = version
+        self.pdfs = pdfs
+        self.total_classes = len(classes)
+        self.updated = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.responses = build_responses(classes)
+    
+    def get(self, path: str) -> Optional[Tuple[bytes, str]]:
+        path = path.rstrip('/')
+        if path.startswith('/docenti/'):
+            # Stessa chiave degli orari per docente: "Bernardi M" trova "BERNARDI M."
+            return self.responses.get('/docenti/' + teacher_key(path[len('/docenti/'):]))
+        return self.responses.get(path.casefold() or '/')
+
+# ============================================================================
+# SERVIZIO
+# ============================================================================
+
+class TimetableDaemon:
+    """Sorveglia la cartella dei PDF e serve l'ultimo snapshot via HTTP"""
+    
+    def __init__(self, drop_dir: str, cache_dir: str, interval: float = 2.0, jobs: int = 1,
+                 colors: Optional[str] = None):
+        self.drop_dir = Path(drop_dir)
+        self.cache_dir = Path(cache_dir)
+        self.interval = interval
+        self.jobs = jobs
+        self.colors = colors
+        
+        self.snapshot = Snapshot(0, {}, [])
+        self._version = 0
+        self.errors: Dict[str, str] = {}
+        
+        # PDF → (firma, risultato) dell'ultima estrazione
+        self._extracted: Dict[Path, Tuple[Tuple[int, int], Optional[Dict]]] = {}
+        # Firme viste all'ultima scansione: un PDF viene estratto solo quando la
+        # sua firma è stabile per due scansioni (copia nella cartella completata)
+        self._seen: Dict[Path, Tuple[int, int]] = {}
+        self._running: Dict[Path, asyncio.Task] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._stopping = asyncio.Event()
+    
+    def scan(self) -> Dict[Path, Tuple[int, int]]:
+        """Firma (mtime, dimensione) dei PDF presenti nella cartella"""
+        signatures = {}
+        for path in self.drop_dir.iterdir():
+            if path.suffix.lower() != '.pdf':
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            signatures[path] = (stat.st_mtime_ns, stat.st_size)
+        return signatures
+    
+    async def watch(self):
+        while not self._stopping.is_set():
+            signatures = self.scan()
+            changed = False
+            
+            for path in list(self._extracted):
+                if path not in signatures and path not in self._running:
+                    print(f"🗑️  PDF rimosso: {path.name}")
+                    del self._extracted[path]
+                    self.errors.pop(path.name, None)
+                    changed = True
+            
+            for path, signature in signatures.items():
+                if path in self._running or self._seen.get(path) != signature:
+                    continue
+                if path in self._extracted and self._extracted[path][0] == signature:
+                    continue
+                self._running[path] = asyncio.create_task(self.extract(path, signature))
+            
+            self._seen = signatures
+            if changed:
+                await self.publish()
+            
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def extract(self, path: Path, signature: Tuple[int, int]):
+        print(f"📄 Estrazione: {path.name}")
+        start = time.perf_counter()
+        cache_path = self.cache_dir / f"{path.stem}.cache.json"
+        loop = asyncio.get_running_loop()
+        
+        try:
+            result = await loop.run_in_executor(self._executor, extract_pdf, str(path), str(cache_path), self.colors)
+        except Exception as e:
+            # Il risultato precedente resta valido; si riprova quando il file cambia di nuovo
+            print(f"❌ {path.name}: {type(e).__name__}: {e}")
+            self.errors[path.name] = f"{type(e).__name__}: {e}"
+            previous = self._extracted.get(path, (None, None))[1]
+            self._extracted[path] = (signature, previous)
+            return
+        finally:
+            del self._running[path]
+        
+        if not result['classes']:
+            print(f"⚠️  {path.name}: nessuna classe estratta")
+            self.errors[path.name] = "nessuna classe estratta"
+        else:
+            self.errors.pop(path.name, None)
+        
+        self._extracted[path] = (signature, result)
+        print(f"✓ {path.name}: {len(result['classes'])} classi "
+              f"({len(result['reparsed'])} rianalizzate) in {time.perf_counter() - start:.1f} s")
+        await self.publish()
+    
+    async def publish(self):
+        """Costruisce il nuovo snapshot fuori dal loop e lo sostituisce in blocco"""
+        ready = sorted(((path, signature, result) for path, (signature, result) in self._extracted.items()
+                        if result is not None), key=lambda item: (item[1][0], item[0].name))
+        classes = merge_pdf_results([result for _, _, result in ready])
+        pdfs = [path.name for path, _, _ in ready]
+        
+        loop = asyncio.get_running_loop()
+        self._version += 1
+        version = self._version
+        snapshot = await loop.run_in_executor(None, Snapshot, version, classes, pdfs)
+        
+        # Un'estrazione più recente può aver già pubblicato nel frattempo
+        if snapshot.version > self.snapshot.version:
+            self.snapshot = snapshot
+            print(f"🔄 Versione {snapshot.version}: {snapshot.total_classes} classi da {len(pdfs)} PDF")
+    
+    def status(self) -> Tuple[bytes, str]:
+        snapshot = self.snapshot
+        return encode_json({
+            'version': snapshot.version,
+            'updated': snapshot.updated,
+            'pdfs': snapshot.pdfs,
+            'totalClasses': snapshot.total_classes,
+            'extracting': sorted(path.name for path in self._running),
+            'errors': self.errors
+        })
+    
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+            headers = {}
+            for _ in range(MAX_HEADERS):
+                line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            
+            parts = request_line.decode('latin-1').split()
+            if len(request_line) > MAX_REQUEST_LINE or len(parts) != 3:
+                await self.respond(writer, 400, b'')
+                return
+            
+            method, target, _ = parts
+            if method not in ('GET', 'HEAD'):
+                await self.respond(writer, 405, b'', extra={'Allow': 'GET, HEAD'})
+                return
+            
+            path = unquote(urlsplit(target).path)
+            found = self.status() if path.rstrip('/') == '/stato' else self.snapshot.get(path)
+            if found is None:
+                body, _ = encode_json({'error': f"non trovato: {path}"})
+                await self.respond(writer, 404, body)
+                return
+            
+            body, etag = found
+            if etag_matches(headers.get('if-none-match', ''), etag):
+                await self.respond(writer, 304, b'', etag=etag)
+            else:
+                await self.respond(writer, 200, body, etag=etag, head=method == 'HEAD')
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    async def respond(self, writer: asyncio.StreamWriter, status: int, body: bytes,
+                      etag: Optional[str] = None, head: bool = False, extra: Optional[Dict] = None):
+        reasons = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+                   405: 'Method Not Allowed'}
+        headers = {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Content-Length': str(len(body)),
+            'Cache-Control': 'no-cache',
+            'Connection': 'close'
+        }
+        if etag:
+            headers['ETag'] = etag
+        headers.update(extra or {})
+        
+        head_lines = [f"HTTP/1.1 {status} {reasons[status]}"] + [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(("\r\n".join(head_lines) + "\r\n\r\n").encode('latin-1'))
+        if not head and status != 304:
+            writer.write(body)
+        await writer.drain()
+    
+    async def run(self, host: str, port: int):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopping.set)
+        
+        with ProcessPoolExecutor(max_workers=max(1, self.jobs)) as executor:
+            self._executor = executor
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f"🌐 In ascolto su http://{host}:{port}/orari")
+            print(f"👀 Cartella sorvegliata: {self.drop_dir} (ogni {self.interval:g} s)")
+            
+            async with server:
+                await self.watch()
+            
+            for task in list(self._running.values()):
+                task.cancel()
+        
+        print("\n👋 Servizio arrestato")
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Confronto debole di If-None-Match con l'ETag corrente"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    return '*' in candidates or any(value.removeprefix('W/') == etag for value in candidates)
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Servizio che riestrae i PDF degli orari e li serve via HTTP")
+    parser.add_argument('drop_dir', help="cartella sorvegliata in cui copiare i PDF")
+    parser.add_argument('--host', default='127.0.0.1', help="indirizzo di ascolto (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="porta HTTP (default: 8765)")
+    parser.add_argument('--interval', type=float, default=2.0, metavar='S',
+                        help="secondi tra due scansioni della cartella (default: 2)")
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help="PDF estratti contemporaneamente (default: 1)")
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help="cartella delle cache per pagina (default: <cartella_pdf>/.cache)")
+    parser.add_argument('--colors', metavar='FILE',
+                        help="tabella materia → colore (default: subject_colors.json accanto all'estrattore)")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    
+    if not Path(args.drop_dir).is_dir():
+        print(f"❌ Cartella non trovata: {args.drop_dir}")
+        sys.exit(1)
+    
+    print("\n" + "="*70)
+    print("🎓 SERVIZIO ORARI VALLAURI")
+    print("="*70 + "\n")
+    
+    daemon = TimetableDaemon(args.drop_dir, args.cache_dir or str(Path(args.drop_dir) / '.cache'),
+                             interval=args.interval, jobs=args.jobs, colors=args.colors)
+    asyncio.run(daemon.run(args.host, args.port))
+
+if __name__ == "__main__":
+    main()